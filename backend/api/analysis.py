@@ -2,15 +2,31 @@
 Analysis API endpoints
 """
 
-import uuid
+import asyncio
+import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from database.sqlite_db import get_db
+from config import settings
+from constants import (
+    ANALYSIS_CANCEL_POLL_INTERVAL,
+    ANALYSIS_CANCEL_TIMEOUT,
+    TASK_EVENT_KEEPALIVE,
+    TASK_EVENT_POLL_INTERVAL,
+    TASK_FINAL_MESSAGES,
+)
+from database.sqlite_db import get_db, get_read_db
 from services.analysis_engine import AnalysisEngine
+from services.cancellation import AnalysisCancelled, CancellationToken
+from services.job_queue import Job, WorkerPool, enqueue, recover_expired_jobs, requeue
+from services.task_events import TERMINAL_STATUSES, get_task_events
+from services.worker_processes import start_worker_processes, stop_worker_processes
+from utils.logger import logger
 
 router = APIRouter()
 
@@ -19,13 +35,21 @@ class AnalysisConfig(BaseModel):
     """Analysis configuration"""
 
     novel_id: str
-    scope: str = "full"  # full or partial
+    scope: str = "full"  # full, partial, or incremental (re-analyse changed chapters only)
     chapter_start: Optional[int] = None
     chapter_end: Optional[int] = None
     depth: str = "standard"  # quick, standard, deep
     features: list = ["characters", "relationships", "plot", "summary"]
     provider: Optional[str] = None
     model: Optional[str] = None
+    use_cache: bool = True  # False bypasses the LLM response cache
+    # Extract characters chunk by chunk over the whole novel (default: only for "deep")
+    map_reduce: Optional[bool] = None
+    # On cancel: "commit" keeps the finished units so the task can be resumed later,
+    # "rollback" discards them. Finished stages are kept either way.
+    cancel_policy: str = "commit"
+    # Queue priority, lower runs first (default: by depth, quick runs before deep ones)
+    priority: Optional[int] = None
 
 
 class AnalysisStatusResponse(BaseModel):
@@ -39,6 +63,11 @@ class AnalysisStatusResponse(BaseModel):
     started_at: Optional[str]
     completed_at: Optional[str]
     error_message: Optional[str]
+    # Units of work (chapters, per stage) done / planned, and seconds left at the
+    # throughput observed so far (None until the first call has finished)
+    units_done: Optional[int] = None
+    units_total: Optional[int] = None
+    eta_seconds: Optional[float] = None
 
 
 class AnalysisResultResponse(BaseModel):
@@ -50,102 +79,242 @@ class AnalysisResultResponse(BaseModel):
     relationship_count: int
     plot_count: int
     chapter_count: int
+    # "provider/model" -> number of LLM calls it served
+    served_by: Optional[Dict[str, int]] = None
 
 
-# Store running tasks (in production, use Redis or similar)
-running_tasks: dict = {}
+@dataclass
+class RunningAnalysis:
+    """An analysis running in this process"""
 
+    task: asyncio.Task
+    token: CancellationToken
 
-async def run_analysis(task_id: str, config: AnalysisConfig):
-    """Background task to run analysis"""
+
+# Analyses running in this process, by task id
+running_tasks: Dict[str, RunningAnalysis] = {}
+
+# Runs the queued analyses in this process (started with the app or a worker process)
+_worker_pool: Optional[WorkerPool] = None
+# Or: worker processes running them, and the event that stops them
+_worker_processes: Optional[tuple] = None
+
+
+async def _run_job(job: Job) -> None:
+    """Run a claimed job as a tracked task so it can be cancelled while it runs"""
+    token = CancellationToken()
+    config = AnalysisConfig.model_validate_json(job.config)
+    task = asyncio.create_task(run_analysis(job.task_id, config, job.resume, token))
+    running = RunningAnalysis(task, token)
+    running_tasks[job.task_id] = running
+    watcher = None
+    if settings.ANALYSIS_WORKER_PROCESSES > 0:
+        # The cancel endpoint runs in the API process: it can only flag the task
+        watcher = asyncio.create_task(_watch_cancellation(job.task_id, running))
+    try:
+        await task
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+async def _watch_cancellation(task_id: str, running: RunningAnalysis) -> None:
+    """Cancel a task running in a worker process once it is marked cancelled"""
+    while not running.task.done():
+        await asyncio.sleep(ANALYSIS_CANCEL_POLL_INTERVAL)
+        async with get_read_db() as db:
+            cursor = await db.execute("SELECT status FROM analysis_tasks WHERE id = ?", (task_id,))
+            row = await cursor.fetchone()
+        if row is None or row[0] == "cancelled":
+            running.token.cancel("cancelled by user")
+            running.task.cancel()
+            return
+
+
+async def start_workers() -> None:
+    """Recover tasks a previous process left running, then start the analysis workers.
+
+    With ANALYSIS_WORKER_PROCESSES they run in separate processes, so analysis code
+    (JSON parsing, validation, merging) never blocks the event loop serving the API.
+    """
+    global _worker_processes
+    await recover_expired_jobs()
+    if settings.ANALYSIS_WORKER_PROCESSES > 0:
+        _worker_processes = start_worker_processes(settings.ANALYSIS_WORKER_PROCESSES)
+    else:
+        start_worker_pool()
+
+
+def start_worker_pool() -> None:
+    """Start the async workers of this process"""
+    global _worker_pool
+    _worker_pool = WorkerPool(_run_job, settings.ANALYSIS_WORKERS)
+    _worker_pool.start()
+
+
+async def stop_workers() -> None:
+    """Stop the workers; their running tasks are recovered at the next start"""
+    global _worker_pool, _worker_processes
+    if _worker_pool is not None:
+        await _worker_pool.stop()
+        _worker_pool = None
+    if _worker_processes is not None:
+        await asyncio.to_thread(stop_worker_processes, *_worker_processes)
+        _worker_processes = None
+
+
+def _notify_workers() -> None:
+    if _worker_pool is not None:
+        _worker_pool.notify()
+
+
+async def _discard_partial_results(task_id: str) -> None:
+    """Rollback policy: drop the checkpoints of the stages a cancelled task left unfinished"""
+    async with get_db() as db:
+        cursor = await db.execute(
+            "SELECT completed_stages FROM analysis_tasks WHERE id = ?", (task_id,)
+        )
+        row = await cursor.fetchone()
+        completed = json.loads(row[0]) if row and row[0] else []
+        placeholders = ",".join("?" * len(completed))
+        await db.execute(
+            "DELETE FROM analysis_artifacts WHERE task_id = ?"
+            + (f" AND kind NOT IN ({placeholders})" if completed else ""),
+            (task_id, *completed),
+        )
+        await db.commit()
+
+
+def _publish_status(task_id: str, status: str, error_message: Optional[str] = None) -> None:
+    event = {"type": "status", "status": status, "error_message": error_message}
+    if status == "completed":
+        event["progress"] = 100
+    if status in TASK_FINAL_MESSAGES:
+        event["progress_message"] = TASK_FINAL_MESSAGES[status]
+    get_task_events().publish(task_id, event)
+
+
+async def run_analysis(
+    task_id: str,
+    config: AnalysisConfig,
+    resume: bool = False,
+    token: Optional[CancellationToken] = None,
+):
+    """Background task to run analysis (resume: continue from the task's checkpoint)"""
+    token = token or CancellationToken()
     try:
         async with get_db() as db:
             # Update status to analyzing
-            await db.execute(
-                "UPDATE analysis_tasks SET status = 'analyzing', started_at = ? WHERE id = ?",
+            cursor = await db.execute(
+                """
+                UPDATE analysis_tasks
+                SET status = 'analyzing', started_at = COALESCE(started_at, ?), error_message = NULL
+                WHERE id = ? AND status = 'analyzing'
+                """,
                 (datetime.now().isoformat(), task_id),
             )
             await db.commit()
+        if not cursor.rowcount:
+            logger.info(f"Analysis task {task_id} was cancelled before it started")
+            return
+        _publish_status(task_id, "analyzing")
 
         # Run analysis engine
-        engine = AnalysisEngine()
-        await engine.analyze(novel_id=config.novel_id, task_id=task_id, config=config.model_dump())
+        engine = AnalysisEngine(cancel_token=token)
+        await engine.analyze(
+            novel_id=config.novel_id, task_id=task_id, config=config.model_dump(), resume=resume
+        )
 
         async with get_db() as db:
-            # Update status to completed
-            await db.execute(
+            # Update status to completed (unless the task was cancelled meanwhile)
+            cursor = await db.execute(
                 """
                 UPDATE analysis_tasks 
-                SET status = 'completed', progress = 100, completed_at = ?
-                WHERE id = ?
+                SET status = 'completed', progress = 100, progress_message = ?,
+                    completed_at = ?, units_done = units_total, eta_seconds = 0
+                WHERE id = ? AND status = 'analyzing'
                 """,
-                (datetime.now().isoformat(), task_id),
+                (TASK_FINAL_MESSAGES["completed"], datetime.now().isoformat(), task_id),
             )
             await db.commit()
 
             # Update novel status
-            await db.execute(
-                "UPDATE novels SET analysis_status = 'completed', updated_at = ? WHERE id = ?",
-                (datetime.now().isoformat(), config.novel_id),
-            )
-            await db.commit()
-
+            if cursor.rowcount:
+                await db.execute(
+                    "UPDATE novels SET analysis_status = 'completed', updated_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), config.novel_id),
+                )
+                await db.commit()
+                _publish_status(task_id, "completed")
+
+    except (AnalysisCancelled, asyncio.CancelledError):
+        if not token.cancelled:
+            # Shutdown, not a user cancel: leave the task for startup recovery
+            raise
+        logger.info(f"Analysis task {task_id} cancelled ({config.cancel_policy})")
+        if config.cancel_policy == "rollback":
+            await _discard_partial_results(task_id)
     except Exception as e:
         async with get_db() as db:
-            await db.execute(
+            cursor = await db.execute(
                 """
                 UPDATE analysis_tasks 
-                SET status = 'failed', error_message = ?, completed_at = ?
-                WHERE id = ?
+                SET status = 'failed', progress_message = ?, error_message = ?, completed_at = ?
+                WHERE id = ? AND status = 'analyzing'
                 """,
-                (str(e), datetime.now().isoformat(), task_id),
+                (TASK_FINAL_MESSAGES["failed"], str(e), datetime.now().isoformat(), task_id),
             )
             await db.commit()
 
-            await db.execute(
-                "UPDATE novels SET analysis_status = 'failed' WHERE id = ?", (config.novel_id,)
-            )
-            await db.commit()
+            if cursor.rowcount:
+                await db.execute(
+                    "UPDATE novels SET analysis_status = 'failed' WHERE id = ?", (config.novel_id,)
+                )
+                await db.commit()
+                _publish_status(task_id, "failed", str(e))
     finally:
         running_tasks.pop(task_id, None)
+        # Progress published after a cancel (while the run was stopping) is stale now
+        get_task_events().forget(task_id)
 
 
 @router.post("/start", response_model=AnalysisStatusResponse)
-async def start_analysis(config: AnalysisConfig, background_tasks: BackgroundTasks):
-    """Start a new analysis task"""
+async def start_analysis(config: AnalysisConfig):
+    """Queue a new analysis task (or return the queued/running one with the same config)"""
     # Validate novel exists
-    async with get_db() as db:
-        cursor = await db.execute("SELECT id FROM novels WHERE id = ?", (config.novel_id,))
-        if not await cursor.fetchone():
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            "SELECT analysis_status FROM novels WHERE id = ?", (config.novel_id,)
+        )
+        row = await cursor.fetchone()
+        if not row:
             raise HTTPException(status_code=404, detail="Novel not found")
+        if row[0] == "importing":
+            raise HTTPException(status_code=409, detail="Novel is still being imported")
 
-    # Create analysis task
-    task_id = str(uuid.uuid4())
+    # Queue analysis task
+    task_id, created = await enqueue(
+        config.novel_id, config.model_dump(), config.model_dump_json()
+    )
+    if not created:
+        logger.info(f"Analysis of novel {config.novel_id} already queued as task {task_id}")
+        return await get_analysis_status(task_id)
 
     async with get_db() as db:
-        await db.execute(
-            """
-            INSERT INTO analysis_tasks (id, novel_id, status, progress)
-            VALUES (?, ?, 'pending', 0)
-            """,
-            (task_id, config.novel_id),
-        )
-
         # Update novel status
         await db.execute(
             "UPDATE novels SET analysis_status = 'analyzing' WHERE id = ?", (config.novel_id,)
         )
         await db.commit()
 
-    # Start background task
-    running_tasks[task_id] = True
-    background_tasks.add_task(run_analysis, task_id, config)
+    _notify_workers()
 
     return AnalysisStatusResponse(
         id=task_id,
         novel_id=config.novel_id,
         status="pending",
         progress=0,
+        progress_message="排队中...",
         started_at=None,
         completed_at=None,
         error_message=None,
@@ -155,11 +324,12 @@ async def start_analysis(config: AnalysisConfig, background_tasks: BackgroundTas
 @router.get("/{task_id}/status", response_model=AnalysisStatusResponse)
 async def get_analysis_status(task_id: str):
     """Get the status of an analysis task"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
             SELECT id, novel_id, status, progress, progress_message,
-                   started_at, completed_at, error_message
+                   started_at, completed_at, error_message,
+                   units_done, units_total, eta_seconds
             FROM analysis_tasks WHERE id = ?
             """,
             (task_id,),
@@ -169,32 +339,105 @@ async def get_analysis_status(task_id: str):
         if not row:
             raise HTTPException(status_code=404, detail="Analysis task not found")
 
-        return AnalysisStatusResponse(
-            id=row[0],
-            novel_id=row[1],
-            status=row[2],
-            progress=row[3],
-            progress_message=row[4] or '分析中...',
-            started_at=row[5],
-            completed_at=row[6],
-            error_message=row[7],
-        )
+    progress, message = row[3], row[4]
+    units_done, units_total, eta_seconds = row[8], row[9], row[10]
+    # The database only gets coarse checkpoints of a running task's progress
+    live = get_task_events().latest_progress(task_id)
+    if live is not None and row[2] == "analyzing":
+        progress, message = live["progress"], live["message"] or message
+        units_done, units_total = live["units_done"], live["units_total"]
+        eta_seconds = live["eta_seconds"]
+
+    return AnalysisStatusResponse(
+        id=row[0],
+        novel_id=row[1],
+        status=row[2],
+        progress=progress,
+        progress_message=message or '分析中...',
+        started_at=row[5],
+        completed_at=row[6],
+        error_message=row[7],
+        units_done=units_done,
+        units_total=units_total,
+        eta_seconds=eta_seconds if row[2] == "analyzing" else None,
+    )
+
+
+@router.get("/{task_id}/events")
+async def stream_analysis_events(task_id: str):
+    """Server-Sent Events stream of a task's status, progress, stages and finished units.
+
+    The first event is the current status; the stream ends with the task.
+    """
+    await get_analysis_status(task_id)  # 404 for unknown tasks
+    return StreamingResponse(
+        _event_stream(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _event_stream(task_id: str):
+    if settings.ANALYSIS_WORKER_PROCESSES > 0:
+        # Tasks run in other processes: their events only reach us through the database
+        async for chunk in _polled_event_stream(task_id):
+            yield chunk
+        return
+
+    # Subscribe before reading the status, so no event falls in between
+    async with get_task_events().subscribe(task_id) as queue:
+        status = await get_analysis_status(task_id)
+        yield _sse({"type": "status", **status.model_dump()})
+        if status.status in TERMINAL_STATUSES:
+            return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), TASK_EVENT_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event)
+            if event["type"] == "status" and event["status"] in TERMINAL_STATUSES:
+                return
+
+
+async def _polled_event_stream(task_id: str):
+    loop = asyncio.get_running_loop()
+    previous, sent_at = None, loop.time()
+    while True:
+        try:
+            status = await get_analysis_status(task_id)
+        except HTTPException:
+            return
+        if status != previous:
+            previous, sent_at = status, loop.time()
+            yield _sse({"type": "status", **status.model_dump()})
+        elif loop.time() - sent_at >= TASK_EVENT_KEEPALIVE:
+            sent_at = loop.time()
+            yield ": keep-alive\n\n"
+        if status.status in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(TASK_EVENT_POLL_INTERVAL)
 
 
 @router.get("/{task_id}/result", response_model=AnalysisResultResponse)
 async def get_analysis_result(task_id: str):
     """Get the result of a completed analysis"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         # Get task info
         cursor = await db.execute(
-            "SELECT novel_id, status FROM analysis_tasks WHERE id = ?", (task_id,)
+            "SELECT novel_id, status, served_by FROM analysis_tasks WHERE id = ?", (task_id,)
         )
         row = await cursor.fetchone()
 
         if not row:
             raise HTTPException(status_code=404, detail="Analysis task not found")
 
-        novel_id, status = row
+        novel_id, status, served_by = row
 
         if status != "completed":
             raise HTTPException(status_code=400, detail=f"Analysis not completed. Status: {status}")
@@ -231,13 +474,14 @@ async def get_analysis_result(task_id: str):
             relationship_count=relationship_count,
             plot_count=plot_count,
             chapter_count=chapter_count,
+            served_by=json.loads(served_by) if served_by else None,
         )
 
 
 @router.get("/{novel_id}/results", response_model=AnalysisResultResponse)
 async def get_novel_analysis_results(novel_id: str):
     """Get analysis results for a novel (latest completed task)"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         # Check if novel exists
         cursor = await db.execute(
             "SELECT id, analysis_status FROM novels WHERE id = ?", (novel_id,)
@@ -252,7 +496,7 @@ async def get_novel_analysis_results(novel_id: str):
         # Find latest completed task for this novel to get a task_id
         task_cursor = await db.execute(
             """
-            SELECT id FROM analysis_tasks 
+            SELECT id, served_by FROM analysis_tasks 
             WHERE novel_id = ? AND status = 'completed' 
             ORDER BY completed_at DESC LIMIT 1
             """,
@@ -260,6 +504,7 @@ async def get_novel_analysis_results(novel_id: str):
         )
         task_row = await task_cursor.fetchone()
         task_id = task_row[0] if task_row else "unknown"
+        served_by = task_row[1] if task_row else None
 
         # Get counts
         char_cursor = await db.execute(
@@ -293,6 +538,7 @@ async def get_novel_analysis_results(novel_id: str):
             relationship_count=relationship_count,
             plot_count=plot_count,
             chapter_count=chapter_count,
+            served_by=json.loads(served_by) if served_by else None,
         )
 
 
@@ -309,7 +555,11 @@ async def delete_analysis_results(novel_id: str):
         await db.execute("DELETE FROM characters WHERE novel_id = ?", (novel_id,))
         await db.execute("DELETE FROM relationships WHERE novel_id = ?", (novel_id,))
         await db.execute("DELETE FROM plot_events WHERE novel_id = ?", (novel_id,))
-        await db.execute("UPDATE chapters SET summary = NULL WHERE novel_id = ?", (novel_id,))
+        await db.execute(
+            "UPDATE chapters SET summary = NULL, summary_model = NULL WHERE novel_id = ?",
+            (novel_id,),
+        )
+        await db.execute("DELETE FROM analysis_artifacts WHERE novel_id = ?", (novel_id,))
         await db.execute("DELETE FROM analysis_tasks WHERE novel_id = ?", (novel_id,))
 
         # Reset novel status
@@ -324,12 +574,124 @@ async def delete_analysis_results(novel_id: str):
 
 @router.post("/{task_id}/cancel")
 async def cancel_analysis(task_id: str):
-    """Cancel a running analysis task"""
-    if task_id in running_tasks:
-        running_tasks.pop(task_id)
-
+    """Cancel an analysis task, aborting the LLM calls it has in flight"""
     async with get_db() as db:
-        await db.execute("UPDATE analysis_tasks SET status = 'cancelled' WHERE id = ?", (task_id,))
+        cursor = await db.execute("SELECT novel_id FROM analysis_tasks WHERE id = ?", (task_id,))
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Analysis task not found")
+
+        # Mark first, so a run finishing right now cannot overwrite the cancellation
+        cursor = await db.execute(
+            """
+            UPDATE analysis_tasks SET status = 'cancelled', progress_message = ?, completed_at = ?
+            WHERE id = ? AND status IN ('pending', 'analyzing', 'interrupted')
+            """,
+            (TASK_FINAL_MESSAGES["cancelled"], datetime.now().isoformat(), task_id),
+        )
+        if cursor.rowcount:
+            await db.execute(
+                "UPDATE novels SET analysis_status = 'cancelled' WHERE id = ?", (row[0],)
+            )
         await db.commit()
+    if cursor.rowcount:
+        _publish_status(task_id, "cancelled")
+
+    running = running_tasks.get(task_id)
+    if running is not None:
+        running.token.cancel("cancelled by user")
+        running.task.cancel()
+        # Wait for in-flight requests to be aborted and the cancel policy applied
+        done, _ = await asyncio.wait({running.task}, timeout=ANALYSIS_CANCEL_TIMEOUT)
+        if not done:
+            logger.warning(f"Analysis task {task_id} is still stopping")
+    elif settings.ANALYSIS_WORKER_PROCESSES > 0:
+        await _wait_released(task_id)
 
     return {"message": "Analysis cancelled"}
+
+
+async def _wait_released(task_id: str) -> None:
+    """Wait for the worker process running a cancelled task to let go of it"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ANALYSIS_CANCEL_TIMEOUT
+    while loop.time() < deadline:
+        async with get_read_db() as db:
+            cursor = await db.execute(
+                "SELECT lease_owner FROM analysis_tasks WHERE id = ?", (task_id,)
+            )
+            row = await cursor.fetchone()
+        if row is None or row[0] is None:
+            return
+        await asyncio.sleep(ANALYSIS_CANCEL_POLL_INTERVAL / 4)
+    logger.warning(f"Analysis task {task_id} is still stopping")
+
+
+@router.get("/interrupted", response_model=List[AnalysisStatusResponse])
+async def list_interrupted_tasks(novel_id: Optional[str] = None):
+    """Tasks interrupted by a backend restart, which can be resumed"""
+    query = """
+        SELECT id, novel_id, status, progress, progress_message,
+               started_at, completed_at, error_message
+        FROM analysis_tasks WHERE status = 'interrupted'
+    """
+    params: tuple = ()
+    if novel_id:
+        query += " AND novel_id = ?"
+        params = (novel_id,)
+
+    async with get_read_db() as db:
+        cursor = await db.execute(query + " ORDER BY started_at DESC", params)
+        rows = await cursor.fetchall()
+
+    return [
+        AnalysisStatusResponse(
+            id=row[0],
+            novel_id=row[1],
+            status=row[2],
+            progress=row[3],
+            progress_message=row[4],
+            started_at=row[5],
+            completed_at=row[6],
+            error_message=row[7],
+        )
+        for row in rows
+    ]
+
+
+@router.post("/{task_id}/resume", response_model=AnalysisStatusResponse)
+async def resume_analysis(task_id: str):
+    """Resume an interrupted, failed or cancelled task from its last checkpoint"""
+    async with get_db() as db:
+        cursor = await db.execute(
+            "SELECT novel_id, status, progress, config FROM analysis_tasks WHERE id = ?",
+            (task_id,),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Analysis task not found")
+
+        novel_id, status, progress, config_json = row
+        if status not in ("interrupted", "failed", "cancelled") or task_id in running_tasks:
+            raise HTTPException(status_code=400, detail=f"Task cannot be resumed. Status: {status}")
+        if not config_json:
+            raise HTTPException(status_code=400, detail="Task has no stored configuration")
+
+        await db.execute(
+            "UPDATE novels SET analysis_status = 'analyzing' WHERE id = ?", (novel_id,)
+        )
+        await db.commit()
+
+    await requeue(task_id)
+    _notify_workers()
+
+    return AnalysisStatusResponse(
+        id=task_id,
+        novel_id=novel_id,
+        status="pending",
+        progress=progress,
+        started_at=None,
+        completed_at=None,
+        error_message=None,
+    )
+
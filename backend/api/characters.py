@@ -2,12 +2,13 @@
 Character API endpoints
 """
 
-from typing import List, Optional
+import json
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
-from database.sqlite_db import get_db
+from database.sqlite_db import get_read_db
 
 router = APIRouter()
 
@@ -23,6 +24,8 @@ class CharacterResponse(BaseModel):
     personality: Optional[str]
     first_appearance: int
     importance_score: float
+    # Per-chunk mentions collected by map-reduce extraction (detail endpoint only)
+    evidence: Optional[List[Dict[str, Any]]] = None
 
 
 @router.get("", response_model=List[CharacterResponse])
@@ -32,7 +35,7 @@ async def get_characters(
     limit: int = Query(100, ge=1, le=500),
 ):
     """Get list of characters"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         if novel_id:
             cursor = await db.execute(
                 """
@@ -81,11 +84,11 @@ async def get_characters(
 @router.get("/{character_id}", response_model=CharacterResponse)
 async def get_character(character_id: str):
     """Get a specific character"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
             SELECT id, novel_id, name, aliases, description, personality,
-                   first_appearance, importance_score
+                   first_appearance, importance_score, evidence
             FROM characters WHERE id = ?
             """,
             (character_id,),
@@ -105,4 +108,5 @@ async def get_character(character_id: str):
             personality=row[5],
             first_appearance=row[6] or 1,
             importance_score=row[7] or 0.5,
+            evidence=json.loads(row[8]) if row[8] else None,
         )
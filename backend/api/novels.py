@@ -2,21 +2,148 @@
 Novel management API endpoints
 """
 
+import asyncio
 import os
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import aiosqlite
 from fastapi import APIRouter, File, UploadFile, HTTPException, Query
 from pydantic import BaseModel
 
-from database.sqlite_db import get_db
+from constants import IMPORT_BATCH_SIZE
+from database.chapter_store import (
+    ContentPacker,
+    ContentRows,
+    index_chapters,
+    index_entry,
+    load_contents,
+    next_seq,
+    open_packer,
+    save_contents,
+    unindex_novel,
+)
+from database.sqlite_db import get_db, get_read_db
 from services.file_parser import FileParser
+from services.search_service import search_chapters
 from models.novel import Novel, NovelResponse
+from utils.logger import logger
+from utils.text_utils import content_hash, estimate_tokens
 
 router = APIRouter()
 
 
+@dataclass
+class _ImportTotals:
+    """Counted while an import's chapters are stored"""
+
+    chapters: int = 0
+    words: int = 0
+
+
+@dataclass
+class _ChapterBatch:
+    """Rows for a batch of imported chapters"""
+
+    chapters: List[tuple] = field(default_factory=list)
+    contents: ContentRows = field(default_factory=ContentRows)  # Compressed text
+    index: List[tuple] = field(default_factory=list)  # Full-text search entries
+
+
+class _ChapterRows:
+    """Turns parsed chapters into rows, numbering them across batches.
+
+    A chapter's text and its search index entry are keyed by the chapter's seq
+    (see database.sqlite_db). A chapter is indexed in the batch that stores its
+    text: removing an entry from the index takes the text (see unindex_novel).
+    """
+
+    def __init__(self, novel_id: str, packer: ContentPacker, first_seq: int):
+        self.novel_id = novel_id
+        self.packer = packer
+        self.next_seq = first_seq
+        self.totals = _ImportTotals()
+        self._unindexed: Dict[int, tuple] = {}  # seq -> index entry, text not saved yet
+
+    def batch(self, chapters: List[Dict[str, Any]]) -> _ChapterBatch:
+        """Count, hash and compress chapters (CPU-bound: run off the event loop)"""
+        rows = _ChapterBatch()
+        for chapter in chapters:
+            i = self.totals.chapters + 1
+            chapter_id = str(uuid.uuid4())
+            title = chapter.get("title", f"第{i}章")
+            content = chapter.get("content", "")
+            word_count = chapter.get("word_count", 0)
+            self.totals.chapters += 1
+            self.totals.words += word_count
+            rows.chapters.append(
+                (
+                    chapter_id,
+                    self.novel_id,
+                    i,
+                    self.next_seq,
+                    title,
+                    word_count,
+                    # Reference estimate (default calibration), see utils.text_utils
+                    estimate_tokens(content),
+                    content_hash(title, content),
+                )
+            )
+            self._unindexed[self.next_seq] = index_entry(self.next_seq, title, content)
+            self.packer.add(self.next_seq, chapter_id, content)
+            self.next_seq += 1
+        # Chapters of a block still open are saved with a later batch
+        self._take_contents(rows)
+        return rows
+
+    def finish(self) -> _ChapterBatch:
+        """Rows of the last, partly filled block"""
+        self.packer.finish()
+        rows = _ChapterBatch()
+        self._take_contents(rows)
+        return rows
+
+    def _take_contents(self, rows: _ChapterBatch) -> None:
+        rows.contents = self.packer.take()
+        rows.index = [self._unindexed.pop(content[0]) for content in rows.contents.contents]
+
+
+async def _save_batch(db: aiosqlite.Connection, rows: _ChapterBatch) -> None:
+    await db.executemany(
+        """
+        INSERT INTO chapters (id, novel_id, chapter_num, seq, title, word_count,
+                              token_count, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows.chapters,
+    )
+    await save_contents(db, rows.contents)
+    await index_chapters(db, rows.index)
+
+
+def _take(chapters: Iterator[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    return list(islice(chapters, count))
+
+
+async def _discard_import(novel_id: str) -> None:
+    """Delete what a failed import has committed"""
+    try:
+        async with get_db() as db:
+            await unindex_novel(db, novel_id)
+            await db.execute("DELETE FROM novels WHERE id = ?", (novel_id,))
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Could not remove partly imported novel {novel_id}: {e}")
+
+
+# Imports run one at a time: an import numbers its chapters and content blocks from
+# the first free seq/block id, which another import must not take meanwhile
+_import_lock = asyncio.Lock()
+
+
 class NovelListResponse(BaseModel):
     """Response model for novel list"""
 
@@ -24,6 +151,26 @@ class NovelListResponse(BaseModel):
     total: int
 
 
+class SearchHit(BaseModel):
+    """A chapter matching a search, with a snippet of its text"""
+
+    chapter_id: str
+    chapter_num: int
+    title: Optional[str] = None
+    score: float  # Higher is more relevant
+    matches: int  # Occurrences of the query terms in the chapter
+    snippet: str
+    highlights: List[Tuple[int, int]]  # (start, end) of each match within the snippet
+
+
+class SearchResponse(BaseModel):
+    """Response model for full-text search"""
+
+    query: str
+    total: int
+    hits: List[SearchHit]
+
+
 @router.post("/import", response_model=NovelResponse)
 async def import_novel(file: UploadFile = File(...)):
     """Import a novel from file"""
@@ -41,9 +188,9 @@ async def import_novel(file: UploadFile = File(...)):
         # Read file content
         content = await file.read()
 
-        # Parse file
+        # Parse file (chapters are split off while they are stored)
         parser = FileParser()
-        parsed_data = await parser.parse(content, file_ext, file.filename)
+        parsed_data = await parser.parse_stream(content, file_ext, file.filename)
 
         # Create novel record
         novel_id = str(uuid.uuid4())
@@ -55,51 +202,65 @@ async def import_novel(file: UploadFile = File(...)):
             created_at=datetime.now(),
             updated_at=datetime.now(),
             analysis_status="pending",
-            total_chapters=len(parsed_data.get("chapters", [])),
-            total_words=parsed_data.get("total_words", 0),
         )
 
-        # Save to database
-        async with get_db() as db:
-            await db.execute(
-                """
-                INSERT INTO novels (id, title, author, file_path, created_at, updated_at, 
-                                   analysis_status, total_chapters, total_words)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    novel.id,
-                    novel.title,
-                    novel.author,
-                    novel.file_path,
-                    novel.created_at.isoformat(),
-                    novel.updated_at.isoformat(),
-                    novel.analysis_status,
-                    novel.total_chapters,
-                    novel.total_words,
-                ),
-            )
-
-            # Save chapters
-            for i, chapter in enumerate(parsed_data.get("chapters", []), 1):
-                chapter_id = str(uuid.uuid4())
+        # Save chapters in batches as the parser produces them, each batch in its own
+        # transaction so other writers get their turn in between. Splitting, counting,
+        # hashing and compressing run in a worker thread, so they never block the event
+        # loop; the text is compressed with a dictionary from the first batch. The novel
+        # is "importing" until its last batch is in
+        async with _import_lock:
+            chapters = iter(parsed_data["chapters"])
+            batch = await asyncio.to_thread(_take, chapters, IMPORT_BATCH_SIZE)
+            async with get_db() as db:
                 await db.execute(
                     """
-                    INSERT INTO chapters (id, novel_id, chapter_num, title, content, word_count)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO novels (id, title, author, file_path, created_at, updated_at,
+                                       analysis_status, total_chapters, total_words)
+                    VALUES (?, ?, ?, ?, ?, ?, 'importing', 0, 0)
                     """,
                     (
-                        chapter_id,
-                        novel_id,
-                        i,
-                        chapter.get("title", f"第{i}章"),
-                        chapter.get("content", ""),
-                        chapter.get("word_count", 0),
+                        novel.id,
+                        novel.title,
+                        novel.author,
+                        novel.file_path,
+                        novel.created_at.isoformat(),
+                        novel.updated_at.isoformat(),
                     ),
                 )
-
-            await db.commit()
-
+                rows = _ChapterRows(
+                    novel_id,
+                    await open_packer(db, novel_id, [ch.get("content", "") for ch in batch]),
+                    await next_seq(db),
+                )
+                await db.commit()
+
+            try:
+                while batch:
+                    chapter_rows = await asyncio.to_thread(rows.batch, batch)
+                    async with get_db() as db:
+                        await _save_batch(db, chapter_rows)
+                        await db.commit()
+                    batch = await asyncio.to_thread(_take, chapters, IMPORT_BATCH_SIZE)
+
+                totals = rows.totals
+                async with get_db() as db:
+                    await _save_batch(db, rows.finish())
+                    await db.execute(
+                        """
+                        UPDATE novels SET analysis_status = ?, total_chapters = ?,
+                                          total_words = ?
+                        WHERE id = ?
+                        """,
+                        (novel.analysis_status, totals.chapters, totals.words, novel_id),
+                    )
+                    await db.commit()
+            except Exception:
+                await _discard_import(novel_id)
+                raise
+
+        novel.total_chapters = totals.chapters
+        novel.total_words = totals.words
         return NovelResponse.from_orm(novel)
 
     except Exception as e:
@@ -109,7 +270,7 @@ async def import_novel(file: UploadFile = File(...)):
 @router.get("", response_model=List[NovelResponse])
 async def get_novels(skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=100)):
     """Get list of all novels"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
             SELECT id, title, author, file_path, created_at, updated_at,
@@ -144,7 +305,7 @@ async def get_novels(skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le
 @router.get("/{novel_id}", response_model=NovelResponse)
 async def get_novel(novel_id: str):
     """Get a specific novel by ID"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
             SELECT id, title, author, file_path, created_at, updated_at,
@@ -180,7 +341,8 @@ async def delete_novel(novel_id: str):
         if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail="Novel not found")
 
-        # Delete novel (cascades to chapters, characters, etc.)
+        # Delete novel (cascades to chapters, characters, etc.; not to the search index)
+        await unindex_novel(db, novel_id)
         await db.execute("DELETE FROM novels WHERE id = ?", (novel_id,))
         await db.commit()
 
@@ -190,10 +352,10 @@ async def delete_novel(novel_id: str):
 @router.get("/{novel_id}/chapters")
 async def get_novel_chapters(novel_id: str):
     """Get all chapters of a novel"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
-            SELECT id, chapter_num, title, word_count, summary
+            SELECT id, chapter_num, title, word_count, summary, summary_model, token_count
             FROM chapters
             WHERE novel_id = ?
             ORDER BY chapter_num
@@ -209,6 +371,56 @@ async def get_novel_chapters(novel_id: str):
                 "title": row[2],
                 "word_count": row[3],
                 "summary": row[4],
+                "summary_model": row[5],
+                "token_count": row[6],
             }
             for row in rows
         ]
+
+
+@router.get("/{novel_id}/chapters/{chapter_id}")
+async def get_chapter(novel_id: str, chapter_id: str):
+    """Get a chapter with its text (decompressed on demand)"""
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            """
+            SELECT id, novel_id, chapter_num, title, word_count, summary, summary_model,
+                   token_count
+            FROM chapters
+            WHERE id = ? AND novel_id = ?
+            """,
+            (chapter_id, novel_id),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Chapter not found")
+        contents = await load_contents(db, [chapter_id])
+
+    return {
+        "id": row[0],
+        "novel_id": row[1],
+        "chapter_num": row[2],
+        "title": row[3],
+        "content": contents.get(chapter_id, ""),
+        "word_count": row[4],
+        "summary": row[5],
+        "summary_model": row[6],
+        "token_count": row[7],
+    }
+
+
+@router.get("/{novel_id}/search", response_model=SearchResponse)
+async def search_novel(
+    novel_id: str,
+    q: str = Query(..., min_length=1, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Search the text of a novel's chapters (space-separated terms must all match)"""
+    async with get_read_db() as db:
+        cursor = await db.execute("SELECT id FROM novels WHERE id = ?", (novel_id,))
+        if not await cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Novel not found")
+
+    result = await search_chapters(novel_id, q, skip, limit)
+    return SearchResponse(query=q, **result)
@@ -7,7 +7,7 @@ from typing import List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from database.sqlite_db import get_db
+from database.sqlite_db import get_read_db
 from services.graph_service import get_graph_service
 
 router = APIRouter()
@@ -36,7 +36,7 @@ class GraphDataResponse(BaseModel):
 @router.get("/{novel_id}", response_model=List[RelationshipResponse])
 async def get_relationships(novel_id: str):
     """Get all relationships for a novel"""
-    async with get_db() as db:
+    async with get_read_db() as db:
         cursor = await db.execute(
             """
             SELECT r.id, r.source_id, r.target_id, 
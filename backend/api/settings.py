@@ -9,7 +9,7 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
 from services.settings_service import get_settings_service
-from services.llm_service import LLMService
+from services.llm_service import get_llm_service
 from utils.logger import get_log_file_path
 
 router = APIRouter()
@@ -42,7 +42,7 @@ async def save_settings(data: Dict[str, Any]):
 async def test_provider(request: LLMTestRequest):
     """Test LLM provider connection"""
     try:
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         success = await llm_service.test_connection(
             provider=request.provider, config=request.config
         )
@@ -59,6 +59,12 @@ async def test_provider(request: LLMTestRequest):
         return {"success": False, "error": str(e)}
 
 
+@router.get("/llm-metrics")
+async def get_llm_metrics():
+    """Get LLM runtime metrics (adaptive concurrency windows, client registry)"""
+    return get_llm_service().get_metrics()
+
+
 @router.get("/logs")
 async def get_logs(lines: int = Query(500, ge=1, le=5000)):
     """Get application logs"""
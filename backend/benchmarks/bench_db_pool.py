@@ -0,0 +1,153 @@
+"""
+Benchmark: pooled WAL connections vs. a fresh SQLite connection per request
+
+Runs the queries behind the analysis status endpoint (read) and the engine's
+progress updates (write) against a temporary database, for
+    1. the old behaviour (new aiosqlite connection and thread per block, rollback journal)
+    2. the connection pool (writer + read-only connections, WAL, tuned pragmas)
+first one request at a time, then with readers polling while an analysis writes.
+
+Usage (from the backend directory):
+    python benchmarks/bench_db_pool.py --requests 500 --readers 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiosqlite  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import sqlite_db  # noqa: E402
+
+TASK_ID = "bench-task"
+STATUS_QUERY = """
+    SELECT id, novel_id, status, progress, progress_message,
+           started_at, completed_at, error_message,
+           units_done, units_total, eta_seconds
+    FROM analysis_tasks WHERE id = ?
+"""
+PROGRESS_UPDATE = "UPDATE analysis_tasks SET progress = ?, progress_message = ? WHERE id = ?"
+
+
+@asynccontextmanager
+async def fresh_connection():
+    """Previous behaviour: every block opens (and closes) its own connection"""
+    db = await aiosqlite.connect(settings.DATABASE_PATH)
+    try:
+        await db.execute("PRAGMA foreign_keys = ON")
+        yield db
+    finally:
+        await db.close()
+
+
+async def prepare(path: Path, wal: bool) -> None:
+    settings.DATABASE_PATH = path
+    await sqlite_db.init_db()
+    async with aiosqlite.connect(path) as db:
+        # init_db switches the file to WAL; the old setup used the rollback journal
+        if not wal:
+            await db.execute("PRAGMA journal_mode = DELETE")
+        await db.execute("INSERT INTO novels (id, title) VALUES ('bench-novel', 'bench')")
+        await db.execute(
+            "INSERT INTO analysis_tasks (id, novel_id, status) "
+            "VALUES (?, 'bench-novel', 'analyzing')",
+            (TASK_ID,),
+        )
+        await db.commit()
+
+
+async def read_status(open_read) -> None:
+    async with open_read() as db:
+        cursor = await db.execute(STATUS_QUERY, (TASK_ID,))
+        await cursor.fetchone()
+
+
+async def write_progress(open_write, step: int) -> None:
+    async with open_write() as db:
+        await db.execute(PROGRESS_UPDATE, (step % 100, f"step {step}", TASK_ID))
+        await db.commit()
+
+
+def summarize(label: str, samples: list) -> float:
+    samples.sort()
+    p50 = statistics.median(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    mean = statistics.mean(samples)
+    print(f"{label:<36} mean {mean:7.2f} ms | p50 {p50:7.2f} | p95 {p95:7.2f}")
+    return mean
+
+
+async def timed(call) -> float:
+    start = time.perf_counter()
+    await call()
+    return (time.perf_counter() - start) * 1000
+
+
+async def sequential(open_read, open_write, requests: int) -> tuple:
+    reads = [await timed(lambda: read_status(open_read)) for _ in range(requests)]
+    writes = [await timed(lambda: write_progress(open_write, i)) for i in range(requests)]
+    return reads, writes
+
+
+async def contended(open_read, open_write, requests: int, readers: int) -> tuple:
+    """`readers` clients poll the status while one analysis writes progress"""
+    reads, writes = [], []
+
+    async def reader():
+        for _ in range(requests // readers):
+            reads.append(await timed(lambda: read_status(open_read)))
+
+    async def writer():
+        for i in range(requests):
+            writes.append(await timed(lambda: write_progress(open_write, i)))
+
+    await asyncio.gather(writer(), *(reader() for _ in range(readers)))
+    return reads, writes
+
+
+async def run_variant(label: str, open_read, open_write, args) -> dict:
+    await read_status(open_read)  # Warm-up
+    reads, writes = await sequential(open_read, open_write, args.requests)
+    results = {
+        "read": summarize(f"{label}: status read", reads),
+        "write": summarize(f"{label}: progress write", writes),
+    }
+    reads, writes = await contended(open_read, open_write, args.requests, args.readers)
+    results["contended read"] = summarize(f"{label}: read during writes", reads)
+    results["contended write"] = summarize(f"{label}: write during reads", writes)
+    return results
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.requests} requests per case, {args.readers} concurrent readers\n")
+
+        await prepare(Path(tmp) / "before.db", wal=False)
+        before = await run_variant("fresh", fresh_connection, fresh_connection, args)
+        print()
+
+        await prepare(Path(tmp) / "after.db", wal=True)
+        settings.DATABASE_READ_CONNECTIONS = args.readers
+        try:
+            after = await run_variant("pooled", sqlite_db.get_read_db, sqlite_db.get_db, args)
+        finally:
+            await sqlite_db.close_db()
+
+        print()
+        for case, old in before.items():
+            print(f"{case:<16} {old:7.2f} ms -> {after[case]:7.2f} ms ({old / after[case]:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500, help="requests per case")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent status readers")
+    asyncio.run(main(parser.parse_args()))
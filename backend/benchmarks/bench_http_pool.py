@@ -0,0 +1,111 @@
+"""
+Benchmark: pooled LLM HTTP client vs. a fresh httpx.AsyncClient per call
+
+Starts a local OpenAI-compatible stub server and measures per-call latency for
+    1. the old behaviour (new client, new TCP connection for every request)
+    2. the shared keep-alive pool used by the providers
+
+Usage (from the backend directory):
+    python benchmarks/bench_http_pool.py --calls 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from llm.http_client import close_http_clients  # noqa: E402
+from llm.providers import OpenAIProvider  # noqa: E402
+
+HOST = "127.0.0.1"
+PORT = 5099
+BASE_URL = f"http://{HOST}:{PORT}/v1"
+MESSAGES = [{"role": "user", "content": "请用一句话总结本章。"}]
+
+stub = FastAPI()
+
+
+@stub.post("/v1/chat/completions")
+async def chat_completions(payload: dict):
+    """Minimal OpenAI-compatible endpoint (streaming and non-streaming)"""
+    if payload.get("stream"):
+
+        async def events():
+            yield 'data: {"choices":[{"delta":{"content":"摘要"}}]}\n\n'
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+    return {"choices": [{"message": {"content": "摘要"}}]}
+
+
+async def fresh_client_call() -> None:
+    """Previous behaviour: every request builds (and tears down) its own client"""
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        response = await client.post(
+            f"{BASE_URL}/chat/completions",
+            headers={"Authorization": "Bearer sk-bench"},
+            json={"model": "stub", "messages": MESSAGES},
+        )
+        response.raise_for_status()
+
+
+async def measure(label: str, call, calls: int) -> list:
+    """Run `calls` sequential requests and return per-call latencies in ms"""
+    # Warm-up so both variants pay import/JIT costs outside the measurement
+    await call()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean {statistics.mean(samples):7.2f} ms | p50 {p50:7.2f} | p95 {p95:7.2f}")
+    return samples
+
+
+async def main(calls: int) -> None:
+    server = uvicorn.Server(uvicorn.Config(stub, host=HOST, port=PORT, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    provider = OpenAIProvider(api_key="sk-bench", model="stub", base_url=BASE_URL)
+
+    async def pooled_call() -> None:
+        await provider.chat(MESSAGES)
+
+    async def pooled_stream_call() -> None:
+        async for _ in provider.stream_chat(MESSAGES):
+            pass
+
+    try:
+        print(f"{calls} sequential calls against {BASE_URL}\n")
+        fresh = await measure("fresh client per call", fresh_client_call, calls)
+        pooled = await measure("pooled client (chat)", pooled_call, calls)
+        await measure("pooled client (stream_chat)", pooled_stream_call, calls)
+
+        saved = statistics.mean(fresh) - statistics.mean(pooled)
+        print(f"\nSaved per call: {saved:.2f} ms ({saved / statistics.mean(fresh):.0%})")
+        print("Note: remote HTTPS endpoints also skip the TLS handshake, so real savings are larger.")
+    finally:
+        await close_http_clients()
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200, help="number of calls per variant")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -0,0 +1,140 @@
+"""
+Benchmark: bulk chapter import vs. one INSERT round trip per chapter
+
+Generates a TXT novel (about --mb megabytes, Chinese text) and times
+    1. parsing alone (decode, split into chapters, word/token counts and hashes)
+    2. the old import (parse everything, then `await db.execute` per chapter)
+    3. the import endpoint (chapters streamed in batches of executemany, one transaction
+       per batch)
+against a temporary database.
+
+Usage (from the backend directory):
+    python benchmarks/bench_import.py --mb 20
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import UploadFile  # noqa: E402
+
+from api.novels import import_novel  # noqa: E402
+from config import settings  # noqa: E402
+from constants import IMPORT_BATCH_SIZE  # noqa: E402
+from database import sqlite_db  # noqa: E402
+from database.chapter_store import (  # noqa: E402
+    index_chapters,
+    index_entry,
+    next_seq,
+    open_packer,
+    save_contents,
+)
+from services.file_parser import FileParser  # noqa: E402
+from utils.text_utils import content_hash, estimate_tokens  # noqa: E402
+
+CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同"
+CHAPTER_LINES = 36
+
+
+def make_novel(megabytes: float) -> bytes:
+    random.seed(0)
+    line_bytes = 61 * 3 + 1
+    chapters = int(megabytes * 1024 * 1024 / (line_bytes * CHAPTER_LINES))
+    parts = []
+    for num in range(1, chapters + 1):
+        parts.append(f"第{num}章 测试")
+        parts.extend(
+            "".join(random.choices(CHARS, k=60)) + "。" for _ in range(CHAPTER_LINES)
+        )
+    return "\n".join(parts).encode("utf-8")
+
+
+async def parse_only(content: bytes) -> int:
+    parsed = await FileParser().parse_stream(content, ".txt", "bench.txt")
+    count = 0
+    for chapter in parsed["chapters"]:
+        estimate_tokens(chapter["content"])
+        content_hash(chapter["title"], chapter["content"])
+        count += 1
+    return count
+
+
+async def old_import(content: bytes) -> None:
+    """Previous behaviour: parse into a list, then insert chapter by chapter"""
+    parsed = await FileParser().parse(content, ".txt", "bench.txt")
+    novel_id = str(uuid.uuid4())
+    async with sqlite_db.get_db() as db:
+        await db.execute("INSERT INTO novels (id, title) VALUES (?, 'bench')", (novel_id,))
+        samples = [chapter["content"] for chapter in parsed["chapters"][:IMPORT_BATCH_SIZE]]
+        packer = await open_packer(db, novel_id, samples)
+        seq = await next_seq(db)
+        for i, chapter in enumerate(parsed["chapters"], 1):
+            chapter_id = str(uuid.uuid4())
+            await db.execute(
+                """
+                INSERT INTO chapters (id, novel_id, chapter_num, seq, title, word_count,
+                                      token_count, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    chapter_id,
+                    novel_id,
+                    i,
+                    seq,
+                    chapter["title"],
+                    chapter["word_count"],
+                    estimate_tokens(chapter["content"]),
+                    content_hash(chapter["title"], chapter["content"]),
+                ),
+            )
+            packer.add(seq, chapter_id, chapter["content"])
+            await save_contents(db, packer.take())
+            await index_chapters(db, [index_entry(seq, chapter["title"], chapter["content"])])
+            seq += 1
+        packer.finish()
+        await save_contents(db, packer.take())
+        await db.commit()
+
+
+async def bulk_import(content: bytes) -> None:
+    await import_novel(UploadFile(file=io.BytesIO(content), filename="bench.txt"))
+
+
+async def timed(label: str, call) -> float:
+    start = time.perf_counter()
+    await call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:7.2f} s")
+    return elapsed
+
+
+async def main(megabytes: float) -> None:
+    content = make_novel(megabytes)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASE_PATH = Path(tmp) / "bench.db"
+        await sqlite_db.init_db()
+        try:
+            chapters = await parse_only(content)
+            print(f"{len(content) / 1024 / 1024:.1f} MB, {chapters} chapters\n")
+            parse = await timed("parse only", lambda: parse_only(content))
+            old = await timed("old import (execute per chapter)", lambda: old_import(content))
+            new = await timed("bulk import (endpoint)", lambda: bulk_import(content))
+        finally:
+            await sqlite_db.close_db()
+
+    print(f"\nBulk import: {new / parse:.2f}x parse time (old: {old / parse:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=float, default=20, help="size of the generated novel")
+    args = parser.parse_args()
+    asyncio.run(main(args.mb))
@@ -0,0 +1,213 @@
+"""
+Benchmark: compressed out-of-row chapter text vs. text inline in the chapters table
+
+Generates a novel of about --chars characters (prose-like: Zipf-distributed words,
+a few recurring names) and stores it
+    1. the old way: plain text in chapters.content, next to the metadata, and a
+       search index keeping its own plain copy
+    2. through the import endpoint: zlib + per-novel dictionary, packed in
+       content_blocks, and a contentless search index
+then compares the space taken by chapter storage, the search index and the whole
+database file, and times metadata queries and loading all chapter texts.
+
+Usage (from the backend directory):
+    python benchmarks/bench_storage.py --chars 5000000
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import UploadFile  # noqa: E402
+
+from api.novels import import_novel  # noqa: E402
+from config import settings  # noqa: E402
+from database import sqlite_db  # noqa: E402
+from database.chapter_store import load_contents  # noqa: E402
+from services.file_parser import FileParser  # noqa: E402
+
+CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同"
+    "工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起"
+    "小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平"
+)
+NAMES = ["林动", "萧炎", "唐三", "韩立", "罗峰", "秦羽"]
+CHAPTER_CHARS = 3000
+OLD_CHAPTERS = """
+CREATE TABLE chapters (
+    id TEXT PRIMARY KEY,
+    novel_id TEXT NOT NULL,
+    chapter_num INTEGER NOT NULL,
+    title TEXT,
+    content TEXT,
+    word_count INTEGER DEFAULT 0,
+    summary TEXT,
+    summary_model TEXT,
+    token_count INTEGER DEFAULT 0,
+    content_hash TEXT
+);
+CREATE INDEX idx_chapters_novel_id ON chapters(novel_id);
+CREATE VIRTUAL TABLE chapters_fts USING fts5(title, content, tokenize = 'trigram');
+"""
+# Tables and indexes holding chapters and their text (the search index aside)
+STORAGE = (
+    "chapters",
+    "sqlite_autoindex_chapters_1",
+    "idx_chapters_novel_id",
+    "idx_chapters_seq",
+    "chapter_contents",
+    "sqlite_autoindex_chapter_contents_1",
+    "content_blocks",
+    "idx_content_blocks_novel_id",
+    "content_dictionaries",
+    "idx_content_dictionaries_novel_id",
+)
+LIST_QUERY = """
+    SELECT id, chapter_num, title, word_count, summary, summary_model, token_count
+    FROM chapters WHERE novel_id = ? ORDER BY chapter_num
+"""
+TOTALS_QUERY = "SELECT COUNT(*), SUM(word_count), SUM(token_count) FROM chapters WHERE novel_id = ?"
+
+
+def make_novel(chars: int) -> bytes:
+    random.seed(0)
+    words = ["".join(random.choices(CHARS, k=random.choice([1, 2, 2, 3]))) for _ in range(3000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    parts = []
+    for num in range(1, chars // CHAPTER_CHARS + 1):
+        body, length = [], 0
+        while length < CHAPTER_CHARS:
+            sentence = "".join(random.choices(words, weights, k=random.randint(4, 12)))
+            if random.random() < 0.3:
+                sentence = random.choice(NAMES) + random.choice(["说道", "笑道", ""]) + sentence
+            body.append(sentence + random.choice("，。。！？"))
+            length += len(body[-1])
+        parts.append(f"第{num}章 测试\n" + "".join(body))
+    return "\n".join(parts).encode("utf-8")
+
+
+def table_sizes(path: Path) -> dict:
+    """Bytes per table or index (pages in use)"""
+    with sqlite3.connect(path) as db:
+        rows = db.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    return dict(rows)
+
+
+def storage_size(sizes: dict) -> int:
+    return sum(sizes.get(name, 0) for name in STORAGE)
+
+
+def index_size(sizes: dict) -> int:
+    return sum(size for name, size in sizes.items() if name.startswith("chapters_fts"))
+
+
+def file_size(path: Path) -> int:
+    """Bytes of the database file, free pages aside"""
+    with sqlite3.connect(path) as db:
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pages = db.execute("PRAGMA page_count").fetchone()[0]
+        free = db.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * db.execute("PRAGMA page_size").fetchone()[0]
+
+
+def old_layout(path: Path, content: bytes) -> str:
+    """Previous behaviour: the text inline in the chapters table, copied into the index"""
+    parsed = asyncio.run(FileParser().parse(content, ".txt", "bench.txt"))
+    novel_id = str(uuid.uuid4())
+    with sqlite3.connect(path) as db:
+        db.executescript(OLD_CHAPTERS)
+        db.executemany(
+            "INSERT INTO chapters (id, novel_id, chapter_num, title, content, word_count) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (str(uuid.uuid4()), novel_id, i, ch["title"], ch["content"], ch["word_count"])
+                for i, ch in enumerate(parsed["chapters"], 1)
+            ],
+        )
+        db.execute(
+            "INSERT INTO chapters_fts (rowid, title, content) "
+            "SELECT rowid, title, content FROM chapters"
+        )
+    return novel_id
+
+
+def time_query(path: Path, sql: str, novel_id: str, runs: int) -> float:
+    with sqlite3.connect(path) as db:
+        db.execute(sql, (novel_id,)).fetchall()
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            db.execute(sql, (novel_id,)).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_old_texts(path: Path, novel_id: str) -> float:
+    with sqlite3.connect(path) as db:
+        start = time.perf_counter()
+        db.execute("SELECT id, content FROM chapters WHERE novel_id = ?", (novel_id,)).fetchall()
+        return (time.perf_counter() - start) * 1000
+
+
+async def new_layout(content: bytes, runs: int) -> tuple:
+    """Import through the endpoint, then time loading every chapter's text"""
+    await sqlite_db.init_db()
+    try:
+        novel = await import_novel(UploadFile(file=io.BytesIO(content), filename="bench.txt"))
+        async with sqlite_db.get_read_db() as db:
+            cursor = await db.execute("SELECT id FROM chapters WHERE novel_id = ?", (novel.id,))
+            ids = [row[0] for row in await cursor.fetchall()]
+            samples = []
+            for _ in range(max(1, runs // 10)):
+                start = time.perf_counter()
+                await load_contents(db, ids)
+                samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await sqlite_db.close_db()
+    return novel.id, statistics.median(samples)
+
+
+def main(chars: int, runs: int) -> None:
+    content = make_novel(chars)
+    print(f"{len(content.decode('utf-8')):,} characters, {len(content) / 1024 / 1024:.1f} MB\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = Path(tmp) / "old.db"
+        old_id = old_layout(old_path, content)
+        settings.DATABASE_PATH = Path(tmp) / "new.db"
+        new_id, new_texts = asyncio.run(new_layout(content, runs))
+
+        old_sizes, new_sizes = table_sizes(old_path), table_sizes(settings.DATABASE_PATH)
+        mb = 1024 * 1024
+        for label, old, new in (
+            ("chapter storage", storage_size(old_sizes), storage_size(new_sizes)),
+            ("  chapters table", old_sizes["chapters"], new_sizes["chapters"]),
+            ("search index", index_size(old_sizes), index_size(new_sizes)),
+            ("database file", file_size(old_path), file_size(settings.DATABASE_PATH)),
+        ):
+            print(f"{label:<16} {old / mb:7.1f} -> {new / mb:6.1f} MB ({old / new:.1f}x smaller)")
+        print()
+
+        for label, sql in (("chapter list", LIST_QUERY), ("chapter totals", TOTALS_QUERY)):
+            old = time_query(old_path, sql, old_id, runs)
+            new = time_query(settings.DATABASE_PATH, sql, new_id, runs)
+            print(f"{label:<16} {old:7.2f} ms -> {new:6.2f} ms ({old / new:.1f}x)")
+        old = time_old_texts(old_path, old_id)
+        print(f"{'all texts':<16} {old:7.2f} ms -> {new_texts:6.2f} ms (plain read -> decompress)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chars", type=int, default=5_000_000, help="size of the novel")
+    parser.add_argument("--runs", type=int, default=50, help="timed runs per query")
+    args = parser.parse_args()
+    main(args.chars, args.runs)
@@ -25,6 +25,9 @@ class Settings(BaseSettings):
     # Database paths
     DATA_DIR: Path = Path.home() / ".novelmind"
     DATABASE_PATH: Path = DATA_DIR / "novelmind.db"
+    LLM_CACHE_PATH: Path = DATA_DIR / "llm_cache.db"
+    # Read-only connections kept open next to the single writer connection
+    DATABASE_READ_CONNECTIONS: int = 4
 
     # OpenAI settings
     OPENAI_API_KEY: Optional[str] = None
@@ -65,6 +68,36 @@ class Settings(BaseSettings):
 
     # Default LLM provider
     DEFAULT_LLM_PROVIDER: str = "openai"
+    # Comma-separated failover order, used when settings.json has no "fallbackProviders"
+    LLM_FALLBACK_PROVIDERS: str = ""
+    # Send a duplicate request when a call is slow to start (overridden by "hedgeRequests")
+    LLM_HEDGING: bool = False
+
+    # Share of the model's context window filled with input text (the rest is left
+    # for the prompt template and the response)
+    LLM_CONTEXT_SHARE: float = 0.6
+
+    # Persistent LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_MB: int = 256
+    LLM_CACHE_TTL_DAYS: float = 30.0
+
+    # Resume analysis tasks interrupted by a restart automatically (else via the API)
+    ANALYSIS_AUTO_RESUME: bool = False
+    # Analyses run at once (the rest wait in the queue); per process with worker processes
+    ANALYSIS_WORKERS: int = 2
+    # Run analyses in this many separate processes (0: on the API's event loop)
+    ANALYSIS_WORKER_PROCESSES: int = 0
+    # LLM calls in flight per provider, shared by all running analyses
+    ANALYSIS_PROVIDER_CONCURRENCY: int = 16
+
+    # LLM HTTP connection pool (shared by all providers on the same API origin)
+    LLM_HTTP_TIMEOUT: float = 120.0
+    LLM_HTTP_CONNECT_TIMEOUT: float = 10.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 50
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP2: bool = True  # Only takes effect when the optional `h2` package is installed
 
     class Config:
         env_file = ".env"
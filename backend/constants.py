@@ -5,6 +5,8 @@ Centralized constants for the backend
 # Encoding related
 COMMON_ENCODINGS = ["utf-8", "gbk", "gb18030", "big5", "latin-1"]
 CHINESE_ENCODINGS = ["utf-8", "gbk", "gb2312", "gb18030", "big5"]
+# Bytes inspected to detect a file's encoding (detection is slow; decoding validates it)
+ENCODING_DETECT_SAMPLE_SIZE = 64 * 1024
 
 # Chinese character pattern
 CHINESE_CHAR_PATTERN = r"[\u4e00-\u9fff]"
@@ -48,8 +50,154 @@ ANALYSIS_SUMMARY_LIMITS = {
     "deep": -1,
 }
 
+# Relative cost of each analysis stage, used to weight overall task progress
+ANALYSIS_STAGE_WEIGHTS = {
+    "characters": 3.0,
+    "relationships": 2.0,
+    "plot": 1.0,
+    "summary": 3.0,
+}
+# Seconds the cancel endpoint waits for a task to abort its in-flight LLM calls
+ANALYSIS_CANCEL_TIMEOUT = 5.0
+
+# Analysis job queue: lower priority values run first (interactive quick runs before bulk)
+ANALYSIS_DEPTH_PRIORITY = {
+    "quick": 0,
+    "standard": 1,
+    "deep": 2,
+}
+ANALYSIS_LEASE_TTL = 60.0  # A job whose lease is not renewed for this long is recovered
+ANALYSIS_HEARTBEAT_INTERVAL = 15.0
+ANALYSIS_QUEUE_POLL_INTERVAL = 2.0  # Idle workers also check the queue this often
+# Worker processes: how often a running job checks whether it was cancelled through the API
+ANALYSIS_CANCEL_POLL_INTERVAL = 1.0
+WORKER_PROCESS_CHECK_INTERVAL = 1.0  # Checks for the stop signal / a dead API process
+WORKER_PROCESS_STOP_TIMEOUT = 10.0
+
+# Task progress is published to event subscribers as it happens, but written to the
+# database at most this often (and whenever the stage message changes)
+ANALYSIS_PROGRESS_STORE_INTERVAL = 2.0
+# Seconds of finished calls the ETA's throughput (tokens/s, calls/s) is measured over
+ANALYSIS_ETA_WINDOW = 120.0
+TASK_EVENT_QUEUE_SIZE = 256  # Events buffered per subscriber before the oldest are dropped
+TASK_EVENT_KEEPALIVE = 15.0  # Seconds between SSE keep-alive comments
+TASK_EVENT_POLL_INTERVAL = 1.0  # With worker processes, SSE streams read the database instead
+# Progress message stored with a final task status (replacing the last stage's message)
+TASK_FINAL_MESSAGES = {"completed": "分析完成", "failed": "分析失败", "cancelled": "已取消"}
+
+# Map-reduce character extraction (whole novel, used for "deep" analysis by default)
+CHARACTER_CHUNK_MAX_TOKENS = 24000  # Smaller chunks extract minor characters more reliably
+CHARACTER_EVIDENCE_LIMIT = 50  # Per-chunk evidence entries kept per character
+
+# Titles and forms of address shared by many characters; never used to merge two entities
+GENERIC_CHARACTER_TITLES = set(
+    "师父 师傅 师兄 师姐 师弟 师妹 公子 小姐 少爷 老爷 夫人 大人 姑娘 前辈 掌门 宗主 少主 "
+    "陛下 殿下 皇上 大哥 二哥 大姐 老大 先生 太太 娘子 相公 父亲 母亲 哥哥 姐姐 弟弟 妹妹 "
+    "老师 主人".split()
+)
+
+# Tokenizer calibration per model family, matched in order as a substring of the
+# lower-cased model name: (tokens per CJK character, other characters per token).
+# Approximations of each tokenizer on Chinese fiction, rounded up so prompts never overflow.
+TOKENIZER_CALIBRATION = [
+    ("gpt-4o", 0.8, 4.0),
+    ("gpt-4", 1.1, 4.0),
+    ("gpt-3.5", 1.1, 4.0),
+    ("claude", 1.2, 3.5),
+    ("gemini", 0.8, 4.0),
+    ("deepseek", 0.65, 3.8),
+    ("qwen", 0.7, 3.8),
+    ("glm", 0.7, 3.8),
+    ("ernie", 0.7, 3.8),
+    ("llama3", 1.0, 4.0),
+    ("mistral", 1.5, 3.5),
+]
+DEFAULT_TOKENIZER_CALIBRATION = (1.0, 4.0)
+
+# Context window (tokens) per model family, matched like TOKENIZER_CALIBRATION.
+# A per-provider "contextWindow" setting overrides these (e.g. for custom endpoints).
+MODEL_CONTEXT_WINDOWS = [
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5", 16385),
+    ("claude", 200000),
+    ("gemini-1.5", 1000000),
+    ("gemini", 32760),
+    ("deepseek", 64000),
+    ("qwen-max", 32768),
+    ("qwen2.5", 131072),
+    ("qwen2", 32768),
+    ("qwen", 131072),
+    ("glm", 128000),
+    ("ernie", 8192),
+    ("llama3", 8192),
+    ("mistral", 32768),
+]
+DEFAULT_CONTEXT_WINDOW = 8192
+# Tokens set aside for the instructions wrapped around the novel text in a prompt
+PROMPT_TEMPLATE_TOKENS = 600
+
+# SQLite connection tuning (see database/sqlite_db.py)
+SQLITE_BUSY_TIMEOUT_MS = 5000  # Wait this long for another process' write lock
+SQLITE_CACHE_SIZE_KB = 32768  # Page cache per connection
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+# Analysis writes are committed in batches (see database/write_queue.py)
+WRITE_BATCH_MAX_SIZE = 256  # Writes per transaction
+WRITE_BATCH_MAX_DELAY = 0.05  # Seconds a background write waits for more writes to batch
+
+# Full-text search (see services/search_service.py)
+SEARCH_TRIGRAM_LENGTH = 3  # Shorter terms are looked up in the short-term index instead
+SEARCH_SNIPPET_CHARS = 120
+
+# Chapter text storage (see database/chapter_store.py)
+CONTENT_COMPRESSION_LEVEL = 6  # zlib level
+CONTENT_DICTIONARY_SIZE = 32 * 1024  # Preset dictionary per novel (zlib's window)
+CONTENT_BLOCK_SIZE = 64 * 1024  # Compressed chapters are packed into blocks this big
+IMPORT_BATCH_SIZE = 100  # Chapters compressed and inserted per batch on import
+
 # Concurrency limits
+# Initial in-flight window per provider/model; adapted at runtime (AIMD) within min/max
 MAX_CONCURRENT_LLM_REQUESTS = 5
+LLM_CONCURRENCY_MIN = 1
+LLM_CONCURRENCY_MAX = 32
+LLM_CONCURRENCY_DECREASE_FACTOR = 0.5
+LLM_LATENCY_SPIKE_FACTOR = 3.0  # Time-to-first-token above 3x its average counts as overload
+LLM_TTFT_WINDOW = 200  # Recent time-to-first-token samples kept per provider/model
+
+# Maximum number of provider clients kept alive in the process-wide registry
+LLM_CLIENT_REGISTRY_SIZE = 32
+
+# LLM retry policy (see llm/retry.py)
+LLM_RETRY_MAX_ATTEMPTS = 4
+LLM_RETRY_BASE_DELAY = 1.0  # Seconds
+LLM_RETRY_MAX_DELAY = 60.0  # Cap for jittered backoff (Retry-After hints may exceed it)
+LLM_CALL_DEADLINE = 600.0  # Total seconds per call, including all retries
+
+# Hedged requests (see llm/hedging.py)
+LLM_HEDGE_PERCENTILE = 0.9  # Hedge once a call is slower to first token than this percentile
+LLM_HEDGE_MIN_SAMPLES = 20  # TTFT samples needed before hedging kicks in
+LLM_HEDGE_BUDGET_RATIO = 0.1  # At most this many hedges per primary call
+
+# Version of each analysis prompt, part of the response cache key.
+# Bump when a prompt template changes so stale cached responses are not reused.
+PROMPT_VERSIONS = {
+    "characters": "1",
+    "relationships": "1",
+    "summary": "1",
+    "plot_events": "1",
+}
+
+# Per-provider circuit breaker (see llm/circuit_breaker.py)
+LLM_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive transient failures before opening
+LLM_BREAKER_RECOVERY_TIMEOUT = 30.0  # Seconds open before a half-open probe is allowed
+
+# Provider rate limits (rpm/tpm from each provider's settings)
+RATE_LIMIT_SAFETY_MARGIN = 0.9  # Aim just under the quota
+RATE_LIMIT_BURST_SECONDS = 10  # Bucket capacity, in seconds of budget
+
+# Seconds between settings file mtime checks (settings are cached in memory)
+SETTINGS_MTIME_CHECK_INTERVAL = 1.0
 
 # File Parser patterns
 CHAPTER_PATTERNS = [
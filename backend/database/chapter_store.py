@@ -0,0 +1,255 @@
+"""
+Chapter text storage - zlib-compressed chapter bodies, kept out of the chapters table
+"""
+
+import asyncio
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from constants import CONTENT_BLOCK_SIZE, CONTENT_COMPRESSION_LEVEL, CONTENT_DICTIONARY_SIZE
+
+# Ids per query when loading texts (well below SQLite's variable limit)
+_LOAD_CHUNK = 500
+
+
+def build_dictionary(samples: Sequence[str]) -> bytes:
+    """A preset dictionary for a novel: an equal slice of each sample chapter.
+
+    Chapters of a novel share names, places and turns of phrase, which a chapter
+    compressed on its own cannot reuse; primed with this dictionary, zlib can.
+    """
+    texts = [text.encode("utf-8") for text in samples if text]
+    if not texts:
+        return b""
+    size = max(1, CONTENT_DICTIONARY_SIZE // len(texts))
+    # zlib favours the end of the dictionary: later slices stay within reach longer
+    return b"".join(text[len(text) // 4 :][:size] for text in texts)[-CONTENT_DICTIONARY_SIZE:]
+
+
+class ContentCodec:
+    """Compresses and restores chapter text with a novel's preset dictionary"""
+
+    def __init__(self, dictionary: bytes = b""):
+        self.dictionary = dictionary
+        if dictionary:
+            self._compressor = zlib.compressobj(CONTENT_COMPRESSION_LEVEL, zdict=dictionary)
+        else:
+            self._compressor = zlib.compressobj(CONTENT_COMPRESSION_LEVEL)
+
+    def compress(self, text: str) -> bytes:
+        # Copies of a primed compressor skip loading the dictionary for every chapter
+        compressor = self._compressor.copy()
+        return compressor.compress((text or "").encode("utf-8")) + compressor.flush()
+
+    def decompress(self, data: bytes) -> str:
+        if self.dictionary:
+            decompressor = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+
+@dataclass
+class ContentRows:
+    """Rows of content_blocks and chapter_contents, ready to insert (blocks first)"""
+
+    blocks: List[tuple] = field(default_factory=list)
+    contents: List[tuple] = field(default_factory=list)
+
+
+class ContentPacker:
+    """Compresses a novel's chapters and packs them into blocks.
+
+    Each chapter is compressed on its own, so it can be read alone, and appended to a
+    block of about CONTENT_BLOCK_SIZE bytes. A row per chapter would waste a third of
+    the space: a compressed chapter (a few KB) rarely fits twice in a database page.
+    """
+
+    def __init__(self, novel_id: str, codec: ContentCodec, dictionary_id: int, block_id: int):
+        self.novel_id = novel_id
+        self.codec = codec
+        self.dictionary_id = dictionary_id
+        self.block_id = block_id
+        self._block = bytearray()
+        self._pending: List[tuple] = []  # Chapters in the open block
+        self._rows = ContentRows()
+
+    def add(self, seq: int, chapter_id: str, text: str) -> None:
+        """Compress a chapter's text (seq: the chapter's seq, its chapter_contents id)"""
+        data = self.codec.compress(text)
+        self._pending.append((seq, chapter_id, self.block_id, len(self._block), len(data)))
+        self._block += data
+        if len(self._block) >= CONTENT_BLOCK_SIZE:
+            self.finish()
+
+    def finish(self) -> None:
+        """Close the open block (once all chapters are added)"""
+        if not self._pending:
+            return
+        self._rows.blocks.append(
+            (self.block_id, self.novel_id, self.dictionary_id, bytes(self._block))
+        )
+        self._rows.contents.extend(self._pending)
+        self.block_id += 1
+        self._block = bytearray()
+        self._pending = []
+
+    def take(self) -> ContentRows:
+        """Rows of the blocks closed since the last call"""
+        rows, self._rows = self._rows, ContentRows()
+        return rows
+
+
+async def open_packer(
+    db: aiosqlite.Connection, novel_id: str, samples: Sequence[str]
+) -> ContentPacker:
+    """Store a dictionary built from `samples` and return a packer for the novel.
+
+    Call inside the write transaction that saves the rows (block ids are taken here).
+    """
+    dictionary = build_dictionary(samples)
+    cursor = await db.execute(
+        "INSERT INTO content_dictionaries (novel_id, data) VALUES (?, ?)", (novel_id, dictionary)
+    )
+    dictionary_id = cursor.lastrowid
+    cursor = await db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM content_blocks")
+    block_id = (await cursor.fetchone())[0]
+    return ContentPacker(novel_id, ContentCodec(dictionary), dictionary_id, block_id)
+
+
+async def next_seq(db: aiosqlite.Connection) -> int:
+    """First free chapter seq (call inside the write transaction that uses it)"""
+    cursor = await db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM chapters")
+    return (await cursor.fetchone())[0]
+
+
+async def save_contents(db: aiosqlite.Connection, rows: ContentRows) -> None:
+    await db.executemany(
+        "INSERT INTO content_blocks (id, novel_id, dictionary_id, data) VALUES (?, ?, ?, ?)",
+        rows.blocks,
+    )
+    await db.executemany(
+        """
+        INSERT INTO chapter_contents (id, chapter_id, block_id, block_offset, length)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        rows.contents,
+    )
+
+
+async def load_contents(db: aiosqlite.Connection, chapter_ids: Sequence[str]) -> Dict[str, str]:
+    """Texts of the given chapters (chapter id -> text), decompressed off the event loop"""
+    located: List[tuple] = []
+    for start in range(0, len(chapter_ids), _LOAD_CHUNK):
+        chunk = list(chapter_ids[start : start + _LOAD_CHUNK])
+        cursor = await db.execute(
+            f"""
+            SELECT chapter_id, block_id, block_offset, length FROM chapter_contents
+            WHERE chapter_id IN ({", ".join("?" * len(chunk))})
+            """,
+            chunk,
+        )
+        located.extend(await cursor.fetchall())
+
+    blocks: Dict[int, tuple] = {}
+    block_ids = list({row[1] for row in located})
+    for start in range(0, len(block_ids), _LOAD_CHUNK):
+        chunk = block_ids[start : start + _LOAD_CHUNK]
+        cursor = await db.execute(
+            f"""
+            SELECT id, dictionary_id, data FROM content_blocks
+            WHERE id IN ({", ".join("?" * len(chunk))})
+            """,
+            chunk,
+        )
+        for block_id, dictionary_id, data in await cursor.fetchall():
+            blocks[block_id] = (dictionary_id, data)
+
+    codecs: Dict[Optional[int], ContentCodec] = {None: ContentCodec()}
+    dictionary_ids = list({dictionary_id for dictionary_id, _ in blocks.values()} - {None})
+    if dictionary_ids:
+        cursor = await db.execute(
+            f"""
+            SELECT id, data FROM content_dictionaries
+            WHERE id IN ({", ".join("?" * len(dictionary_ids))})
+            """,
+            dictionary_ids,
+        )
+        for dictionary_id, data in await cursor.fetchall():
+            codecs[dictionary_id] = ContentCodec(data)
+
+    def decompress() -> Dict[str, str]:
+        texts = {}
+        for chapter_id, block_id, offset, length in located:
+            dictionary_id, data = blocks[block_id]
+            texts[chapter_id] = codecs[dictionary_id].decompress(
+                memoryview(data)[offset : offset + length]
+            )
+        return texts
+
+    return await asyncio.to_thread(decompress)
+
+
+def short_terms(title: str, text: str) -> str:
+    """Every 1- and 2-character substring of a chapter's title and text, space-separated.
+
+    What the short-term search index stores for the chapter (see database.sqlite_db).
+    """
+    terms = set()
+    for word in f"{title or ''} {text or ''}".split():
+        terms.update(word)
+        terms.update(map(str.__add__, word, word[1:]))
+    return " ".join(sorted(terms))
+
+
+def index_entry(seq: int, title: str, text: str) -> Tuple[int, str, str, str]:
+    """A chapter's search index entry (CPU-bound for long texts: build off the event loop)"""
+    return seq, title, text, short_terms(title, text)
+
+
+async def index_chapters(db: aiosqlite.Connection, entries: Sequence[tuple]) -> None:
+    """Add chapters to the search index (entries from index_entry)"""
+    await db.executemany(
+        "INSERT INTO chapters_fts (rowid, title, content) VALUES (?, ?, ?)",
+        [(seq, title, text) for seq, title, text, _ in entries],
+    )
+    await db.executemany(
+        "INSERT INTO chapters_fts_short (rowid, terms) VALUES (?, ?)",
+        [(seq, terms) for seq, _, _, terms in entries],
+    )
+
+
+async def unindex_novel(db: aiosqlite.Connection, novel_id: str) -> None:
+    """Remove a novel's chapters from the search index (before deleting the novel).
+
+    The index keeps no copy of the text, so deleting an entry means handing it the
+    title and text it was indexed with, which only this store has. A chapter is
+    indexed together with its text, so chapters without one have no entry.
+    """
+    cursor = await db.execute("SELECT id, seq, title FROM chapters WHERE novel_id = ?", (novel_id,))
+    rows = await cursor.fetchall()
+    texts = await load_contents(db, [row[0] for row in rows])
+    entries = await asyncio.to_thread(
+        lambda: [
+            index_entry(seq, title, texts[chapter_id])
+            for chapter_id, seq, title in rows
+            if chapter_id in texts
+        ]
+    )
+    await db.executemany(
+        """
+        INSERT INTO chapters_fts (chapters_fts, rowid, title, content)
+        VALUES ('delete', ?, ?, ?)
+        """,
+        [(seq, title, text) for seq, title, text, _ in entries],
+    )
+    await db.executemany(
+        """
+        INSERT INTO chapters_fts_short (chapters_fts_short, rowid, terms)
+        VALUES ('delete', ?, ?)
+        """,
+        [(seq, terms) for seq, _, _, terms in entries],
+    )
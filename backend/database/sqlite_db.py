@@ -2,11 +2,28 @@
 SQLite database operations
 """
 
-import aiosqlite
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
 
 from config import settings
+from constants import (
+    IMPORT_BATCH_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+)
+from database.chapter_store import (
+    index_chapters,
+    index_entry,
+    load_contents,
+    open_packer,
+    save_contents,
+)
+from utils.text_utils import content_hash, estimate_tokens
 
 
 # Database schema
@@ -24,15 +41,45 @@ CREATE TABLE IF NOT EXISTS novels (
     total_words INTEGER DEFAULT 0
 );
 
--- 章节表
+-- 章节表（seq 为章节的整数编号，正文位置表与全文索引以它关联章节）
 CREATE TABLE IF NOT EXISTS chapters (
     id TEXT PRIMARY KEY,
     novel_id TEXT NOT NULL,
     chapter_num INTEGER NOT NULL,
+    seq INTEGER,
     title TEXT,
-    content TEXT,
     word_count INTEGER DEFAULT 0,
     summary TEXT,
+    summary_model TEXT,
+    token_count INTEGER DEFAULT 0,
+    content_hash TEXT,
+    FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
+);
+
+-- 章节正文块表（各章正文分别经 zlib 压缩后依次拼接成块，与章节元数据分开存放）
+CREATE TABLE IF NOT EXISTS content_blocks (
+    id INTEGER PRIMARY KEY,
+    novel_id TEXT NOT NULL,
+    dictionary_id INTEGER,
+    data BLOB NOT NULL,
+    FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
+);
+
+-- 章节正文位置表（正文在块中的位置，按需读取解压；id 即章节的 seq）
+CREATE TABLE IF NOT EXISTS chapter_contents (
+    id INTEGER PRIMARY KEY,
+    chapter_id TEXT NOT NULL UNIQUE,
+    block_id INTEGER NOT NULL,
+    block_offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    FOREIGN KEY (chapter_id) REFERENCES chapters(id) ON DELETE CASCADE
+);
+
+-- 压缩预置字典表（每部小说一份，取自其章节）
+CREATE TABLE IF NOT EXISTS content_dictionaries (
+    id INTEGER PRIMARY KEY,
+    novel_id TEXT NOT NULL,
+    data BLOB NOT NULL,
     FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
 );
 
@@ -46,6 +93,7 @@ CREATE TABLE IF NOT EXISTS characters (
     personality TEXT,
     first_appearance INTEGER,
     importance_score REAL DEFAULT 0.5,
+    evidence TEXT,
     FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
 );
 
@@ -96,6 +144,36 @@ CREATE TABLE IF NOT EXISTS analysis_tasks (
     started_at TEXT,
     completed_at TEXT,
     error_message TEXT,
+    served_by TEXT,
+    config TEXT,
+    completed_stages TEXT,
+    priority INTEGER DEFAULT 1,
+    dedup_key TEXT,
+    enqueued_at TEXT,
+    lease_owner TEXT,
+    lease_expires_at TEXT,
+    attempts INTEGER DEFAULT 0,
+    units_done INTEGER,
+    units_total INTEGER,
+    eta_seconds REAL,
+    FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
+);
+
+-- 分析产物表（按章节输入记录的中间结果，供增量分析复用）
+CREATE TABLE IF NOT EXISTS analysis_artifacts (
+    id TEXT PRIMARY KEY,
+    novel_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    chapter_start INTEGER,
+    chapter_end INTEGER,
+    inputs TEXT NOT NULL,
+    prompt_version TEXT,
+    model TEXT,
+    served_by TEXT,
+    data TEXT,
+    task_id TEXT,
+    part TEXT,
+    created_at TEXT DEFAULT (datetime('now')),
     FOREIGN KEY (novel_id) REFERENCES novels(id) ON DELETE CASCADE
 );
 
@@ -107,8 +185,47 @@ CREATE INDEX IF NOT EXISTS idx_relationships_source_id ON relationships(source_i
 CREATE INDEX IF NOT EXISTS idx_relationships_target_id ON relationships(target_id);
 CREATE INDEX IF NOT EXISTS idx_plot_events_novel_id ON plot_events(novel_id);
 CREATE INDEX IF NOT EXISTS idx_analysis_tasks_novel_id ON analysis_tasks(novel_id);
+CREATE INDEX IF NOT EXISTS idx_analysis_artifacts_novel_kind ON analysis_artifacts(novel_id, kind);
+CREATE INDEX IF NOT EXISTS idx_content_blocks_novel_id ON content_blocks(novel_id);
+CREATE INDEX IF NOT EXISTS idx_content_dictionaries_novel_id ON content_dictionaries(novel_id);
 """
 
+# Indexes on columns added by migrations (created after _ensure_columns)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_analysis_tasks_queue
+    ON analysis_tasks(status, priority, enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_analysis_tasks_dedup_key ON analysis_tasks(dedup_key);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chapters_seq ON chapters(seq);
+"""
+
+# Full-text index of chapter titles and text. The trigram tokenizer matches any
+# substring of 3+ characters, which suits Chinese (no word boundaries). The rowid of
+# an entry is the chapter's seq. The index is contentless: it stores only the trigrams,
+# not a copy of the text (chapter_contents has it, compressed). The importer adds the
+# entries, and deleting a novel removes them (database.chapter_store.unindex_novel):
+# without contentless_delete (SQLite 3.43+), an entry can only be deleted by passing
+# the values it was indexed with, which a trigger has no access to.
+# Terms of 1-2 characters are too short for trigrams. chapters_fts_short holds every
+# 1- and 2-character substring of a chapter as a token of its own (see
+# database.chapter_store.short_terms): such a term is found by a token lookup. Only
+# whitespace separates tokens, and no positions are kept (detail = none).
+SEARCH_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chapters_fts USING fts5(
+    title, content, content = '', tokenize = 'trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chapters_fts_short USING fts5(
+    terms, content = '', detail = none, columnsize = 0,
+    tokenize = "unicode61 remove_diacritics 0 categories 'L* M* N* P* S* Co'"
+);
+"""
+# Triggers of the search index before it became contentless
+_LEGACY_SEARCH_TRIGGERS = (
+    "chapters_fts_insert",
+    "chapters_fts_update",
+    "chapters_fts_delete",
+    "chapters_fts_title",
+)
+
 
 async def init_db():
     """Initialize the database with schema"""
@@ -118,35 +235,297 @@ async def init_db():
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
     async with aiosqlite.connect(db_path) as db:
-        # Enable foreign keys
-        await db.execute("PRAGMA foreign_keys = ON")
+        # Foreign keys, WAL journal (persists in the file) and the other tuning pragmas
+        await _configure(db)
 
         # Create tables
         await db.executescript(SCHEMA)
         await db.commit()
 
-        # Check if progress_message column exists (for migration)
-        cursor = await db.execute("PRAGMA table_info(analysis_tasks)")
-        columns = await cursor.fetchall()
-        column_names = [col[1] for col in columns]
+        # Add columns introduced after the first release (for migration)
+        await _ensure_columns(
+            db,
+            "analysis_tasks",
+            {
+                "progress_message": "TEXT DEFAULT '准备中...'",
+                "served_by": "TEXT",
+                "config": "TEXT",
+                "completed_stages": "TEXT",
+                "priority": "INTEGER DEFAULT 1",
+                "dedup_key": "TEXT",
+                "enqueued_at": "TEXT",
+                "lease_owner": "TEXT",
+                "lease_expires_at": "TEXT",
+                "attempts": "INTEGER DEFAULT 0",
+                "units_done": "INTEGER",
+                "units_total": "INTEGER",
+                "eta_seconds": "REAL",
+            },
+        )
+        added = await _ensure_columns(
+            db,
+            "chapters",
+            {
+                "summary_model": "TEXT",
+                "token_count": "INTEGER DEFAULT 0",
+                "content_hash": "TEXT",
+                "seq": "INTEGER",
+            },
+        )
+        if "token_count" in added:
+            await _backfill_token_counts(db)
+        if "content_hash" in added:
+            await _backfill_content_hashes(db)
+        if "seq" in added:
+            await _backfill_chapter_seqs(db)
+        await _ensure_columns(db, "characters", {"evidence": "TEXT"})
+        await _ensure_columns(db, "analysis_artifacts", {"task_id": "TEXT", "part": "TEXT"})
+
+        await db.executescript(INDEXES)
+
+        rebuild = await _drop_legacy_search_index(db)
+        await db.executescript(SEARCH_INDEX)
+        moved = await _move_chapter_contents(db, index=rebuild)
+        if rebuild and not moved:
+            await _index_stored_chapters(db)
+        await db.commit()
+        if moved or rebuild:
+            # Give the space of the plain text back to the file system (once)
+            await db.execute("VACUUM")
+
+
+async def _ensure_columns(db: aiosqlite.Connection, table: str, columns: dict) -> list:
+    """Add missing columns to an existing table, returning the names added"""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    column_names = [col[1] for col in await cursor.fetchall()]
+
+    added = []
+    for name, definition in columns.items():
+        if name not in column_names:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    await db.commit()
+    return added
+
+
+async def _backfill_token_counts(db: aiosqlite.Connection):
+    """Estimate token counts of chapters imported before the column existed"""
+    cursor = await db.execute("SELECT id, content FROM chapters")
+    rows = await cursor.fetchall()
+    await db.executemany(
+        "UPDATE chapters SET token_count = ? WHERE id = ?",
+        [(estimate_tokens(content or ""), chapter_id) for chapter_id, content in rows],
+    )
+    await db.commit()
+
 
-        if 'progress_message' not in column_names:
-            await db.execute(
-                "ALTER TABLE analysis_tasks ADD COLUMN progress_message TEXT DEFAULT '准备中...'"
+async def _backfill_content_hashes(db: aiosqlite.Connection):
+    """Fingerprint chapters imported before incremental analysis existed"""
+    cursor = await db.execute("SELECT id, title, content FROM chapters")
+    rows = await cursor.fetchall()
+    await db.executemany(
+        "UPDATE chapters SET content_hash = ? WHERE id = ?",
+        [(content_hash(title, content), chapter_id) for chapter_id, title, content in rows],
+    )
+    await db.commit()
+
+
+async def _backfill_chapter_seqs(db: aiosqlite.Connection):
+    """Number chapters stored before the seq column existed.
+
+    Chapters whose text is already in chapter_contents take its id; the others (text
+    still inline) take their rowid, which nothing else refers to yet.
+    """
+    await db.execute(
+        "UPDATE chapters SET seq = (SELECT id FROM chapter_contents WHERE chapter_id = chapters.id)"
+    )
+    await db.execute("UPDATE chapters SET seq = rowid WHERE seq IS NULL")
+    await db.commit()
+
+
+async def _drop_legacy_search_index(db: aiosqlite.Connection) -> bool:
+    """Drop a search index that keeps its own copy of the text (with its triggers), or
+    that has no short-term table.
+
+    Returns whether the (contentless) index has to be filled, i.e. it did not exist.
+    """
+    cursor = await db.execute(
+        "SELECT name, sql FROM sqlite_master WHERE name IN ('chapters_fts', 'chapters_fts_short')"
+    )
+    tables = dict(await cursor.fetchall())
+    if "content = ''" in tables.get("chapters_fts", "") and "chapters_fts_short" in tables:
+        return False
+    for trigger in _LEGACY_SEARCH_TRIGGERS:
+        await db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    await db.execute("DROP TABLE IF EXISTS chapters_fts")
+    await db.execute("DROP TABLE IF EXISTS chapters_fts_short")
+    await db.commit()
+    return True
+
+
+async def _index_stored_chapters(db: aiosqlite.Connection):
+    """Add the chapters whose text is already compressed to the search index"""
+    cursor = await db.execute("SELECT DISTINCT novel_id FROM chapters")
+    for (novel_id,) in await cursor.fetchall():
+        cursor = await db.execute(
+            "SELECT id, seq, title FROM chapters WHERE novel_id = ?", (novel_id,)
+        )
+        rows = await cursor.fetchall()
+        texts = await load_contents(db, [row[0] for row in rows])
+        await index_chapters(
+            db,
+            [
+                index_entry(seq, title, texts[chapter_id])
+                for chapter_id, seq, title in rows
+                if chapter_id in texts
+            ],
+        )
+    await db.commit()
+
+
+async def _move_chapter_contents(db: aiosqlite.Connection, index: bool) -> bool:
+    """Compress the text of chapters stored inline (in chapters.content).
+
+    Each chapter's text moves to a content block, located by a chapter_contents row with
+    the chapter's seq as id, then the content column is dropped. With `index`, the text
+    is also added to the search index (created just now). Returns whether anything was
+    moved.
+    """
+    cursor = await db.execute("PRAGMA table_info(chapters)")
+    if "content" not in [col[1] for col in await cursor.fetchall()]:
+        return False
+
+    cursor = await db.execute("SELECT DISTINCT novel_id FROM chapters")
+    for (novel_id,) in await cursor.fetchall():
+        cursor = await db.execute(
+            """
+            SELECT seq, id, title, content FROM chapters
+            WHERE novel_id = ? ORDER BY chapter_num
+            """,
+            (novel_id,),
+        )
+        rows = await cursor.fetchall()
+        packer = await open_packer(db, novel_id, [row[3] or "" for row in rows[:IMPORT_BATCH_SIZE]])
+        for seq, chapter_id, _, text in rows:
+            packer.add(seq, chapter_id, text)
+        packer.finish()
+        await save_contents(db, packer.take())
+        if index:
+            await index_chapters(
+                db, [index_entry(seq, title, text or "") for seq, _, title, text in rows]
             )
-            await db.commit()
+
+    await db.execute("ALTER TABLE chapters DROP COLUMN content")
+    await db.commit()
+    return True
+
+
+class ConnectionPool:
+    """One writer connection and a few read-only connections, kept open.
+
+    The database runs in WAL mode, so readers never wait for the writer. Writes go
+    through the single writer connection, one `get_db()` block at a time: a block
+    is a transaction (rolled back if it exits without committing), and concurrent
+    writers queue here instead of failing with "database is locked". Other
+    processes (worker processes) are waited for up to SQLITE_BUSY_TIMEOUT_MS.
+    Connections are opened on first use.
+    """
+
+    def __init__(self, path: Path, readers: int):
+        self.path = path
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._reader_slots = asyncio.Semaphore(max(1, readers))
+        self._opened: List[aiosqlite.Connection] = []
+
+    async def _open(self, read_only: bool) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path)
+        await _configure(db)
+        if read_only:
+            await db.execute("PRAGMA query_only = ON")
+        self._opened.append(db)
+        return db
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._write_lock:
+            if self._writer is None:
+                self._writer = await self._open(read_only=False)
+            db = self._writer
+            try:
+                yield db
+            finally:
+                if db.in_transaction:
+                    await db.rollback()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._reader_slots:
+            try:
+                db = self._readers.get_nowait()
+            except asyncio.QueueEmpty:
+                db = await self._open(read_only=True)
+            try:
+                yield db
+            finally:
+                if db.in_transaction:
+                    await db.rollback()
+                self._readers.put_nowait(db)
+
+    async def close(self) -> None:
+        async with self._write_lock:
+            for db in self._opened:
+                await db.close()
+            self._opened = []
+            self._writer = None
+            self._readers = asyncio.Queue()
+
+
+async def _configure(db: aiosqlite.Connection) -> None:
+    await db.execute("PRAGMA foreign_keys = ON")
+    await db.execute("PRAGMA journal_mode = WAL")
+    await db.execute("PRAGMA synchronous = NORMAL")
+    await db.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    await db.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    await db.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    await db.execute("PRAGMA temp_store = MEMORY")
+
+
+# Singleton instance
+_pool: Optional[ConnectionPool] = None
+
+
+def get_pool() -> ConnectionPool:
+    """Get the connection pool of this process"""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(settings.DATABASE_PATH, settings.DATABASE_READ_CONNECTIONS)
+    return _pool
+
+
+async def open_db():
+    """Open the connection pool (on startup), so connection errors surface early"""
+    async with get_pool().writer():
+        pass
+
+
+async def close_db():
+    """Close the pooled connections (on shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_db():
+    """Get the writer connection context manager (one block at a time)"""
+    return get_pool().writer()
 
 
-@asynccontextmanager
-async def get_db():
-    """Get database connection context manager"""
-    db = await aiosqlite.connect(settings.DATABASE_PATH)
-    try:
-        # Enable foreign keys
-        await db.execute("PRAGMA foreign_keys = ON")
-        yield db
-    finally:
-        await db.close()
+def get_read_db():
+    """Get a read-only connection context manager (for queries that change nothing)"""
+    return get_pool().reader()
 
 
 class SQLiteDB:
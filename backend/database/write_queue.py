@@ -0,0 +1,176 @@
+"""
+Write queue - one writer task batching database writes into shared transactions
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence
+
+from constants import WRITE_BATCH_MAX_DELAY, WRITE_BATCH_MAX_SIZE
+from database.sqlite_db import get_db
+from utils.logger import logger
+
+
+@dataclass
+class Statement:
+    """A write statement with its parameter rows (one row, or many for executemany)"""
+
+    sql: str
+    rows: List[Sequence] = field(default_factory=list)
+
+    @classmethod
+    def one(cls, sql: str, params: Sequence = ()) -> "Statement":
+        return cls(sql, [params])
+
+    @classmethod
+    def many(cls, sql: str, rows: Iterable[Sequence]) -> "Statement":
+        return cls(sql, list(rows))
+
+
+@dataclass
+class _Intent:
+    """Statements applied atomically (in the same transaction), with an optional ack"""
+
+    statements: List[Statement]
+    done: Optional[asyncio.Future] = None
+    # Someone waits for it: close the batch right away instead of waiting for more writes
+    urgent: bool = False
+
+
+class WriteQueue:
+    """Funnels writes from concurrent analyses through a single writer task.
+
+    Queued intents are grouped into one transaction per batch, and consecutive statements
+    with the same SQL run as a single executemany. A batch takes everything queued while
+    the previous one committed, up to WRITE_BATCH_MAX_SIZE intents. `write()` waits until
+    its statements are committed (e.g. checkpoints) and closes its batch right away;
+    writes nobody waits for (`submit()`, e.g. progress) wait up to WRITE_BATCH_MAX_DELAY
+    for company. Intents are applied in the order they were queued.
+
+    If a batch fails, its intents are retried one transaction each, so one bad write
+    only fails its own intent.
+    """
+
+    def __init__(
+        self, max_batch: int = WRITE_BATCH_MAX_SIZE, max_delay: float = WRITE_BATCH_MAX_DELAY
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.intents = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, *statements: Statement) -> None:
+        """Queue statements without waiting for them (failures are logged)"""
+        self._put(_Intent(list(statements)))
+
+    async def write(self, *statements: Statement) -> None:
+        """Queue statements and wait until they are committed (raises if they fail)"""
+        done = asyncio.get_running_loop().create_future()
+        self._put(_Intent(list(statements), done, urgent=True))
+        await done
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is committed"""
+        done = asyncio.get_running_loop().create_future()
+        self._put(_Intent([], done, urgent=True))
+        await done
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def _put(self, intent: _Intent) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._queue.put_nowait(intent)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch and not batch[-1].urgent:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._apply(batch)
+
+    async def _apply(self, batch: List[_Intent]) -> None:
+        try:
+            await _commit([s for intent in batch for s in intent.statements])
+        except Exception as e:
+            if len(batch) == 1:
+                _settle(batch[0], e)
+                return
+            logger.warning(f"Batched write of {len(batch)} intents failed ({e}), retrying each")
+            for intent in batch:
+                try:
+                    await _commit(intent.statements)
+                except Exception as e:
+                    _settle(intent, e)
+                else:
+                    _settle(intent)
+            return
+        self.batches += 1
+        self.intents += len(batch)
+        for intent in batch:
+            _settle(intent)
+
+
+async def _commit(statements: List[Statement]) -> None:
+    """Run statements in one transaction, merging runs of the same SQL into executemany"""
+    if not statements:
+        return
+    merged: List[Statement] = []
+    for statement in statements:
+        if merged and merged[-1].sql == statement.sql:
+            merged[-1].rows.extend(statement.rows)
+        else:
+            merged.append(Statement(statement.sql, list(statement.rows)))
+    async with get_db() as db:
+        for statement in merged:
+            await db.executemany(statement.sql, statement.rows)
+        await db.commit()
+
+
+def _settle(intent: _Intent, error: Optional[Exception] = None) -> None:
+    if intent.done is None:
+        if error is not None:
+            logger.error(f"Queued database write failed: {error}")
+    elif not intent.done.done():
+        if error is None:
+            intent.done.set_result(None)
+        else:
+            intent.done.set_exception(error)
+
+
+# Singleton instance
+_write_queue: Optional[WriteQueue] = None
+
+
+def get_write_queue() -> WriteQueue:
+    """Get the write queue of this process"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+    return _write_queue
+
+
+async def close_write_queue():
+    """Commit the queued writes and stop the writer task (on shutdown)"""
+    global _write_queue
+    if _write_queue is not None:
+        await _write_queue.close()
+        _write_queue = None
@@ -0,0 +1,111 @@
+"""
+Per-provider circuit breakers
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from constants import LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RECOVERY_TIMEOUT
+from utils.logger import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's breaker rejects a request"""
+
+    def __init__(self, provider: str, retry_in: Optional[float] = None):
+        self.provider = provider
+        self.retry_in = retry_in
+        detail = f" (retry in {retry_in:.0f}s)" if retry_in else ""
+        super().__init__(f"Circuit open for provider {provider}{detail}")
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures; open -> half-open after a cool-down,
+    where a single probe request decides whether to close again or re-open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = LLM_BREAKER_RECOVERY_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)"""
+        if self.state == OPEN:
+            if self.retry_in() > 0:
+                return False
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._transition(OPEN)
+
+    def record_ignored(self) -> None:
+        """The call ended without telling us anything about provider health"""
+        self._probe_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in": round(self.retry_in(), 1) if self.state == OPEN else None,
+        }
+
+
+# One breaker per provider
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider_name: str) -> CircuitBreaker:
+    """Get the breaker for a provider"""
+    breaker = _breakers.get(provider_name)
+    if breaker is None:
+        breaker = CircuitBreaker(provider_name)
+        _breakers[provider_name] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State of all provider breakers"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,150 @@
+"""
+Adaptive (AIMD) concurrency control for LLM requests
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from constants import (
+    LLM_CONCURRENCY_DECREASE_FACTOR,
+    LLM_CONCURRENCY_MAX,
+    LLM_CONCURRENCY_MIN,
+    LLM_LATENCY_SPIKE_FACTOR,
+    LLM_TTFT_WINDOW,
+    MAX_CONCURRENT_LLM_REQUESTS,
+)
+from utils.logger import logger
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase / multiplicative-decrease window for in-flight requests.
+
+    The window grows by ~1 for every `limit` healthy responses and is cut by
+    LLM_CONCURRENCY_DECREASE_FACTOR on overload errors or when time-to-first-token
+    spikes above LLM_LATENCY_SPIKE_FACTOR x its moving average.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = MAX_CONCURRENT_LLM_REQUESTS,
+        min_limit: int = LLM_CONCURRENCY_MIN,
+        max_limit: int = LLM_CONCURRENCY_MAX,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.latency_avg: Optional[float] = None
+        self.latency_samples: deque = deque(maxlen=LLM_TTFT_WINDOW)
+        self.successes = 0
+        self.overloads = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._last_overload = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def window(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        """Wait for a free slot in the current window"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.window)
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """Free a slot and adapt the window.
+
+        Args:
+            latency: time to first token of a successful call (None if it failed)
+            overloaded: the call failed with an overload error
+        """
+        async with self._cond:
+            self.in_flight -= 1
+
+            if overloaded:
+                self.overloads += 1
+                self._last_overload = time.monotonic()
+                self._decrease("overload")
+            elif latency is not None:
+                self.successes += 1
+                spike = (
+                    self.latency_avg is not None
+                    and latency > self.latency_avg * LLM_LATENCY_SPIKE_FACTOR
+                )
+                if spike:
+                    self._decrease(f"latency spike {latency:.2f}s")
+                elif time.monotonic() - self._last_overload > self._cooldown():
+                    # Only grow once the window has been healthy for a while
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.window)
+                self.latency_samples.append(latency)
+                # Exponential moving average of time to first token
+                self.latency_avg = (
+                    latency
+                    if self.latency_avg is None
+                    else 0.9 * self.latency_avg + 0.1 * latency
+                )
+
+            self._cond.notify_all()
+
+    def latency_percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Percentile of recent time-to-first-token samples (None without enough data)"""
+        if len(self.latency_samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self.latency_samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _cooldown(self) -> float:
+        """Roughly one round trip: the time for a window change to take effect"""
+        return max(0.5, 2 * (self.latency_avg or 0.0))
+
+    def _decrease(self, reason: str) -> None:
+        """Multiplicative decrease, at most once per round trip"""
+        now = time.monotonic()
+        if now - self._last_decrease < self._cooldown():
+            return
+        self._last_decrease = now
+        old = self.window
+        self.limit = max(float(self.min_limit), self.limit * LLM_CONCURRENCY_DECREASE_FACTOR)
+        self.decreases += 1
+        logger.warning(f"Concurrency window for {self.name}: {old} -> {self.window} ({reason})")
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 3) if value is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "latency_avg": self._rounded(self.latency_avg),
+            "latency_p90": self._rounded(self.latency_percentile(0.9)),
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+        }
+
+
+# One governor per provider/model
+_limiters: Dict[Tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+
+
+def get_concurrency_limiter(provider_name: str, model: str) -> AdaptiveConcurrencyLimiter:
+    """Get the adaptive limiter for a provider/model pair"""
+    key = (provider_name, model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = AdaptiveConcurrencyLimiter(f"{provider_name}/{model}")
+        _limiters[key] = limiter
+    return limiter
+
+
+def concurrency_stats() -> Dict[str, Dict[str, Any]]:
+    """Current windows of all provider/model governors"""
+    return {limiter.name: limiter.stats() for limiter in _limiters.values()}
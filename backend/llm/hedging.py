@@ -0,0 +1,80 @@
+"""
+Hedged requests: duplicate a call that is slow to start and keep whichever finishes first
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from constants import LLM_HEDGE_BUDGET_RATIO, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_PERCENTILE
+from llm.concurrency import AdaptiveConcurrencyLimiter
+
+
+class AttemptSignals:
+    """Progress of an in-flight call, observed by the hedging logic"""
+
+    def __init__(self):
+        # Set once the request holds a concurrency slot and is on the wire
+        self.sent = asyncio.Event()
+        self.first_token = asyncio.Event()
+
+
+class HedgePolicy:
+    """Decides when to hedge and keeps the extra spend within a budget.
+
+    A hedge fires when a call has produced no token after the provider/model's
+    p90 time-to-first-token. At most `budget_ratio` hedges are sent per primary call.
+    """
+
+    def __init__(
+        self,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        budget_ratio: float = LLM_HEDGE_BUDGET_RATIO,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.skipped_budget = 0
+
+    def hedge_delay(self, governor: AdaptiveConcurrencyLimiter) -> Optional[float]:
+        """Seconds to wait for a first token before hedging (None: not enough data yet)"""
+        return governor.latency_percentile(self.percentile, self.min_samples)
+
+    def record_call(self) -> None:
+        self.calls += 1
+
+    def try_fire(self) -> bool:
+        """Claim budget for one hedge"""
+        if self.fired + 1 > self.calls * self.budget_ratio:
+            self.skipped_budget += 1
+            return False
+        self.fired += 1
+        return True
+
+    def record_win(self) -> None:
+        self.won += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "fired": self.fired,
+            "won": self.won,
+            "skipped_budget": self.skipped_budget,
+            "fire_rate": round(self.fired / self.calls, 3) if self.calls else 0.0,
+            "win_rate": round(self.won / self.fired, 3) if self.fired else 0.0,
+        }
+
+
+# Singleton instance
+_hedge_policy: Optional[HedgePolicy] = None
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Get the hedge policy singleton"""
+    global _hedge_policy
+    if _hedge_policy is None:
+        _hedge_policy = HedgePolicy()
+    return _hedge_policy
@@ -0,0 +1,104 @@
+"""
+Shared HTTP connection pools for LLM providers
+"""
+
+import asyncio
+from typing import Dict, Optional, Set, Tuple
+
+import httpx
+
+from config import settings
+from utils.logger import logger
+
+# One pooled client per API origin (scheme://host:port), bound to the loop that created it
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+# Closes of replaced clients still running (tasks are only weakly referenced by the loop)
+_closing: Set[asyncio.Task] = set()
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def _pool_key(base_url: str) -> str:
+    """Normalize a URL to its origin so all providers on one host share a pool"""
+    try:
+        url = httpx.URL(base_url)
+        if url.host:
+            port = f":{url.port}" if url.port else ""
+            return f"{url.scheme}://{url.host}{port}"
+    except Exception:
+        pass
+    return base_url
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create a keep-alive client using the configured pool limits"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.LLM_HTTP_TIMEOUT, connect=settings.LLM_HTTP_CONNECT_TIMEOUT
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.LLM_HTTP2 and _http2_available(),
+    )
+
+
+def get_http_client(base_url: str) -> httpx.AsyncClient:
+    """Get the pooled client for an API origin, creating it on first use"""
+    key = _pool_key(base_url)
+    loop = asyncio.get_running_loop()
+
+    entry = _clients.get(key)
+    if entry is not None:
+        client_loop, client = entry
+        # Connections cannot be shared across event loops, so rebuild if the loop changed
+        if client_loop is loop and not client.is_closed:
+            return client
+        _discard(key, client_loop, client)
+
+    client = _build_client()
+    _clients[key] = (loop, client)
+    logger.debug(f"Created pooled HTTP client for {key}")
+    return client
+
+
+def _discard(key: str, client_loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """Close a client being replaced, so its connections are released"""
+    if client.is_closed:
+        return
+    if client_loop.is_running():
+        # Its connections belong to that loop: close them there
+        asyncio.run_coroutine_threadsafe(_close_client(key, client), client_loop)
+    else:
+        # Its loop is gone; closing here still releases the pool and its sockets
+        task = asyncio.get_running_loop().create_task(_close_client(key, client))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+async def _close_client(key: str, client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.warning(f"Error closing HTTP client for {key}: {e}")
+
+
+async def close_http_clients(base_url: Optional[str] = None) -> None:
+    """Close pooled clients (all of them, or only the one for `base_url`)"""
+    keys = [_pool_key(base_url)] if base_url else list(_clients.keys())
+    for key in keys:
+        entry = _clients.pop(key, None)
+        if entry is None:
+            continue
+        _, client = entry
+        await _close_client(key, client)
@@ -6,6 +6,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, AsyncGenerator
 import httpx
 import logging
+from llm.http_client import get_http_client
 from utils.json_utils import safe_json_loads
 
 logger = logging.getLogger(__name__)
@@ -14,11 +15,19 @@ logger = logging.getLogger(__name__)
 class BaseLLMProvider(ABC):
     """Base class for LLM providers"""
 
+    # API origin used to pick the shared connection pool; subclasses override or set per instance
+    base_url: str = ""
+
     def __init__(self, api_key: str, model: str, **kwargs):
         self.api_key = api_key
         self.model = model
         self.kwargs = kwargs
 
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client shared by every provider talking to the same origin"""
+        return get_http_client(self.base_url or self.__class__.__name__)
+
     @abstractmethod
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """Generate chat completion"""
@@ -27,7 +36,11 @@ class BaseLLMProvider(ABC):
     async def stream_chat(
         self, messages: List[Dict[str, str]], **kwargs
     ) -> AsyncGenerator[str, None]:
-        """Generate streaming chat completion (Default fallback to non-streaming)"""
+        """Generate streaming chat completion (Default fallback to non-streaming).
+
+        Subclasses that can read token usage from the stream report it through the
+        optional `on_usage` callback as {"prompt_tokens": ..., "completion_tokens": ...}.
+        """
         # Default implementation yields the full response at once if streaming is not supported by subclass
         response = await self.chat(messages, **kwargs)
         yield response
@@ -81,17 +94,18 @@ class OpenAIProvider(BaseLLMProvider):
             "max_tokens": kwargs.get("max_tokens", 4096),
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        client = self.http_client
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
 
     async def stream_chat(
         self, messages: List[Dict[str, str]], **kwargs
     ) -> AsyncGenerator[str, None]:
         """Generate streaming chat completion using OpenAI API"""
         url = f"{self.base_url}/chat/completions"
+        on_usage = kwargs.get("on_usage")
 
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
 
@@ -103,22 +117,25 @@ class OpenAIProvider(BaseLLMProvider):
             "stream": True,
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        line = line[6:]  # Remove "data: " prefix
-                        if line.strip() == "[DONE]":
-                            break
-                        try:
-                            data = safe_json_loads(line)
-                            if data and "choices" in data and len(data["choices"]) > 0:
-                                delta = data["choices"][0].get("delta", {})
-                                if "content" in delta:
-                                    yield delta["content"]
-                        except Exception:
-                            continue
+        client = self.http_client
+        async with client.stream("POST", url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    line = line[6:]  # Remove "data: " prefix
+                    if line.strip() == "[DONE]":
+                        break
+                    try:
+                        data = safe_json_loads(line)
+                        if data and data.get("usage") and on_usage:
+                            # Some compatible APIs (e.g. DeepSeek) report usage in the last chunk
+                            on_usage(data["usage"])
+                        if data and "choices" in data and len(data["choices"]) > 0:
+                            delta = data["choices"][0].get("delta", {})
+                            if delta.get("content"):
+                                yield delta["content"]
+                    except Exception:
+                        continue
 
 
 class AIHubMixProvider(OpenAIProvider):
@@ -179,22 +196,27 @@ class OllamaProvider(OpenAIProvider):
 class DeepSeekProvider(OpenAIProvider):
     """DeepSeek API provider (OpenAI compatible)"""
 
-    def __init__(self, api_key: str, model: str = "deepseek-chat", **kwargs):
-        super().__init__(
-            api_key=api_key, model=model, base_url="https://api.deepseek.com/v1", **kwargs
-        )
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "deepseek-chat",
+        base_url: str = "https://api.deepseek.com/v1",
+        **kwargs,
+    ):
+        super().__init__(api_key=api_key, model=model, base_url=base_url, **kwargs)
 
 
 class QwenProvider(OpenAIProvider):
     """Alibaba Qwen API provider (OpenAI compatible)"""
 
-    def __init__(self, api_key: str, model: str = "qwen-plus", **kwargs):
-        super().__init__(
-            api_key=api_key,
-            model=model,
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-            **kwargs,
-        )
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "qwen-plus",
+        base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1",
+        **kwargs,
+    ):
+        super().__init__(api_key=api_key, model=model, base_url=base_url, **kwargs)
 
 
 class ClaudeProvider(BaseLLMProvider):
@@ -233,17 +255,19 @@ class ClaudeProvider(BaseLLMProvider):
         if system_message:
             payload["system"] = system_message
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data["content"][0]["text"]
+        client = self.http_client
+        response = await client.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data["content"][0]["text"]
 
     async def stream_chat(
         self, messages: List[Dict[str, str]], **kwargs
     ) -> AsyncGenerator[str, None]:
         """Generate streaming chat completion using Claude API"""
         url = f"{self.base_url}/messages"
+        on_usage = kwargs.get("on_usage")
+        usage: Dict[str, int] = {}
 
         headers = {
             "x-api-key": self.api_key,
@@ -271,22 +295,32 @@ class ClaudeProvider(BaseLLMProvider):
         if system_message:
             payload["system"] = system_message
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        line = line[6:]  # Remove "data: " prefix
-                        if line.strip() == "[DONE]":
-                            break
-                        try:
-                            data = safe_json_loads(line)
-                            if data and data.get("type") == "content_block_delta":
-                                delta = data.get("delta", {})
-                                if delta.get("type") == "text_delta":
-                                    yield delta.get("text", "")
-                        except Exception:
+        client = self.http_client
+        async with client.stream("POST", url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    line = line[6:]  # Remove "data: " prefix
+                    if line.strip() == "[DONE]":
+                        break
+                    try:
+                        data = safe_json_loads(line)
+                        if not data:
                             continue
+                        if data.get("type") == "content_block_delta":
+                            delta = data.get("delta", {})
+                            if delta.get("type") == "text_delta":
+                                yield delta.get("text", "")
+                        elif data.get("type") == "message_start":
+                            message_usage = data.get("message", {}).get("usage", {})
+                            usage["prompt_tokens"] = message_usage.get("input_tokens", 0)
+                        elif data.get("type") == "message_delta" and on_usage:
+                            usage["completion_tokens"] = data.get("usage", {}).get(
+                                "output_tokens", 0
+                            )
+                            on_usage(usage)
+                    except Exception:
+                        continue
 
 
 class GeminiProvider(BaseLLMProvider):
@@ -314,11 +348,11 @@ class GeminiProvider(BaseLLMProvider):
             },
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data["candidates"][0]["content"]["parts"][0]["text"]
+        client = self.http_client
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data["candidates"][0]["content"]["parts"][0]["text"]
 
     # Gemini Streaming not implemented yet, fallback to non-streaming
 
@@ -326,15 +360,21 @@ class GeminiProvider(BaseLLMProvider):
 class ZhipuProvider(OpenAIProvider):
     """Zhipu AI (GLM) API provider"""
 
-    def __init__(self, api_key: str, model: str = "glm-4", **kwargs):
-        super().__init__(
-            api_key=api_key, model=model, base_url="https://open.bigmodel.cn/api/paas/v4", **kwargs
-        )
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "glm-4",
+        base_url: str = "https://open.bigmodel.cn/api/paas/v4",
+        **kwargs,
+    ):
+        super().__init__(api_key=api_key, model=model, base_url=base_url, **kwargs)
 
 
 class BaiduProvider(BaseLLMProvider):
     """Baidu Wenxin API provider"""
 
+    base_url = "https://aip.baidubce.com"
+
     def __init__(self, api_key: str, secret_key: str, model: str = "ernie-4.0-8k", **kwargs):
         super().__init__(api_key, model, **kwargs)
         self.secret_key = secret_key
@@ -352,13 +392,13 @@ class BaiduProvider(BaseLLMProvider):
             "client_secret": self.secret_key,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            access_token: str = data["access_token"]
-            self._access_token = access_token
-            return access_token
+        client = self.http_client
+        response = await client.post(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        access_token: str = data["access_token"]
+        self._access_token = access_token
+        return access_token
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """Generate chat completion using Baidu API"""
@@ -379,11 +419,11 @@ class BaiduProvider(BaseLLMProvider):
             "temperature": kwargs.get("temperature", 0.7),
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data["result"]
+        client = self.http_client
+        response = await client.post(url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data["result"]
 
     async def stream_chat(
         self, messages: List[Dict[str, str]], **kwargs
@@ -406,18 +446,18 @@ class BaiduProvider(BaseLLMProvider):
             "stream": True,
         }
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            async with client.stream("POST", url, json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        line = line[6:]
-                        try:
-                            data = safe_json_loads(line)
-                            if data and "result" in data:
-                                yield data["result"]
-                        except Exception:
-                            continue
+        client = self.http_client
+        async with client.stream("POST", url, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    line = line[6:]
+                    try:
+                        data = safe_json_loads(line)
+                        if data and "result" in data:
+                            yield data["result"]
+                    except Exception:
+                        continue
 
 
 # Provider factory
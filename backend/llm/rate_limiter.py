@@ -0,0 +1,129 @@
+"""
+Token-bucket rate limiting for LLM providers (requests/minute and tokens/minute)
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from constants import RATE_LIMIT_BURST_SECONDS, RATE_LIMIT_SAFETY_MARGIN
+from utils.logger import logger
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate_per_minute`.
+
+    The capacity only covers a few seconds of budget, so traffic is spread evenly
+    across the minute instead of being spent in one burst.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = RATE_LIMIT_BURST_SECONDS):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than capacity wait for a full bucket)"""
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take tokens; the balance may go negative, which delays later callers"""
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        """Return over-charged tokens"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderRateLimiter:
+    """RPM + TPM budget for one provider.
+
+    Callers are charged the estimated prompt tokens up front (`acquire`) and the
+    difference to the real usage is settled after the call (`settle`).
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm * RATE_LIMIT_SAFETY_MARGIN) if rpm else None
+        self._tokens = TokenBucket(tpm * RATE_LIMIT_SAFETY_MARGIN) if tpm else None
+        # Waiters are served in FIFO order
+        self._lock = asyncio.Lock()
+        self.total_wait = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> int:
+        """Wait until the call fits the budget, then charge it. Returns the charged tokens."""
+        async with self._lock:
+            while True:
+                wait = 0.0
+                if self._requests:
+                    wait = max(wait, self._requests.wait_time(1))
+                if self._tokens:
+                    wait = max(wait, self._tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    break
+                self.total_wait += wait
+                await asyncio.sleep(wait)
+
+            if self._requests:
+                self._requests.consume(1)
+            if self._tokens:
+                self._tokens.consume(estimated_tokens)
+        return estimated_tokens
+
+    def settle(self, charged_tokens: int, actual_tokens: int) -> None:
+        """Reconcile the up-front charge with the tokens the call really used"""
+        if not self._tokens:
+            return
+        delta = actual_tokens - charged_tokens
+        if delta > 0:
+            self._tokens.consume(delta)
+        elif delta < 0:
+            self._tokens.refund(-delta)
+
+
+# One limiter per provider, rebuilt when its configured budget changes
+_limiters: Dict[str, Tuple[Tuple[Optional[int], Optional[int]], ProviderRateLimiter]] = {}
+# Processes sharing each provider's budget (analysis worker processes)
+_process_share = 1
+
+
+def set_process_share(count: int) -> None:
+    """Split every provider's budget between `count` processes calling it at once"""
+    global _process_share
+    _process_share = max(1, count)
+    _limiters.clear()
+
+
+def get_rate_limiter(
+    provider_name: str, rpm: Optional[int] = None, tpm: Optional[int] = None
+) -> Optional[ProviderRateLimiter]:
+    """Get the limiter for a provider, or None if it has no configured budget"""
+    if not rpm and not tpm:
+        _limiters.pop(provider_name, None)
+        return None
+
+    entry = _limiters.get(provider_name)
+    if entry is not None and entry[0] == (rpm, tpm):
+        return entry[1]
+
+    share = _process_share
+    logger.info(
+        f"Rate limiter for {provider_name}: rpm={rpm or '-'} tpm={tpm or '-'}"
+        + (f" (1/{share} per process)" if share > 1 else "")
+    )
+    limiter = ProviderRateLimiter(rpm and rpm / share, tpm and tpm / share)
+    _limiters[provider_name] = ((rpm, tpm), limiter)
+    return limiter
@@ -0,0 +1,137 @@
+"""
+Process-wide registry of LLM provider clients
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from constants import LLM_CLIENT_REGISTRY_SIZE
+from llm.providers import BaseLLMProvider, create_provider
+from utils.logger import logger
+
+# (provider, model, base_url, key fingerprint)
+RegistryKey = Tuple[str, str, str, str]
+
+
+def normalize_provider_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Map frontend (camelCase) or settings config to provider constructor kwargs.
+
+    Empty values are dropped so that provider class defaults (model, base URL) apply.
+    """
+    normalized = {
+        "api_key": config.get("apiKey") or config.get("api_key") or "",
+        "model": config.get("model"),
+        "base_url": config.get("baseUrl") or config.get("base_url"),
+        "secret_key": config.get("secretKey") or config.get("secret_key"),
+    }
+    return {k: v for k, v in normalized.items() if v or k == "api_key"}
+
+
+def key_fingerprint(*secrets: Optional[str]) -> str:
+    """Short, non-reversible fingerprint of credentials for use in cache keys"""
+    material = "\0".join(s or "" for s in secrets)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def mask_key(api_key: str) -> str:
+    """Mask an API key for logging"""
+    return api_key[:4] + "***" + api_key[-4:] if api_key and len(api_key) > 8 else "***"
+
+
+class LLMClientRegistry:
+    """LRU cache of provider clients shared by every engine, endpoint and service.
+
+    Keeping provider instances alive keeps their per-instance state warm (e.g. the
+    Baidu access token), while the HTTP connections themselves live in llm.http_client.
+    """
+
+    def __init__(self, max_size: int = LLM_CLIENT_REGISTRY_SIZE):
+        self.max_size = max_size
+        self._clients: "OrderedDict[RegistryKey, BaseLLMProvider]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._settings_version: Optional[int] = None
+
+    @staticmethod
+    def make_key(provider_name: str, config: Dict[str, Any]) -> RegistryKey:
+        """Build the registry key for a normalized provider config"""
+        return (
+            provider_name.lower(),
+            config.get("model", ""),
+            config.get("base_url", ""),
+            key_fingerprint(config.get("api_key"), config.get("secret_key")),
+        )
+
+    def get(self, provider_name: str, config: Dict[str, Any]) -> BaseLLMProvider:
+        """Get (or create) the client for a provider config"""
+        config = normalize_provider_config(config)
+        key = self.make_key(provider_name, config)
+
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        logger.info(
+            f"Initializing {provider_name} provider with model: {config.get('model')} "
+            f"(Key: {mask_key(config.get('api_key', ''))})"
+        )
+        client = create_provider(provider_name, config)
+        self._clients[key] = client
+
+        while len(self._clients) > self.max_size:
+            evicted_key, _ = self._clients.popitem(last=False)
+            logger.debug(f"Evicted LLM client {evicted_key[0]}/{evicted_key[1]} from registry")
+
+        return client
+
+    def clear(self) -> None:
+        """Drop all clients so they are rebuilt from the current settings"""
+        if self._clients:
+            logger.info(f"Clearing {len(self._clients)} cached LLM clients")
+        self._clients.clear()
+
+    def sync_settings_version(self, version: int) -> None:
+        """Rebuild clients when the settings snapshot version changes"""
+        if self._settings_version is not None and version != self._settings_version:
+            self.clear()
+        self._settings_version = version
+
+    async def warm(self, provider_name: str, config: Dict[str, Any]) -> None:
+        """Create a client ahead of time and open its connection (best effort)"""
+        try:
+            client = self.get(provider_name, config)
+            # Fetch cached credentials (Baidu) and open the TCP/TLS connection to the API origin
+            get_token = getattr(client, "_get_access_token", None)
+            if get_token is not None:
+                await get_token()
+            elif client.base_url:
+                await client.http_client.get(client.base_url, timeout=5.0)
+            logger.info(f"Warmed LLM client for {provider_name}")
+        except Exception as e:
+            logger.warning(f"Failed to warm LLM client for {provider_name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry counters for observability"""
+        return {
+            "size": len(self._clients),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "clients": [f"{key[0]}/{key[1] or 'default'}" for key in self._clients],
+        }
+
+
+# Singleton instance
+_registry: Optional[LLMClientRegistry] = None
+
+
+def get_client_registry() -> LLMClientRegistry:
+    """Get the LLM client registry singleton"""
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry()
+    return _registry
@@ -0,0 +1,254 @@
+"""
+Persistent, content-addressed cache of LLM responses
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+from config import settings
+from constants import SQLITE_BUSY_TIMEOUT_MS
+from utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at);
+
+-- Total size of the entries, kept by triggers: every process sharing the file sees it
+CREATE TABLE IF NOT EXISTS cache_size (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes + new.size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+    UPDATE cache_size SET bytes = bytes - old.size;
+END;
+"""
+
+
+class LLMResponseCache:
+    """SQLite-backed response cache with TTL and size-based LRU eviction.
+
+    Entries are keyed by a hash of everything that determines the output (provider,
+    model, prompt, generation parameters, prompt version). Cache errors never fail
+    an LLM call; they are logged and treated as misses. Worker processes share the
+    file, so the size budget is checked against the total stored in it (cache_size),
+    read in the transaction that evicts.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, ttl_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._total_bytes = 0
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        prompt: str,
+        prompt_version: str = "",
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Content hash identifying a request (params include temperature, max_tokens...)"""
+        material = json.dumps(
+            [provider, model, prompt_version, params or {}, prompt],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = await aiosqlite.connect(self.path)
+            await db.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+            await db.execute("PRAGMA journal_mode = WAL")
+            await db.execute("PRAGMA synchronous = NORMAL")
+            # One transaction: caches from before cache_size start from their entries' sum
+            await db.executescript(
+                "BEGIN IMMEDIATE;"
+                + SCHEMA
+                + """
+                INSERT OR IGNORE INTO cache_size (id, bytes)
+                SELECT 1, COALESCE(SUM(size), 0) FROM responses;
+                COMMIT;
+                """
+            )
+            self._total_bytes = await self._read_total(db)
+            self._db = db
+        return self._db
+
+    async def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Look up a response ({text, provider, model}); expired entries count as misses"""
+        try:
+            async with self._lock:
+                db = await self._connect()
+                cursor = await db.execute(
+                    "SELECT text, provider, model, created_at FROM responses WHERE key = ?",
+                    (key,),
+                )
+                row = await cursor.fetchone()
+                now = time.time()
+
+                if row and now - row[3] > self.ttl_seconds:
+                    await db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    await db.commit()
+                    row = None
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                await db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                await db.commit()
+                self.hits += 1
+                return {"text": row[0], "provider": row[1], "model": row[2]}
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            self.misses += 1
+            return None
+
+    async def put(self, key: str, text: str, provider: str, model: str) -> None:
+        """Store a response and evict least recently used entries beyond the size budget"""
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            async with self._lock:
+                db = await self._connect()
+                now = time.time()
+                # An upsert, not INSERT OR REPLACE: the replaced row's delete would not
+                # fire the size trigger
+                await db.execute(
+                    """
+                    INSERT INTO responses
+                        (key, provider, model, text, size, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        provider = excluded.provider, model = excluded.model,
+                        text = excluded.text, size = excluded.size,
+                        created_at = excluded.created_at, accessed_at = excluded.accessed_at
+                    """,
+                    (key, provider, model, text, size, now, now),
+                )
+                await self._evict(db)
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def discard(self, key: str) -> None:
+        """Drop an entry (e.g. a response that failed validation)"""
+        try:
+            async with self._lock:
+                db = await self._connect()
+                await db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache discard failed: {e}")
+
+    @staticmethod
+    async def _read_total(db: aiosqlite.Connection) -> int:
+        cursor = await db.execute("SELECT bytes FROM cache_size")
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def _evict(self, db: aiosqlite.Connection) -> None:
+        """Delete expired entries, then the least recently used ones until under budget.
+
+        Called after a write in the same transaction, which holds the write lock: the
+        total read here includes what other processes have stored.
+        """
+        self._total_bytes = await self._read_total(db)
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        cursor = await db.execute(
+            "DELETE FROM responses WHERE created_at < ? RETURNING size",
+            (time.time() - self.ttl_seconds,),
+        )
+        expired = await cursor.fetchall()
+        self._total_bytes = await self._read_total(db)
+        self.evictions += len(expired)
+
+        if self._total_bytes > self.max_bytes:
+            # Free 10% below the budget so eviction does not run on every insert
+            to_free = self._total_bytes - int(self.max_bytes * 0.9)
+            cursor = await db.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+            victims = []
+            freed = 0
+            async for key, size in cursor:
+                victims.append((key,))
+                freed += size
+                if freed >= to_free:
+                    break
+            await cursor.close()
+            await db.executemany("DELETE FROM responses WHERE key = ?", victims)
+            self._total_bytes = await self._read_total(db)
+            self.evictions += len(victims)
+
+        logger.info(f"LLM cache evicted entries, now {self._total_bytes} bytes")
+
+    async def close(self) -> None:
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Singleton instance
+_response_cache: Optional[LLMResponseCache] = None
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Get the response cache singleton (None when caching is disabled)"""
+    global _response_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        _response_cache = LLMResponseCache(
+            settings.LLM_CACHE_PATH,
+            max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024,
+            ttl_seconds=settings.LLM_CACHE_TTL_DAYS * 86400,
+        )
+    return _response_cache
+
+
+async def close_response_cache() -> None:
+    """Close the cache database (called on shutdown)"""
+    if _response_cache is not None:
+        await _response_cache.close()
@@ -0,0 +1,205 @@
+"""
+Retry policy for LLM calls: error classification, rate-limit headers and jittered backoff
+"""
+
+import random
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from constants import (
+    LLM_CALL_DEADLINE,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_MAX_DELAY,
+)
+from utils.logger import logger
+
+# Error classes
+RATE_LIMITED = "rate_limited"
+SERVER_ERROR = "server_error"
+TIMEOUT = "timeout"
+NETWORK = "network"
+FATAL = "fatal"
+
+RETRYABLE_ERRORS = {RATE_LIMITED, SERVER_ERROR, TIMEOUT, NETWORK}
+OVERLOAD_ERRORS = {RATE_LIMITED, SERVER_ERROR, TIMEOUT}
+
+# Statuses worth retrying besides 429 and 5xx
+_RETRYABLE_STATUSES = {408, 409, 425}
+
+# Headers carrying "when can I try again" hints
+_RESET_HEADERS = (
+    "x-ratelimit-reset-requests",
+    "x-ratelimit-reset-tokens",
+    "x-ratelimit-reset",
+    "anthropic-ratelimit-requests-reset",
+    "anthropic-ratelimit-tokens-reset",
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def classify_error(error: BaseException) -> str:
+    """Classify an exception as one of the error classes above"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status == 429:
+            return RATE_LIMITED
+        if status >= 500:
+            return SERVER_ERROR
+        if status in _RETRYABLE_STATUSES:
+            return TIMEOUT if status == 408 else SERVER_ERROR
+        # 400/401/403/404/422...: the same request will never succeed
+        return FATAL
+    if isinstance(error, (httpx.TimeoutException, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, httpx.TransportError):
+        return NETWORK
+    return FATAL
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Errors that signal the provider is saturated (429, 5xx, timeouts)"""
+    return classify_error(error) in OVERLOAD_ERRORS
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse '20', '1.5', '6m0s', '250ms', an HTTP date or an RFC 3339 timestamp into seconds"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(n) * scale[u] for n, u in parts)
+
+    def parse_iso(v: str) -> datetime:
+        return datetime.fromisoformat(v.replace("Z", "+00:00"))
+
+    for parse in (parsedate_to_datetime, parse_iso):
+        try:
+            when = parse(value)
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / rate-limit reset headers)"""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    headers = error.response.headers
+
+    retry_after = headers.get("retry-after-ms")
+    if retry_after:
+        seconds = _parse_duration(retry_after)
+        if seconds is not None:
+            return seconds / 1000
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        seconds = _parse_duration(retry_after)
+        if seconds is not None:
+            return seconds
+
+    # Only rate-limited responses make the reset headers meaningful. They report when a
+    # budget is fully replenished, which over-estimates the wait, so use the earliest one.
+    if error.response.status_code != 429:
+        return None
+    hints = [_parse_duration(headers[name]) for name in _RESET_HEADERS if name in headers]
+    hints = [h for h in hints if h is not None]
+    return min(min(hints), LLM_RETRY_MAX_DELAY) if hints else None
+
+
+class RetryPolicy:
+    """Decides whether and when to retry a failed LLM call.
+
+    Backoff uses decorrelated jitter (sleep = uniform(base, 3 * previous sleep), capped),
+    provider hints take precedence, and the whole call must finish within `deadline`.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = LLM_RETRY_MAX_ATTEMPTS,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        deadline: float = LLM_CALL_DEADLINE,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def start(self) -> "RetryState":
+        return RetryState(self)
+
+
+class RetryState:
+    """Per-call retry bookkeeping"""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.started = time.monotonic()
+        self.attempt = 0
+        self._prev_delay = policy.base_delay
+
+    @property
+    def remaining(self) -> float:
+        """Seconds left before the call deadline"""
+        return self.policy.deadline - (time.monotonic() - self.started)
+
+    def next_delay(self, error: BaseException, **log_fields) -> Optional[float]:
+        """Return the delay before the next attempt, or None to give up. Logs the decision."""
+        self.attempt += 1
+        error_class = classify_error(error)
+        status = error.response.status_code if isinstance(error, httpx.HTTPStatusError) else None
+        hint = retry_after_hint(error)
+
+        delay: Optional[float] = None
+        reason = "retry"
+        if error_class not in RETRYABLE_ERRORS:
+            reason = "fatal error"
+        elif self.attempt >= self.policy.max_attempts:
+            reason = "max attempts reached"
+        else:
+            jitter = random.uniform(self.policy.base_delay, self._prev_delay * 3)
+            delay = min(self.policy.max_delay, jitter)
+            if hint is not None:
+                # Honour the provider's hint, plus a little jitter so waiters don't stampede
+                delay = hint + random.uniform(0, self.policy.base_delay)
+            self._prev_delay = max(self.policy.base_delay, delay)
+            if delay >= self.remaining:
+                delay = None
+                reason = "deadline exceeded"
+
+        fields = {
+            "attempt": self.attempt,
+            "max_attempts": self.policy.max_attempts,
+            "error_class": error_class,
+            "status": status,
+            "retry_after": round(hint, 2) if hint is not None else None,
+            "delay": round(delay, 2) if delay is not None else None,
+            "elapsed": round(time.monotonic() - self.started, 2),
+            "decision": reason,
+            **log_fields,
+        }
+        message = "LLM retry decision | " + " | ".join(f"{k}={v}" for k, v in fields.items())
+        bound = logger.bind(event="llm_retry", **fields)
+        if delay is None:
+            bound.error(f"{message} | error={error}")
+        else:
+            bound.warning(f"{message} | error={error}")
+        return delay
@@ -2,6 +2,8 @@
 NovelMind Backend - FastAPI Application Entry Point
 """
 
+import asyncio
+import multiprocessing
 import os
 from contextlib import asynccontextmanager
 
@@ -11,7 +13,11 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
 from api import novels, analysis, characters, relationships, settings as settings_api, export
-from database.sqlite_db import init_db
+from database.sqlite_db import close_db, init_db, open_db
+from database.write_queue import close_write_queue
+from llm.http_client import close_http_clients
+from llm.response_cache import close_response_cache
+from services.llm_service import get_llm_service
 
 
 from utils.logger import setup_logger
@@ -25,9 +31,19 @@ async def lifespan(app: FastAPI):
     logger.info("Starting NovelMind Backend...")
     await init_db()
     logger.info(f"Database initialized at: {settings.DATABASE_PATH}")
+    await open_db()
+    await analysis.start_workers()
+    # Warm the default provider client in the background so startup is not delayed
+    warm_task = asyncio.create_task(get_llm_service().warm_default_client())
     yield
+    warm_task.cancel()
     # Shutdown
     logger.info("Shutting down NovelMind Backend...")
+    await analysis.stop_workers()
+    await close_http_clients()
+    await close_response_cache()
+    await close_write_queue()
+    await close_db()
 
 
 app = FastAPI(
@@ -68,6 +84,8 @@ async def health_check():
 
 
 if __name__ == "__main__":
+    # Lets worker processes start from the packaged executable
+    multiprocessing.freeze_support()
     port = int(os.getenv("APP_PORT", 5001))
     debug = os.getenv("APP_DEBUG", "false").lower() == "true"
 
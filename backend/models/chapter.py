@@ -29,6 +29,8 @@ class Chapter(ChapterBase):
     novel_id: str
     chapter_num: int
     summary: Optional[str] = None
+    summary_model: Optional[str] = None  # "provider/model" that wrote the summary
+    token_count: int = 0  # Estimated at import (default tokenizer calibration)
 
     class Config:
         from_attributes = True
@@ -43,4 +45,6 @@ class ChapterResponse(BaseModel):
     title: Optional[str]
     word_count: int
     summary: Optional[str]
+    summary_model: Optional[str] = None
+    token_count: int = 0
     # Note: content is excluded from response to reduce payload size
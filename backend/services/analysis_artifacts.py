@@ -0,0 +1,170 @@
+"""
+Analysis artifacts - per-chunk analysis results keyed by the chapter inputs they came from
+"""
+
+import json
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database.sqlite_db import get_read_db
+from database.write_queue import Statement, get_write_queue
+
+
+def chapter_inputs(chapters: List[Dict[str, Any]]) -> Dict[str, str]:
+    """chapter id -> content hash, the input fingerprint of an artifact"""
+    return {ch["id"]: ch["content_hash"] for ch in chapters}
+
+
+def is_current(
+    artifact: Dict[str, Any], hashes: Dict[str, str], prompt_version: str, model: str
+) -> bool:
+    """Whether an artifact was made from the chapters' current text with the same prompt/model"""
+    if artifact["prompt_version"] != prompt_version or artifact["model"] != model:
+        return False
+    inputs = artifact["inputs"]
+    return bool(inputs) and all(hashes.get(cid) == digest for cid, digest in inputs.items())
+
+
+def covered_chapters(artifacts: List[Dict[str, Any]]) -> Set[str]:
+    """Ids of the chapters the artifacts cover.
+
+    A chapter split into pieces (too large for one chunk) is covered only once there is
+    an artifact for every piece.
+    """
+    covered: Set[str] = set()
+    pieces: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+    for artifact in artifacts:
+        if artifact["part"] is None:
+            covered.update(artifact["inputs"])
+        else:
+            index, count = artifact["part"]
+            for chapter_id in artifact["inputs"]:
+                pieces[chapter_id, count].add(index)
+    covered.update(
+        chapter_id for (chapter_id, count), done in pieces.items() if len(done) == count
+    )
+    return covered
+
+
+def stale_runs(chapters: List[Dict[str, Any]], covered: set) -> List[List[Dict[str, Any]]]:
+    """Consecutive runs of chapters whose ids are not in `covered`"""
+    runs: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    for ch in chapters:
+        if ch["id"] in covered:
+            if current:
+                runs.append(current)
+                current = []
+        else:
+            current.append(ch)
+    if current:
+        runs.append(current)
+    return runs
+
+
+async def load_artifacts(novel_id: str, kind: str) -> List[Dict[str, Any]]:
+    """All artifacts of a kind for a novel, in chapter order"""
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            """
+            SELECT id, chapter_start, chapter_end, inputs, prompt_version, model, served_by,
+                   data, task_id, part
+            FROM analysis_artifacts
+            WHERE novel_id = ? AND kind = ?
+            ORDER BY chapter_start, rowid
+            """,
+            (novel_id, kind),
+        )
+        rows = await cursor.fetchall()
+
+    return [
+        {
+            "id": row[0],
+            "chapter_start": row[1],
+            "chapter_end": row[2],
+            "inputs": json.loads(row[3]),
+            "prompt_version": row[4],
+            "model": row[5],
+            "served_by": row[6],
+            "data": json.loads(row[7]) if row[7] else None,
+            "task_id": row[8],
+            "part": json.loads(row[9]) if row[9] else None,
+        }
+        for row in rows
+    ]
+
+
+def make_artifact(
+    chapters: List[Dict[str, Any]],
+    prompt_version: str,
+    model: str,
+    data: Any,
+    served_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build an artifact for the result of analysing `chapters`.
+
+    A piece of a split chapter carries "part": [index, count] (see
+    AnalysisEngine._plan_chunks), which the artifact records.
+    """
+    return {
+        "id": str(uuid.uuid4()),
+        "chapter_start": chapters[0]["chapter_num"],
+        "chapter_end": chapters[-1]["chapter_num"],
+        "inputs": chapter_inputs(chapters),
+        "prompt_version": prompt_version,
+        "model": model,
+        "served_by": served_by,
+        "data": data,
+        "part": chapters[0].get("part") if len(chapters) == 1 else None,
+    }
+
+
+async def save_artifact(
+    novel_id: str, kind: str, artifact: Dict[str, Any], task_id: str, *also: Statement
+) -> None:
+    """Persist one finished unit of work as soon as it completes (the task's checkpoint).
+
+    `also` are written in the same transaction (e.g. the task's state that goes with the
+    unit). Returns once the write is committed; concurrent checkpoints share a transaction.
+    """
+    await get_write_queue().write(
+        Statement.one(
+            """
+            INSERT INTO analysis_artifacts
+                (id, novel_id, kind, chapter_start, chapter_end, inputs,
+                 prompt_version, model, served_by, data, task_id, part)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                artifact["id"],
+                novel_id,
+                kind,
+                artifact["chapter_start"],
+                artifact["chapter_end"],
+                json.dumps(artifact["inputs"]),
+                artifact["prompt_version"],
+                artifact["model"],
+                artifact["served_by"],
+                json.dumps(artifact["data"], ensure_ascii=False),
+                task_id,
+                json.dumps(artifact["part"]) if artifact["part"] else None,
+            ),
+        ),
+        *also,
+    )
+    artifact["task_id"] = task_id
+
+
+async def prune_artifacts(novel_id: str, kind: str, keep_ids: set) -> None:
+    """Delete the artifacts of a kind that are not part of the current result"""
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            "SELECT id FROM analysis_artifacts WHERE novel_id = ? AND kind = ?",
+            (novel_id, kind),
+        )
+        obsolete = [(row[0],) for row in await cursor.fetchall() if row[0] not in keep_ids]
+    if obsolete:
+        await get_write_queue().write(
+            Statement.many("DELETE FROM analysis_artifacts WHERE id = ?", obsolete)
+        )
@@ -3,36 +3,124 @@ Analysis Engine - Core analysis logic for novel processing
 """
 
 import asyncio
+import json
+import time
 import uuid
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
-from database.sqlite_db import get_db
+from database.chapter_store import load_contents
+from database.sqlite_db import get_read_db
+from database.write_queue import Statement, get_write_queue
 
 
-from services.llm_service import LLMService
+from services.llm_service import get_llm_service
 from utils.logger import logger
+from services.analysis_artifacts import (
+    chapter_inputs,
+    covered_chapters,
+    is_current,
+    load_artifacts,
+    make_artifact,
+    prune_artifacts,
+    save_artifact,
+    stale_runs,
+)
+from services.cancellation import AnalysisCancelled, CancellationToken
+from services.entity_resolution import find_first_appearance, merge_characters
+from services.job_queue import get_provider_slots, job_priority
+from services.task_events import get_task_events
+from services.stage_scheduler import (
+    PrioritySemaphore,
+    ProgressReport,
+    Stage,
+    StageScheduler,
+    current_stage,
+)
+from utils.text_utils import estimate_tokens, pack_texts, scale_token_count, split_by_tokens
 from constants import (
+    ANALYSIS_PROGRESS_STORE_INTERVAL,
     ANALYSIS_SAMPLE_SIZES,
+    ANALYSIS_STAGE_WEIGHTS,
     ANALYSIS_SUMMARY_LIMITS,
-    MAX_CONCURRENT_LLM_REQUESTS,
+    CHARACTER_CHUNK_MAX_TOKENS,
+    LLM_CONCURRENCY_MAX,
+    PROMPT_TEMPLATE_TOKENS,
+    PROMPT_VERSIONS,
 )
 
 
+def chapter_sizes(chapters: List[Dict]) -> Dict[str, int]:
+    """Chapter id -> token count, the units of work progress and ETA are measured in"""
+    return {ch["id"]: ch.get("token_count") or 0 for ch in chapters}
+
+
 class AnalysisEngine:
     """Main analysis engine for novel processing"""
 
-    def __init__(self):
-        self.llm = LLMService()
+    def __init__(self, cancel_token: Optional[CancellationToken] = None):
+        # Shared service: provider clients (and their connections) outlive a single task
+        self.llm = get_llm_service()
+        # "provider/model" -> number of calls it served (failover may mix providers)
+        self.served_by: Counter = Counter()
+        self.use_cache = True
+        # None: map-reduce character extraction for "deep" analysis only
+        self.map_reduce: Optional[bool] = None
+        # "provider/model" the task's requests go to; artifacts made by another are stale
+        self.model_key = ""
+        # Ids of the characters found by the previous run (name/alias -> id)
+        self.previous_ids: Dict[str, str] = {}
+        self.incremental = False
+        # Budget of the provider the task calls, shared with every other running task:
+        # served by job priority, then critical-path stages first. An upper bound only,
+        # the LLM layer adapts the real in-flight window per provider/model
+        self.slots = PrioritySemaphore(LLM_CONCURRENCY_MAX)
+        self.priority = 0
+        self.cancel_token = cancel_token or CancellationToken()
+        self.events = get_task_events()
+        # Writes of all running tasks share one batching writer
+        self.writes = get_write_queue()
+        self._stored_message: Optional[str] = None
+        self._stored_at = 0.0
+        self.novel_id = ""
+        self.task_id = ""
+
+    async def analyze(
+        self, novel_id: str, task_id: str, config: Dict[str, Any], resume: bool = False
+    ) -> Dict[str, Any]:
+        """Run full analysis on a novel.
+
+        Every finished unit of work (chunk or chapter) is stored as an artifact and every
+        finished stage is recorded on the task, so `resume=True` continues an interrupted
+        task from its last checkpoint instead of starting over.
+        """
+        try:
+            return await self._analyze(novel_id, task_id, config, resume)
+        finally:
+            # The task's queued writes (progress) land before its final status
+            await self.writes.flush()
 
-    async def analyze(self, novel_id: str, task_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Run full analysis on a novel"""
-        logger.info(f"Starting analysis for novel {novel_id} (Task: {task_id})")
+    async def _analyze(
+        self, novel_id: str, task_id: str, config: Dict[str, Any], resume: bool
+    ) -> Dict[str, Any]:
+        logger.info(f"Starting analysis for novel {novel_id} (Task: {task_id}, resume={resume})")
         logger.debug(f"Analysis config: {config}")
 
         features = config.get("features", ["characters", "relationships", "plot", "summary"])
         depth = config.get("depth", "standard")
         provider = config.get("provider")
         model = config.get("model")
+        # False forces fresh LLM calls (the new responses still refresh the cache)
+        self.use_cache = config.get("use_cache", True)
+        self.map_reduce = config.get("map_reduce")
+        # Incremental: reuse the artifacts of unchanged chapters, analyse only the rest
+        self.incremental = config.get("scope") == "incremental"
+        self.model_key = await self.llm.model_key(provider, model)
+        self.slots = get_provider_slots(self.model_key.split("/", 1)[0])
+        self.priority = job_priority(config)
+        self.novel_id = novel_id
+        self.task_id = task_id
 
         # Get novel chapters
         chapters = await self._get_chapters(novel_id, config)
@@ -43,14 +131,12 @@ class AnalysisEngine:
 
         logger.info(f"Loaded {len(chapters)} chapters for analysis")
 
-        # Clear existing analysis data to prevent accumulation
-        async with get_db() as db:
-            await db.execute("DELETE FROM characters WHERE novel_id = ?", (novel_id,))
-            await db.execute("DELETE FROM relationships WHERE novel_id = ?", (novel_id,))
-            await db.execute("DELETE FROM plot_events WHERE novel_id = ?", (novel_id,))
-            await db.execute("UPDATE chapters SET summary = NULL WHERE novel_id = ?", (novel_id,))
-            await db.commit()
-        logger.info(f"Cleared existing analysis data for novel {novel_id}")
+        completed_stages = await self._load_checkpoint() if resume else []
+        if completed_stages:
+            logger.info(f"Resuming task {task_id} after stages: {', '.join(completed_stages)}")
+
+        # Keep character ids stable across runs so links to them survive re-analysis
+        self.previous_ids = await self._load_character_ids(novel_id)
 
         # Initialize result
         result = {
@@ -62,58 +148,163 @@ class AnalysisEngine:
             "chapter_summaries": [],
         }
 
-        # Update progress
-        total_steps = len(
-            [f for f in features if f in ["characters", "relationships", "plot", "summary"]]
-        )
-        current_step = 0
+        # Until a stage declares its units, assume it covers every chapter
+        planned = chapter_sizes(chapters)
 
-        # Step 1: Character extraction
-        if "characters" in features:
-            await self._update_progress(task_id, (current_step / total_steps) * 100, "识别人物...")
-            logger.info("Step 1: Extracting characters")
-            result["characters"] = await self._extract_characters(
-                novel_id, chapters, depth, provider, model
+        def stage(
+            name: str,
+            label: str,
+            run: Callable[[Dict[str, Any]], Awaitable[Any]],
+            depends_on: tuple = (),
+            resumed: Optional[Callable[[], Awaitable[Any]]] = None,
+        ) -> Stage:
+            """Wrap a stage so it is skipped on resume and checkpointed when it finishes"""
+
+            async def checkpointed(results: Dict[str, Any]) -> Any:
+                self.cancel_token.raise_if_cancelled()
+                self.events.publish(task_id, {"type": "stage", "stage": name, "state": "started"})
+                if name in completed_stages:
+                    value = await resumed() if resumed else []
+                else:
+                    value = await run(results)
+                    await self._complete_stage(completed_stages, name)
+                self.events.publish(
+                    task_id,
+                    {"type": "stage", "stage": name, "state": "finished", "count": len(value)},
+                )
+                return value
+
+            return Stage(
+                name, checkpointed, label, depends_on, ANALYSIS_STAGE_WEIGHTS[name], planned
             )
-            current_step += 1
-
-        # Step 2: Relationship analysis
-        if "relationships" in features and result["characters"]:
-            await self._update_progress(task_id, (current_step / total_steps) * 100, "分析关系...")
-            logger.info("Step 2: Analyzing relationships")
-            result["relationships"] = await self._analyze_relationships(
-                novel_id, result["characters"], chapters, depth, provider, model
+
+        async def relationships(results: Dict[str, Any]) -> List[Dict]:
+            characters = results.get("characters")
+            if characters is None and self.incremental:
+                # Not re-extracted this run: use the characters kept from the previous one
+                characters = await self._load_characters(novel_id)
+            if not characters:
+                return []
+            return await self._analyze_relationships(
+                novel_id, characters, chapters, depth, provider, model
             )
-            current_step += 1
 
-        # Step 3: Plot tracking
+        # Only relationships depend on another stage; everything else overlaps
+        stages = []
+        if "characters" in features:
+            stages.append(
+                stage(
+                    "characters",
+                    "识别人物...",
+                    lambda _: self._extract_characters(novel_id, chapters, depth, provider, model),
+                    resumed=lambda: self._load_characters(novel_id),
+                )
+            )
+        if "relationships" in features:
+            depends_on = ("characters",) if "characters" in features else ()
+            stages.append(stage("relationships", "分析关系...", relationships, depends_on))
         if "plot" in features:
-            await self._update_progress(task_id, (current_step / total_steps) * 100, "追踪情节...")
-            logger.info("Step 3: Tracking plots")
-            result["plots"] = await self._track_plots(novel_id, chapters, depth, provider, model)
-            current_step += 1
-
-        # Step 4: Summary generation
+            stages.append(
+                stage(
+                    "plot",
+                    "追踪情节...",
+                    lambda _: self._track_plots(novel_id, chapters, depth, provider, model),
+                )
+            )
         if "summary" in features:
-            await self._update_progress(task_id, (current_step / total_steps) * 100, "生成摘要...")
-            logger.info("Step 4: Generating summaries")
-            result["chapter_summaries"] = await self._generate_summaries(
-                novel_id, chapters, depth, provider, model
+            stages.append(
+                stage(
+                    "summary",
+                    "生成摘要...",
+                    lambda _: self._generate_summaries(novel_id, chapters, depth, provider, model),
+                )
+            )
+
+        scheduler = StageScheduler(
+            stages, on_progress=lambda report: self._update_progress(task_id, report)
+        )
+        results = await scheduler.run()
+        result["characters"] = results.get("characters", [])
+        result["relationships"] = results.get("relationships", [])
+        result["plots"] = results.get("plot", [])
+        result["chapter_summaries"] = results.get("summary", [])
+
+        result["served_by"] = dict(self.served_by)
+        await self.writes.write(
+            Statement.one(
+                "UPDATE analysis_tasks SET served_by = ? WHERE id = ?",
+                (json.dumps(result["served_by"]), task_id),
             )
-            current_step += 1
+        )
 
-        logger.info(f"Analysis completed for task {task_id}")
+        logger.info(f"Analysis completed for task {task_id} (served by {result['served_by']})")
         return result
 
+    async def _load_checkpoint(self) -> List[str]:
+        """Stages an interrupted task already finished (and the calls they were served by)"""
+        async with get_read_db() as db:
+            cursor = await db.execute(
+                "SELECT completed_stages, served_by FROM analysis_tasks WHERE id = ?",
+                (self.task_id,),
+            )
+            row = await cursor.fetchone()
+        if not row:
+            return []
+        if row[1]:
+            self.served_by.update(json.loads(row[1]))
+        return json.loads(row[0]) if row[0] else []
+
+    async def _complete_stage(self, completed_stages: List[str], stage: str) -> None:
+        """Record a finished stage on the task, so a resumed run skips it"""
+        completed_stages.append(stage)
+        await self.writes.write(
+            Statement.one(
+                "UPDATE analysis_tasks SET completed_stages = ?, served_by = ? WHERE id = ?",
+                (json.dumps(completed_stages), json.dumps(dict(self.served_by)), self.task_id),
+            )
+        )
+
+    @asynccontextmanager
+    async def _llm_slot(self):
+        """A slot of the task's LLM budget; once cancelled, no new call starts"""
+        self.cancel_token.raise_if_cancelled()
+        async with self.slots.slot(self.priority):
+            self.cancel_token.raise_if_cancelled()
+            yield
+
+    async def _pack_chapters(
+        self,
+        chapters: List[Dict],
+        provider: Optional[str],
+        model: Optional[str],
+        overhead: str = "",
+    ) -> str:
+        """Join chapters into one prompt text that fills the model's context budget.
+
+        Short chapters are kept whole; long ones share what is left of the budget.
+        """
+        model_name, budget = await self.llm.context_budget(provider, model)
+        headers = [f"【{ch['title']}】\n" for ch in chapters]
+        budget -= PROMPT_TEMPLATE_TOKENS + estimate_tokens("".join(headers) + overhead, model_name)
+
+        token_counts = [
+            scale_token_count(ch["token_count"], model_name) if ch.get("token_count") else None
+            for ch in chapters
+        ]
+        contents = pack_texts(
+            [ch["content"] or "" for ch in chapters], budget, model_name, token_counts
+        )
+        return "\n\n".join(header + content for header, content in zip(headers, contents))
+
     async def _get_chapters(self, novel_id: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get chapters for analysis based on config"""
-        async with get_db() as db:
+        """Get chapters for analysis based on config, with their text decompressed"""
+        async with get_read_db() as db:
             if config.get("scope") == "partial":
                 start = config.get("chapter_start", 1)
                 end = config.get("chapter_end", 100)
                 cursor = await db.execute(
                     """
-                    SELECT id, chapter_num, title, content, word_count
+                    SELECT id, chapter_num, title, word_count, token_count, content_hash
                     FROM chapters
                     WHERE novel_id = ? AND chapter_num >= ? AND chapter_num <= ?
                     ORDER BY chapter_num
@@ -123,7 +314,7 @@ class AnalysisEngine:
             else:
                 cursor = await db.execute(
                     """
-                    SELECT id, chapter_num, title, content, word_count
+                    SELECT id, chapter_num, title, word_count, token_count, content_hash
                     FROM chapters
                     WHERE novel_id = ?
                     ORDER BY chapter_num
@@ -132,13 +323,16 @@ class AnalysisEngine:
                 )
 
             rows = await cursor.fetchall()
+            contents = await load_contents(db, [row[0] for row in rows])
             return [
                 {
                     "id": row[0],
                     "chapter_num": row[1],
                     "title": row[2],
-                    "content": row[3],
-                    "word_count": row[4],
+                    "content": contents.get(row[0], ""),
+                    "word_count": row[3],
+                    "token_count": row[4],
+                    "content_hash": row[5],
                 }
                 for row in rows
             ]
@@ -154,50 +348,75 @@ class AnalysisEngine:
         """Extract characters from novel"""
         all_characters = {}
 
-        # Combine chapter texts for analysis
-        # For deeper analysis, analyze more chapters
-        sample_limit = ANALYSIS_SAMPLE_SIZES.get(depth, 10)
-        if sample_limit == -1:
-            sample_limit = len(chapters)
-
-        sampled_chapters = chapters[:sample_limit]
-
-        combined_text = "\n\n".join(
-            [f"【{ch['title']}】\n{ch['content'][:3000]}" for ch in sampled_chapters]
-        )
-
         try:
-            characters = await self.llm.analyze_characters(
-                combined_text, provider=provider, model=model
-            )
+            map_reduce = self.map_reduce if self.map_reduce is not None else depth == "deep"
+            if map_reduce or self.incremental:
+                artifacts = await self._run_units(
+                    "characters",
+                    chapters,
+                    lambda runs: self._map_characters(runs, provider, model),
+                )
+            else:
+                sampled_chapters = self._sample(chapters, depth)
+                artifacts = await self._run_units(
+                    "characters",
+                    sampled_chapters,
+                    lambda runs: self._sample_characters(sampled_chapters, provider, model),
+                    calls_for=lambda runs: 1,
+                )
+
+            chunk_results = [
+                {
+                    "chunk": index,
+                    "chapter_start": artifact["chapter_start"],
+                    "chapter_end": artifact["chapter_end"],
+                    "characters": artifact["data"],
+                }
+                for index, artifact in enumerate(artifacts)
+            ]
+            characters = merge_characters(chunk_results, total_chunks=len(chunk_results))
 
             for char in characters:
-                name = char.get("name", "").strip()
-                if not name:
+                name = char["name"]
+                if name in all_characters:
                     continue
 
-                if name not in all_characters:
-                    char_id = str(uuid.uuid4())
-                    all_characters[name] = {
-                        "id": char_id,
-                        "novel_id": novel_id,
-                        "name": name,
-                        "aliases": char.get("aliases", []),
-                        "description": char.get("description", ""),
-                        "personality": char.get("personality", ""),
-                        "first_appearance": 1,
-                        "importance_score": char.get("importance", 0.5),
-                    }
-
-            # Save to database
-            async with get_db() as db:
-                for char in all_characters.values():
-                    await db.execute(
-                        """
-                        INSERT INTO characters (id, novel_id, name, aliases, description, 
-                                               personality, first_appearance, importance_score)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
+                chunk_start, chunk_end = char["first_chunk"]
+                first_appearance = find_first_appearance(
+                    [name, *char["aliases"]], chapters, chunk_start, chunk_end
+                )
+                all_characters[name] = {
+                    "id": None,
+                    "novel_id": novel_id,
+                    "name": name,
+                    "aliases": char["aliases"],
+                    "description": char["description"],
+                    "personality": char["personality"],
+                    "first_appearance": first_appearance or chunk_start,
+                    "importance_score": char["importance"],
+                    "evidence": char["evidence"],
+                }
+            self._assign_character_ids(list(all_characters.values()))
+
+            # Save to database (upsert, so relationships of surviving characters are kept)
+            kept = [char["id"] for char in all_characters.values()]
+            await self.writes.write(
+                Statement.many(
+                    """
+                    INSERT INTO characters (id, novel_id, name, aliases, description, 
+                                           personality, first_appearance, importance_score,
+                                           evidence)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        name = excluded.name,
+                        aliases = excluded.aliases,
+                        description = excluded.description,
+                        personality = excluded.personality,
+                        first_appearance = excluded.first_appearance,
+                        importance_score = excluded.importance_score,
+                        evidence = excluded.evidence
+                    """,
+                    [
                         (
                             char["id"],
                             char["novel_id"],
@@ -207,18 +426,258 @@ class AnalysisEngine:
                             char["personality"],
                             char["first_appearance"],
                             char["importance_score"],
-                        ),
-                    )
-                await db.commit()
+                            json.dumps(char["evidence"], ensure_ascii=False),
+                        )
+                        for char in all_characters.values()
+                    ],
+                ),
+                Statement.one(
+                    f"""
+                    DELETE FROM characters
+                    WHERE novel_id = ? AND id NOT IN ({",".join("?" * len(kept))})
+                    """,
+                    (novel_id, *kept),
+                ),
+            )
 
             logger.info(f"Saved {len(all_characters)} characters to SQLite database")
 
             return list(all_characters.values())
 
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"Character extraction error: {e}")
             return []
 
+    async def _load_character_ids(self, novel_id: str) -> Dict[str, str]:
+        """Name/alias -> id of the characters currently stored (names take precedence)"""
+        characters = await self._load_characters(novel_id)
+        ids = {alias: char["id"] for char in characters for alias in char["aliases"]}
+        ids.update({char["name"]: char["id"] for char in characters})
+        return ids
+
+    async def _load_characters(self, novel_id: str) -> List[Dict]:
+        """Characters stored by a previous run (for relationship analysis)"""
+        async with get_read_db() as db:
+            cursor = await db.execute(
+                "SELECT id, name, aliases FROM characters WHERE novel_id = ?", (novel_id,)
+            )
+            rows = await cursor.fetchall()
+        return [
+            {"id": row[0], "name": row[1], "aliases": row[2].split(",") if row[2] else []}
+            for row in rows
+        ]
+
+    def _assign_character_ids(self, characters: List[Dict]) -> None:
+        """Reuse the id of the previous run's character with the same name (else an alias)"""
+        taken = set()
+        for pass_aliases in (False, True):
+            for char in characters:
+                if char["id"] is not None:
+                    continue
+                names = [char["name"], *char["aliases"]] if pass_aliases else [char["name"]]
+                for name in names:
+                    char_id = self.previous_ids.get(name)
+                    if char_id and char_id not in taken:
+                        char["id"] = char_id
+                        taken.add(char_id)
+                        break
+        for char in characters:
+            if char["id"] is None:
+                char["id"] = str(uuid.uuid4())
+
+    def _sample(self, chapters: List[Dict], depth: str) -> List[Dict]:
+        """First chapters read by the single-call (sampled) analyses"""
+        sample_limit = ANALYSIS_SAMPLE_SIZES.get(depth, 10)
+        if sample_limit == -1:
+            sample_limit = len(chapters)
+        return chapters[:sample_limit]
+
+    async def _run_units(
+        self,
+        kind: str,
+        chapters: List[Dict],
+        analyze_runs: Callable[[List[List[Dict]]], Awaitable[List[Dict]]],
+        calls_for: Optional[Callable[[List[List[Dict]]], int]] = None,
+    ) -> List[Dict]:
+        """Run a stage's units of work over `chapters`, skipping the ones already done.
+
+        A stored artifact is reused when it was made from the chapters' current text
+        with the same prompt version and model, and either this task made it (resume
+        after an interruption) or the run is incremental. `analyze_runs` receives runs
+        of consecutive chapters still to analyse and returns their artifacts, each one
+        checkpointed as it completes. `calls_for` tells how many LLM calls the runs take,
+        when known up front (for the ETA). Returns the stage's artifacts in chapter order.
+        """
+        hashes = chapter_inputs(chapters)
+        version = PROMPT_VERSIONS[kind]
+        done = [
+            artifact
+            for artifact in await load_artifacts(self.novel_id, kind)
+            if is_current(artifact, hashes, version, self.model_key)
+            and (self.incremental or artifact["task_id"] == self.task_id)
+        ]
+        covered = covered_chapters(done)
+        # Pieces of a chapter not finished in full are redone with the rest of it
+        done = [a for a in done if a["part"] is None or a["inputs"].keys() <= covered]
+        runs = stale_runs(chapters, covered)
+        stage = current_stage.get()
+        if stage is not None:
+            stage.start(
+                chapter_sizes(chapters),
+                covered & hashes.keys(),
+                calls=calls_for(runs) if calls_for and runs else None,
+            )
+        if done:
+            logger.info(
+                f"{kind}: reusing {len(done)} finished units, "
+                f"analysing {sum(len(run) for run in runs)} chapters"
+            )
+
+        fresh = await analyze_runs(runs) if runs else []
+        await prune_artifacts(self.novel_id, kind, {a["id"] for a in done + fresh})
+        return sorted(done + fresh, key=lambda artifact: artifact["chapter_start"])
+
+    async def _checkpoint(self, kind: str, artifact: Dict) -> Dict:
+        """Store a finished unit of work so an interrupted task does not redo it.
+
+        The call is counted towards the provider/model that answered it, and the counts
+        are stored with the unit, so a resumed task keeps the attribution of units
+        finished before the interruption.
+        """
+        self.served_by[artifact["served_by"]] += 1
+        await save_artifact(
+            self.novel_id,
+            kind,
+            artifact,
+            self.task_id,
+            Statement.one(
+                "UPDATE analysis_tasks SET served_by = ? WHERE id = ?",
+                (json.dumps(dict(self.served_by)), self.task_id),
+            ),
+        )
+        stage = current_stage.get()
+        if stage is not None:
+            stage.advance(artifact["inputs"])
+            self.events.publish(
+                self.task_id,
+                {
+                    "type": "unit",
+                    "stage": kind,
+                    "chapters": [artifact["chapter_start"], artifact["chapter_end"]],
+                    "done": len(stage.done),
+                    "total": stage.total,
+                },
+            )
+        return artifact
+
+    async def _sample_characters(
+        self,
+        sampled_chapters: List[Dict],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> List[Dict]:
+        """Single extraction call over the sampled chapters (quick/standard analysis)"""
+        combined_text = await self._pack_chapters(sampled_chapters, provider, model)
+        async with self._llm_slot():
+            response = await self.llm.analyze_characters(
+                combined_text, provider=provider, model=model, use_cache=self.use_cache
+            )
+        if not response.data:
+            logger.warning("Character extraction returned nothing for the sampled chapters")
+            return []
+        artifact = make_artifact(
+            sampled_chapters,
+            PROMPT_VERSIONS["characters"],
+            self.model_key,
+            response.data,
+            response.served_by,
+        )
+        return [await self._checkpoint("characters", artifact)]
+
+    async def _map_characters(
+        self,
+        runs: List[List[Dict]],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> List[Dict]:
+        """Map step: extract characters from every token-budgeted chunk in parallel.
+
+        `runs` are lists of consecutive chapters; chunks never span two runs.
+        """
+        model_name, budget = await self.llm.context_budget(provider, model)
+        chunk_budget = min(budget, CHARACTER_CHUNK_MAX_TOKENS) - PROMPT_TEMPLATE_TOKENS
+        chunks = [
+            chunk for run in runs for chunk in self._plan_chunks(run, chunk_budget, model_name)
+        ]
+        logger.info(f"Map-reduce character extraction over {len(chunks)} chunks")
+
+        async def map_chunk(index: int, chunk: List[tuple]) -> Optional[Dict]:
+            async with self._llm_slot():
+                text = "\n\n".join(f"【{ch['title']}】\n{piece}" for ch, piece in chunk)
+                try:
+                    response = await self.llm.analyze_characters(
+                        text, provider=provider, model=model, use_cache=self.use_cache
+                    )
+                except Exception as e:
+                    # A failed chunk costs some evidence, not the whole extraction
+                    logger.error(f"Character extraction failed for chunk {index + 1}: {e}")
+                    return None
+                if not response.data:
+                    # Failed validation or found nothing: not checkpointed, so it is redone
+                    logger.warning(f"Character extraction returned nothing for chunk {index + 1}")
+                    return None
+                artifact = make_artifact(
+                    [ch for ch, _ in chunk],
+                    PROMPT_VERSIONS["characters"],
+                    self.model_key,
+                    response.data,
+                    response.served_by,
+                )
+                return await self._checkpoint("characters", artifact)
+
+        results = await asyncio.gather(*[map_chunk(i, c) for i, c in enumerate(chunks)])
+        return [r for r in results if r is not None]
+
+    def _plan_chunks(self, chapters: List[Dict], budget: int, model_name: str) -> List[List[tuple]]:
+        """Group consecutive chapters into chunks of at most `budget` tokens.
+
+        Each chunk is a list of (chapter, text) pairs; chapters larger than the budget
+        are split across several chunks, one piece each, with the chapter marked
+        "part": [index, count] so its artifacts tell the pieces apart.
+        """
+        chunks: List[List[tuple]] = []
+        current: List[tuple] = []
+        used = 0
+        for ch in chapters:
+            content = ch["content"] or ""
+            size = (
+                scale_token_count(ch["token_count"], model_name)
+                if ch.get("token_count")
+                else estimate_tokens(content, model_name)
+            ) + estimate_tokens(ch["title"] or "", model_name)
+
+            if size > budget:
+                if current:
+                    chunks.append(current)
+                    current, used = [], 0
+                pieces = split_by_tokens(content, budget, model_name)
+                chunks.extend(
+                    [({**ch, "part": [index, len(pieces)]}, piece)]
+                    for index, piece in enumerate(pieces)
+                )
+                continue
+            if used + size > budget and current:
+                chunks.append(current)
+                current, used = [], 0
+            current.append((ch, content))
+            used += size
+
+        if current:
+            chunks.append(current)
+        return chunks
+
     async def _analyze_relationships(
         self,
         novel_id: str,
@@ -229,89 +688,194 @@ class AnalysisEngine:
         model: Optional[str] = None,
     ) -> List[Dict]:
         """Analyze relationships between characters"""
-        sample_limit = ANALYSIS_SAMPLE_SIZES.get(depth, 10)
-        if sample_limit == -1:
-            sample_limit = len(chapters)
-
-        sampled_chapters = chapters[:sample_limit]
-
-        combined_text = "\n\n".join(
-            [f"【{ch['title']}】\n{ch['content'][:2000]}" for ch in sampled_chapters]
-        )
-
         try:
-            relationships = await self.llm.analyze_relationships(
-                characters, combined_text, provider=provider, model=model
-            )
-
-            # Create name/alias to ID mapping for smarter matching
-            name_map = {}
-            for c in characters:
-                c_id = c["id"]
-                # Map full name
-                name_map[c["name"]] = c_id
-                # Map aliases
-                if "aliases" in c and isinstance(c["aliases"], list):
-                    for alias in c["aliases"]:
-                        if alias:
-                            name_map[alias] = c_id
-
-            result = []
-            for rel in relationships:
-                source_name = rel.get("source", "")
-                target_name = rel.get("target", "")
-
-                # Try to find ID by name or alias
-                source_id = name_map.get(source_name)
-                target_id = name_map.get(target_name)
+            if self.incremental:
+                # Chunks of unchanged chapters keep their relationships even when later
+                # chunks introduce new characters; a full run re-reads everything
+                artifacts = await self._run_units(
+                    "relationships",
+                    chapters,
+                    lambda runs: self._map_relationships(runs, characters, provider, model),
+                )
+            else:
+                sampled_chapters = self._sample(chapters, depth)
+                artifacts = await self._run_units(
+                    "relationships",
+                    sampled_chapters,
+                    lambda runs: self._sample_relationships(
+                        characters, sampled_chapters, provider, model
+                    ),
+                    calls_for=lambda runs: 1,
+                )
 
-                if source_id and target_id:
-                    rel_data = {
-                        "id": str(uuid.uuid4()),
-                        "source_id": source_id,
-                        "target_id": target_id,
-                        "source_name": source_name,
-                        "target_name": target_name,
-                        "type": rel.get("type", "other"),
-                        "subtype": rel.get("subtype"),
-                        "strength": rel.get("strength", 0.5),
-                        "first_chapter": 1,
-                        "description": rel.get("description", ""),
-                    }
-                    result.append(rel_data)
+            result = self._resolve_relationships(artifacts, characters)
 
             # Save relationships to SQLite
-            if result:
-                async with get_db() as db:
-                    for rel in result:
-                        await db.execute(
-                            """
-                            INSERT INTO relationships (id, novel_id, source_id, target_id, type, 
-                                                      subtype, description, strength, first_chapter)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """,
-                            (
-                                rel["id"],
-                                novel_id,
-                                rel["source_id"],
-                                rel["target_id"],
-                                rel["type"],
-                                rel.get("subtype"),
-                                rel["description"],
-                                rel["strength"],
-                                rel["first_chapter"],
-                            ),
+            await self.writes.write(
+                Statement.one("DELETE FROM relationships WHERE novel_id = ?", (novel_id,)),
+                Statement.many(
+                    """
+                    INSERT INTO relationships (id, novel_id, source_id, target_id, type, 
+                                              subtype, description, strength, first_chapter)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            rel["id"],
+                            novel_id,
+                            rel["source_id"],
+                            rel["target_id"],
+                            rel["type"],
+                            rel.get("subtype"),
+                            rel["description"],
+                            rel["strength"],
+                            rel["first_chapter"],
                         )
-                    await db.commit()
+                        for rel in result
+                    ],
+                ),
+            )
+            if result:
                 logger.info(f"Saved {len(result)} relationships to SQLite database")
 
             logger.info(f"Processed {len(result)} relationships")
             return result
 
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"Relationship analysis error: {e}")
             return []
 
+    async def _sample_relationships(
+        self,
+        characters: List[Dict],
+        sampled_chapters: List[Dict],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> List[Dict]:
+        """Single relationship call over the sampled chapters"""
+        char_names = ", ".join(c["name"] for c in characters)
+
+        combined_text = await self._pack_chapters(
+            sampled_chapters, provider, model, overhead=char_names
+        )
+        async with self._llm_slot():
+            response = await self.llm.analyze_relationships(
+                characters,
+                combined_text,
+                provider=provider,
+                model=model,
+                use_cache=self.use_cache,
+            )
+        if not response.data:
+            logger.warning("Relationship analysis returned nothing for the sampled chapters")
+            return []
+        artifact = make_artifact(
+            sampled_chapters,
+            PROMPT_VERSIONS["relationships"],
+            self.model_key,
+            response.data,
+            response.served_by,
+        )
+        return [await self._checkpoint("relationships", artifact)]
+
+    async def _map_relationships(
+        self,
+        runs: List[List[Dict]],
+        characters: List[Dict],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> List[Dict]:
+        """Analyze relationships chunk by chunk over runs of consecutive chapters"""
+        char_names = ", ".join(c["name"] for c in characters)
+        model_name, budget = await self.llm.context_budget(provider, model)
+        chunk_budget = (
+            min(budget, CHARACTER_CHUNK_MAX_TOKENS)
+            - PROMPT_TEMPLATE_TOKENS
+            - estimate_tokens(char_names, model_name)
+        )
+        chunks = [
+            chunk for run in runs for chunk in self._plan_chunks(run, chunk_budget, model_name)
+        ]
+        logger.info(f"Relationship analysis over {len(chunks)} chunks")
+
+        async def map_chunk(index: int, chunk: List[tuple]) -> Optional[Dict]:
+            async with self._llm_slot():
+                text = "\n\n".join(f"【{ch['title']}】\n{piece}" for ch, piece in chunk)
+                try:
+                    response = await self.llm.analyze_relationships(
+                        characters, text, provider=provider, model=model, use_cache=self.use_cache
+                    )
+                except Exception as e:
+                    logger.error(f"Relationship analysis failed for chunk {index + 1}: {e}")
+                    return None
+                if not response.data:
+                    # Failed validation or found nothing: not checkpointed, so it is redone
+                    logger.warning(f"Relationship analysis returned nothing for chunk {index + 1}")
+                    return None
+                artifact = make_artifact(
+                    [ch for ch, _ in chunk],
+                    PROMPT_VERSIONS["relationships"],
+                    self.model_key,
+                    response.data,
+                    response.served_by,
+                )
+                return await self._checkpoint("relationships", artifact)
+
+        results = await asyncio.gather(*[map_chunk(i, c) for i, c in enumerate(chunks)])
+        return [r for r in results if r is not None]
+
+    def _resolve_relationships(self, artifacts: List[Dict], characters: List[Dict]) -> List[Dict]:
+        """Map relationship names to character ids, one relationship per ordered pair.
+
+        When several chunks report the same pair, the strongest report is kept and
+        first_chapter is the earliest chunk that mentions it.
+        """
+        # Create name/alias to ID mapping for smarter matching
+        name_map = {}
+        for c in characters:
+            c_id = c["id"]
+            # Map full name
+            name_map[c["name"]] = c_id
+            # Map aliases
+            if "aliases" in c and isinstance(c["aliases"], list):
+                for alias in c["aliases"]:
+                    if alias:
+                        name_map[alias] = c_id
+
+        pairs: Dict[tuple, Dict] = {}
+        for artifact in artifacts:
+            for rel in artifact["data"] or []:
+                source_name = rel.get("source", "")
+                target_name = rel.get("target", "")
+
+                # Try to find ID by name or alias
+                source_id = name_map.get(source_name)
+                target_id = name_map.get(target_name)
+                if not (source_id and target_id):
+                    continue
+
+                rel_data = {
+                    "id": str(uuid.uuid4()),
+                    "source_id": source_id,
+                    "target_id": target_id,
+                    "source_name": source_name,
+                    "target_name": target_name,
+                    "type": rel.get("type", "other"),
+                    "subtype": rel.get("subtype"),
+                    "strength": rel.get("strength", 0.5),
+                    "first_chapter": artifact["chapter_start"],
+                    "description": rel.get("description", ""),
+                }
+                existing = pairs.get((source_id, target_id))
+                if existing is None:
+                    pairs[(source_id, target_id)] = rel_data
+                elif rel_data["strength"] > existing["strength"]:
+                    rel_data["first_chapter"] = existing["first_chapter"]
+                    pairs[(source_id, target_id)] = rel_data
+        return list(pairs.values())
+
     async def _track_plots(
         self,
         novel_id: str,
@@ -324,6 +888,9 @@ class AnalysisEngine:
         # This would involve more complex analysis
         # For now, return empty list
         logger.warning("Plot tracking not fully implemented yet")
+        await self.writes.write(
+            Statement.one("DELETE FROM plot_events WHERE novel_id = ?", (novel_id,))
+        )
         return []
 
     async def _generate_summaries(
@@ -342,23 +909,71 @@ class AnalysisEngine:
 
         target_chapters = chapters[:limit]
 
-        logger.info(f"Generating summaries for {len(target_chapters)} chapters")
+        artifacts = await self._run_units(
+            "summary",
+            target_chapters,
+            lambda runs: self._summarize([ch for run in runs for ch in run], provider, model),
+            calls_for=lambda runs: sum(len(run) for run in runs),
+        )
+
+        by_num = {ch["chapter_num"]: ch for ch in target_chapters}
+        valid_results = [
+            {
+                "chapter_id": by_num[artifact["chapter_start"]]["id"],
+                "chapter_num": artifact["chapter_start"],
+                "summary": artifact["data"],
+                "served_by": artifact["served_by"],
+            }
+            for artifact in artifacts
+            if artifact["chapter_start"] in by_num
+        ]
+
+        # Replace the previous summaries in one transaction
+        await self.writes.write(
+            Statement.one(
+                "UPDATE chapters SET summary = NULL, summary_model = NULL WHERE novel_id = ?",
+                (novel_id,),
+            ),
+            Statement.many(
+                "UPDATE chapters SET summary = ?, summary_model = ? WHERE id = ?",
+                [(r["summary"], r["served_by"], r["chapter_id"]) for r in valid_results],
+            ),
+        )
+        logger.info(f"Batch updated summaries for {len(valid_results)} chapters")
+
+        return valid_results
 
-        # Concurrency control
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_REQUESTS)
+    async def _summarize(
+        self,
+        chapters: List[Dict],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> List[Dict]:
+        """Summarize chapters concurrently, one artifact per chapter (failures are skipped)"""
+        logger.info(f"Generating summaries for {len(chapters)} chapters")
 
         async def process_chapter(chapter: Dict) -> Optional[Dict]:
-            async with semaphore:
+            async with self._llm_slot():
                 try:
-                    summary = await self.llm.generate_summary(
-                        chapter["content"], provider=provider, model=model
+                    response = await self.llm.generate_summary(
+                        chapter["content"],
+                        provider=provider,
+                        model=model,
+                        use_cache=self.use_cache,
                     )
+                    if not response.text.strip():
+                        # Not checkpointed, so the chapter is summarized again next run
+                        logger.warning(f"Empty summary for chapter {chapter['chapter_num']}")
+                        return None
 
-                    return {
-                        "chapter_id": chapter["id"],
-                        "chapter_num": chapter["chapter_num"],
-                        "summary": summary,
-                    }
+                    artifact = make_artifact(
+                        [chapter],
+                        PROMPT_VERSIONS["summary"],
+                        self.model_key,
+                        response.text,
+                        response.served_by,
+                    )
+                    return await self._checkpoint("summary", artifact)
                 except Exception as e:
                     logger.error(
                         f"Summary generation error for chapter {chapter['chapter_num']}: {e}"
@@ -366,38 +981,48 @@ class AnalysisEngine:
                     return None
 
         # Execute tasks concurrently
-        tasks = [process_chapter(chapter) for chapter in target_chapters]
+        tasks = [process_chapter(chapter) for chapter in chapters]
         results = await asyncio.gather(*tasks)
 
-        # Filter out failed results
-        valid_results = [r for r in results if r is not None]
+        # Filter out failed results, keeping chapter order
+        return [r for r in results if r is not None]
 
-        # Sort by chapter number to maintain order
-        valid_results.sort(key=lambda x: x["chapter_num"])
-
-        # Batch update database
-        if valid_results:
-            async with get_db() as db:
-                await db.executemany(
-                    "UPDATE chapters SET summary = ? WHERE id = ?",
-                    [(r["summary"], r["chapter_id"]) for r in valid_results],
-                )
-                await db.commit()
-            logger.info(f"Batch updated summaries for {len(valid_results)} chapters")
-
-        return valid_results
-
-    async def _update_progress(self, task_id: str, progress: float, message: Optional[str] = None):
-        """Update task progress in database"""
-        async with get_db() as db:
-            if message:
-                await db.execute(
-                    "UPDATE analysis_tasks SET progress = ?, progress_message = ? WHERE id = ?",
-                    (progress, message, task_id)
-                )
-            else:
-                await db.execute(
-                    "UPDATE analysis_tasks SET progress = ? WHERE id = ?",
-                    (progress, task_id)
-                )
-            await db.commit()
+    async def _update_progress(self, task_id: str, report: ProgressReport):
+        """Publish task progress; store it in the database at coarse intervals only"""
+        message = report.message or None
+        self.events.publish(
+            task_id,
+            {
+                "type": "progress",
+                "progress": report.progress,
+                "message": message,
+                "units_done": report.units_done,
+                "units_total": report.units_total,
+                "eta_seconds": report.eta_seconds,
+            },
+        )
+        now = time.monotonic()
+        recent = now - self._stored_at < ANALYSIS_PROGRESS_STORE_INTERVAL
+        if message == self._stored_message and recent:
+            return
+        self._stored_message, self._stored_at = message, now
+        # Not waited for: a lost progress update is harmless. Only while the task runs:
+        # updates still queued when it is cancelled must not replace its final message
+        self.writes.submit(
+            Statement.one(
+                """
+                UPDATE analysis_tasks
+                SET progress = ?, progress_message = COALESCE(?, progress_message),
+                    units_done = ?, units_total = ?, eta_seconds = ?
+                WHERE id = ? AND status = 'analyzing'
+                """,
+                (
+                    report.progress,
+                    message,
+                    report.units_done,
+                    report.units_total,
+                    report.eta_seconds,
+                    task_id,
+                ),
+            )
+        )
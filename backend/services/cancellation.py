@@ -0,0 +1,32 @@
+"""
+Cooperative cancellation of analysis tasks
+"""
+
+from typing import Optional
+
+
+class AnalysisCancelled(Exception):
+    """Raised between units of work once the task has been cancelled"""
+
+
+class CancellationToken:
+    """Checked by the analysis engine before it starts each unit of work (LLM call).
+
+    Cancelling the token stops new work; the caller also cancels the asyncio task so
+    that requests already in flight are aborted.
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self.reason is None:
+            self.reason = reason
+
+    def raise_if_cancelled(self) -> None:
+        if self.reason is not None:
+            raise AnalysisCancelled(self.reason)
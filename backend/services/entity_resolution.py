@@ -0,0 +1,149 @@
+"""
+Entity resolution - merge characters extracted from separate chunks of a novel
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from constants import CHARACTER_EVIDENCE_LIMIT, GENERIC_CHARACTER_TITLES
+
+_STRIP_RE = re.compile(r"[\s·•・.\-_\"'“”‘’「」『』（）()]")
+
+
+def normalize_name(name: str) -> str:
+    """Comparison key for a character name or alias"""
+    return _STRIP_RE.sub("", name or "").lower()
+
+
+def _usable_alias(key: str) -> bool:
+    """Generic titles (师父, 少爷...) and single characters must not link entities"""
+    return len(key) >= 2 and key not in GENERIC_CHARACTER_TITLES
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the earliest record as root
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def merge_characters(
+    chunk_results: List[Dict[str, Any]], total_chunks: int
+) -> List[Dict[str, Any]]:
+    """Merge per-chunk character lists into one entity per character.
+
+    Args:
+        chunk_results: [{"chunk": i, "chapter_start": n, "chapter_end": m, "characters": [...]}]
+            in chunk order, each character as returned by LLMService.analyze_characters
+        total_chunks: number of chunks the novel was split into (for importance)
+
+    Records are linked when they share a name, or when one's alias is another's name.
+    Alias-to-alias matches alone never link, so two people both called "少主" stay apart.
+    """
+    records = []
+    for result in sorted(chunk_results, key=lambda r: r["chunk"]):
+        for char in result["characters"]:
+            key = normalize_name(char.get("name", ""))
+            if key:
+                records.append((result, char, key))
+    if not records:
+        return []
+
+    uf = _UnionFind(len(records))
+    by_name: Dict[str, int] = {}
+    for i, (_, _, key) in enumerate(records):
+        if key in by_name:
+            uf.union(i, by_name[key])
+        else:
+            by_name[key] = i
+    for i, (_, char, _) in enumerate(records):
+        for alias in char.get("aliases") or []:
+            alias_key = normalize_name(alias)
+            if _usable_alias(alias_key) and alias_key in by_name:
+                uf.union(i, by_name[alias_key])
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(records)):
+        groups.setdefault(uf.find(i), []).append(i)
+
+    return [
+        _merge_group([records[i] for i in members], total_chunks) for members in groups.values()
+    ]
+
+
+def _merge_group(members: List[tuple], total_chunks: int) -> Dict[str, Any]:
+    """Combine the records of one entity (members are in chunk order)"""
+    chars = [char for _, char, _ in members]
+    names = Counter(char["name"].strip() for char in chars)
+    # Most frequent name wins; Counter keeps first-seen order on ties
+    canonical = names.most_common(1)[0][0]
+
+    aliases: List[str] = []
+    for char in chars:
+        for alias in [char["name"], *(char.get("aliases") or [])]:
+            alias = (alias or "").strip()
+            if alias and alias != canonical and alias not in aliases:
+                aliases.append(alias)
+
+    best = max(chars, key=lambda c: c.get("importance") or 0.0)
+    importance = best.get("importance") or 0.5
+    chunks_present = len({result["chunk"] for result, _, _ in members})
+    if total_chunks > 1:
+        # Characters present throughout the novel matter more than one-chunk cameos
+        importance = min(1.0, 0.7 * importance + 0.3 * chunks_present / total_chunks)
+
+    evidence = []
+    seen_chunks = set()
+    for result, char, _ in members:
+        if result["chunk"] in seen_chunks:
+            continue
+        seen_chunks.add(result["chunk"])
+        evidence.append(
+            {
+                "chapters": [result["chapter_start"], result["chapter_end"]],
+                "name": char["name"],
+                "description": char.get("description") or "",
+            }
+        )
+
+    first = members[0][0]
+    return {
+        "name": canonical,
+        "aliases": aliases,
+        "description": best.get("description") or _longest(chars, "description"),
+        "personality": best.get("personality") or _longest(chars, "personality"),
+        "importance": round(importance, 3),
+        "evidence": evidence[:CHARACTER_EVIDENCE_LIMIT],
+        "first_chunk": (first["chapter_start"], first["chapter_end"]),
+    }
+
+
+def _longest(chars: List[Dict[str, Any]], field: str) -> str:
+    return max((c.get(field) or "" for c in chars), key=len)
+
+
+def find_first_appearance(
+    names: List[str], chapters: List[Dict[str, Any]], start: int, end: int
+) -> Optional[int]:
+    """First chapter number within [start, end] whose text mentions any of the names"""
+    needles = [name for name in names if len(name) >= 2]
+    for chapter in chapters:
+        if chapter["chapter_num"] < start:
+            continue
+        if chapter["chapter_num"] > end:
+            break
+        content = chapter.get("content") or ""
+        if any(name in content for name in needles):
+            return chapter["chapter_num"]
+    return None
@@ -6,7 +6,7 @@ import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-from database.sqlite_db import get_db
+from database.sqlite_db import get_read_db
 from utils.logger import logger
 from utils.json_utils import safe_json_loads
 from constants import RELATIONSHIP_TYPE_NAMES, EVENT_TYPE_NAMES
@@ -18,7 +18,7 @@ class ExportService:
     async def get_novel_data(self, novel_id: str) -> Dict[str, Any]:
         """Get all data for a novel including characters and relationships"""
         try:
-            async with get_db() as db:
+            async with get_read_db() as db:
                 # Get novel info
                 try:
                     cursor = await db.execute("SELECT * FROM novels WHERE id = ?", (novel_id,))
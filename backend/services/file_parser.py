@@ -2,8 +2,9 @@
 File parser service for various novel formats
 """
 
+import asyncio
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
 from utils.encoding_utils import decode_content
 from constants import CHAPTER_PATTERNS
@@ -21,7 +22,7 @@ class FileParser:
         )
 
     async def parse(self, content: bytes, file_ext: str, filename: str) -> Dict[str, Any]:
-        """Parse file content based on extension"""
+        """Parse file content based on extension (decoding runs in a worker thread)"""
 
         if file_ext == ".txt":
             return await self._parse_txt(content, filename)
@@ -34,10 +35,31 @@ class FileParser:
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
 
+    async def parse_stream(self, content: bytes, file_ext: str, filename: str) -> Dict[str, Any]:
+        """Like parse(), but "chapters" is an iterator that splits them off as it is consumed.
+
+        There is no "total_words": the consumer counts while it stores the chapters.
+        Decoding runs in a worker thread, off the event loop.
+        """
+        if file_ext == ".txt":
+            text = await asyncio.to_thread(decode_content, content)
+        elif file_ext == ".docx":
+            text = await asyncio.to_thread(self._docx_text, content)
+        else:
+            parsed = await self.parse(content, file_ext, filename)
+            parsed["chapters"] = iter(parsed["chapters"])
+            return parsed
+
+        return {
+            "title": filename.rsplit(".", 1)[0],
+            "author": self._extract_author(text),
+            "chapters": self.iter_chapters(text),
+        }
+
     async def _parse_txt(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse TXT file"""
         # Use centralized decoding utility
-        text = decode_content(content)
+        text = await asyncio.to_thread(decode_content, content)
 
         # Extract title from filename
         title = filename.rsplit(".", 1)[0]
@@ -57,30 +79,35 @@ class FileParser:
 
     async def _parse_docx(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse DOCX file"""
+        text = await asyncio.to_thread(self._docx_text, content)
+
+        title = filename.rsplit(".", 1)[0]
+        chapters = self._split_chapters(text)
+        total_words = sum(ch["word_count"] for ch in chapters)
+
+        return {
+            "title": title,
+            "author": self._extract_author(text),
+            "chapters": chapters,
+            "total_words": total_words,
+        }
+
+    def _docx_text(self, content: bytes) -> str:
+        """Extract the text of all paragraphs of a DOCX file"""
         try:
             from docx import Document
             from io import BytesIO
 
             doc = Document(BytesIO(content))
-
-            # Extract all paragraphs
-            text = "\n".join([para.text for para in doc.paragraphs])
-
-            title = filename.rsplit(".", 1)[0]
-            chapters = self._split_chapters(text)
-            total_words = sum(ch["word_count"] for ch in chapters)
-
-            return {
-                "title": title,
-                "author": self._extract_author(text),
-                "chapters": chapters,
-                "total_words": total_words,
-            }
+            return "\n".join([para.text for para in doc.paragraphs])
         except ImportError:
             raise ImportError("python-docx is required for DOCX parsing")
 
     async def _parse_epub(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Parse EPUB file"""
+        return await asyncio.to_thread(self._read_epub, content, filename)
+
+    def _read_epub(self, content: bytes, filename: str) -> Dict[str, Any]:
         try:
             from ebooklib import epub
             from bs4 import BeautifulSoup
@@ -136,19 +163,23 @@ class FileParser:
 
     def _split_chapters(self, text: str) -> List[Dict[str, Any]]:
         """Split text into chapters based on chapter patterns"""
-        lines = text.split("\n")
-        chapters = []
+        return list(self.iter_chapters(text))
+
+    def iter_chapters(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Yield the chapters of a text one by one, as each chapter title is reached"""
+        found = False
         current_chapter = {"title": "前言/序章", "content": [], "word_count": 0}
 
-        for line in lines:
+        for line in text.split("\n"):
             # Check if line matches chapter pattern
             if self.chapter_pattern.match(line.strip()):
-                # Save current chapter if it has content
+                # Emit current chapter if it has content
                 if current_chapter["content"]:
                     current_chapter["content"] = "\n".join(current_chapter["content"])
                     current_chapter["word_count"] = len(current_chapter["content"])
                     if current_chapter["word_count"] > 0:
-                        chapters.append(current_chapter)
+                        found = True
+                        yield current_chapter
 
                 # Start new chapter
                 current_chapter = {"title": line.strip(), "content": [], "word_count": 0}
@@ -160,13 +191,12 @@ class FileParser:
             current_chapter["content"] = "\n".join(current_chapter["content"])
             current_chapter["word_count"] = len(current_chapter["content"])
             if current_chapter["word_count"] > 0:
-                chapters.append(current_chapter)
+                found = True
+                yield current_chapter
 
         # If no chapters were found, treat entire text as one chapter
-        if not chapters:
-            chapters = [{"title": "全文", "content": text, "word_count": len(text)}]
-
-        return chapters
+        if not found:
+            yield {"title": "全文", "content": text, "word_count": len(text)}
 
     def _extract_author(self, text: str) -> Optional[str]:
         """Try to extract author from text"""
@@ -1,6 +1,6 @@
 import networkx as nx
 from typing import List, Dict, Optional
-from database.sqlite_db import get_db
+from database.sqlite_db import get_read_db
 from utils.logger import logger
 
 
@@ -12,7 +12,7 @@ class GraphService:
         G = nx.Graph()
 
         try:
-            async with get_db() as db:
+            async with get_read_db() as db:
                 # Load characters as nodes
                 cursor = await db.execute(
                     "SELECT id, name, importance_score FROM characters WHERE novel_id = ?",
@@ -0,0 +1,320 @@
+"""
+Analysis job queue - analysis tasks stored in SQLite, run by a pool of async workers
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from constants import (
+    ANALYSIS_DEPTH_PRIORITY,
+    ANALYSIS_HEARTBEAT_INTERVAL,
+    ANALYSIS_LEASE_TTL,
+    ANALYSIS_QUEUE_POLL_INTERVAL,
+)
+from database.sqlite_db import get_db
+from services.stage_scheduler import PrioritySemaphore
+from utils.logger import logger
+
+# Fields that do not change what a job computes, ignored when deduplicating
+_DEDUP_IGNORED = ("cancel_policy", "priority")
+
+
+@dataclass
+class Job:
+    """A claimed analysis task"""
+
+    task_id: str
+    novel_id: str
+    config: str  # AnalysisConfig as JSON
+    priority: int
+    # Claimed before (interrupted or lease expired): continue from its checkpoint
+    resume: bool
+
+
+def dedup_key(config: Dict[str, Any]) -> str:
+    """Jobs for the same novel with the same config share a key"""
+    relevant = {k: v for k, v in config.items() if k not in _DEDUP_IGNORED}
+    payload = json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def job_priority(config: Dict[str, Any]) -> int:
+    """Lower runs first: quick (interactive) runs before standard, standard before deep"""
+    if config.get("priority") is not None:
+        return config["priority"]
+    return ANALYSIS_DEPTH_PRIORITY.get(config.get("depth", "standard"), 1)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _lease_expiry() -> str:
+    return (datetime.now() + timedelta(seconds=ANALYSIS_LEASE_TTL)).isoformat()
+
+
+async def enqueue(novel_id: str, config: Dict[str, Any], config_json: str) -> Tuple[str, bool]:
+    """Queue an analysis, or return the queued/running task with the same config.
+
+    Returns (task_id, created).
+    """
+    key = dedup_key(config)
+    async with get_db() as db:
+        # Take the write lock before checking, so two requests cannot both insert
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute(
+            """
+            SELECT id FROM analysis_tasks
+            WHERE dedup_key = ? AND status IN ('pending', 'analyzing')
+            """,
+            (key,),
+        )
+        row = await cursor.fetchone()
+        if row:
+            await db.rollback()
+            return row[0], False
+
+        task_id = str(uuid.uuid4())
+        await db.execute(
+            """
+            INSERT INTO analysis_tasks
+                (id, novel_id, status, progress, progress_message, config,
+                 priority, dedup_key, enqueued_at)
+            VALUES (?, ?, 'pending', 0, '排队中...', ?, ?, ?, ?)
+            """,
+            (task_id, novel_id, config_json, job_priority(config), key, _now()),
+        )
+        await db.commit()
+    return task_id, True
+
+
+async def claim(worker_id: str) -> Optional[Job]:
+    """Lease the next job: lowest priority value first, then oldest.
+
+    A novel only has one job running at a time, since jobs replace its results.
+    """
+    async with get_db() as db:
+        cursor = await db.execute(
+            """
+            UPDATE analysis_tasks
+            SET status = 'analyzing', lease_owner = ?, lease_expires_at = ?,
+                attempts = COALESCE(attempts, 0) + 1
+            WHERE id = (
+                SELECT id FROM analysis_tasks
+                WHERE status = 'pending'
+                  AND novel_id NOT IN (
+                      SELECT novel_id FROM analysis_tasks WHERE status = 'analyzing'
+                  )
+                ORDER BY priority, enqueued_at, rowid
+                LIMIT 1
+            )
+            RETURNING id, novel_id, config, priority, attempts
+            """,
+            (worker_id, _lease_expiry()),
+        )
+        row = await cursor.fetchone()
+        await db.commit()
+
+    if row is None:
+        return None
+    return Job(
+        task_id=row[0], novel_id=row[1], config=row[2], priority=row[3] or 0, resume=row[4] > 1
+    )
+
+
+async def renew_lease(task_id: str, worker_id: str) -> bool:
+    """Extend a running job's lease; False if the worker no longer holds it"""
+    async with get_db() as db:
+        cursor = await db.execute(
+            """
+            UPDATE analysis_tasks SET lease_expires_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (_lease_expiry(), task_id, worker_id),
+        )
+        await db.commit()
+        return cursor.rowcount == 1
+
+
+async def release_lease(task_id: str, worker_id: str) -> None:
+    async with get_db() as db:
+        await db.execute(
+            """
+            UPDATE analysis_tasks SET lease_owner = NULL, lease_expires_at = NULL
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (task_id, worker_id),
+        )
+        await db.commit()
+
+
+async def requeue(task_id: str) -> None:
+    """Put a stopped task back in the queue; it continues from its checkpoint"""
+    async with get_db() as db:
+        await db.execute(
+            """
+            UPDATE analysis_tasks
+            SET status = 'pending', completed_at = NULL, lease_owner = NULL,
+                lease_expires_at = NULL, enqueued_at = COALESCE(enqueued_at, ?)
+            WHERE id = ?
+            """,
+            (_now(), task_id),
+        )
+        await db.commit()
+
+
+async def recover_expired_jobs() -> List[str]:
+    """Handle running jobs whose worker stopped renewing the lease (restart or crash).
+
+    With ANALYSIS_AUTO_RESUME they are queued again and continue from their checkpoints;
+    otherwise they are marked interrupted. Returns the ids of the jobs found.
+    """
+    async with get_db() as db:
+        cursor = await db.execute(
+            """
+            SELECT id, novel_id FROM analysis_tasks
+            WHERE status = 'analyzing' AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+            """,
+            (_now(),),
+        )
+        rows = await cursor.fetchall()
+        if not rows:
+            return []
+
+        if settings.ANALYSIS_AUTO_RESUME:
+            await db.executemany(
+                """
+                UPDATE analysis_tasks
+                SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ?
+                """,
+                [(task_id,) for task_id, _ in rows],
+            )
+        else:
+            await db.executemany(
+                """
+                UPDATE analysis_tasks
+                SET status = 'interrupted', error_message = ?,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ?
+                """,
+                [("分析进程中断，可从检查点继续", task_id) for task_id, _ in rows],
+            )
+            await db.executemany(
+                "UPDATE novels SET analysis_status = 'interrupted' WHERE id = ?",
+                [(novel_id,) for _, novel_id in rows],
+            )
+        await db.commit()
+
+    action = "requeued" if settings.ANALYSIS_AUTO_RESUME else "marked interrupted"
+    logger.warning(f"Found {len(rows)} interrupted analysis tasks ({action})")
+    return [task_id for task_id, _ in rows]
+
+
+class WorkerPool:
+    """A fixed number of async workers pulling jobs from the queue.
+
+    Each running job's lease is renewed every ANALYSIS_HEARTBEAT_INTERVAL; a job whose
+    lease could not be renewed is stopped, and jobs whose leases expire (their worker
+    died) are recovered by a reaper.
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[None]], size: int):
+        self.handler = handler
+        self.size = size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._work(f"{self.owner}:{i}")) for i in range(self.size)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap()))
+        logger.info(f"Started {self.size} analysis workers")
+
+    def notify(self) -> None:
+        """Wake idle workers (a job was queued)"""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, worker_id: str) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await claim(worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), ANALYSIS_QUEUE_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job, worker_id)
+
+    async def _run(self, job: Job, worker_id: str) -> None:
+        logger.info(f"Worker {worker_id} running task {job.task_id} (priority {job.priority})")
+        run = asyncio.create_task(self.handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, worker_id, run))
+        try:
+            await run
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            # Only the job was stopped (by the heartbeat): keep working on other jobs
+        except Exception as e:
+            logger.error(f"Task {job.task_id} crashed: {e}")
+        finally:
+            heartbeat.cancel()
+            await release_lease(job.task_id, worker_id)
+
+    async def _heartbeat(self, job: Job, worker_id: str, run: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(ANALYSIS_HEARTBEAT_INTERVAL)
+            try:
+                renewed = await renew_lease(job.task_id, worker_id)
+            except Exception as e:
+                logger.warning(f"Could not renew lease of task {job.task_id}: {e}")
+                continue
+            if not renewed:
+                # The lease expired and the job was recovered by a reaper
+                logger.warning(f"Worker {worker_id} lost task {job.task_id}, stopping it")
+                run.cancel()
+                return
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(ANALYSIS_LEASE_TTL / 2)
+            try:
+                if await recover_expired_jobs():
+                    self.notify()
+            except Exception as e:
+                logger.error(f"Failed to recover expired jobs: {e}")
+
+
+# Shared by all jobs so concurrent analyses cannot overload one provider
+_provider_slots: Dict[str, PrioritySemaphore] = {}
+
+
+def get_provider_slots(provider: str) -> PrioritySemaphore:
+    """Get the concurrency budget of a provider, shared by every running analysis"""
+    slots = _provider_slots.get(provider)
+    if slots is None:
+        slots = PrioritySemaphore(settings.ANALYSIS_PROVIDER_CONCURRENCY)
+        _provider_slots[provider] = slots
+    return slots
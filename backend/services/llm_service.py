@@ -3,20 +3,61 @@ LLM Service - Unified interface for multiple LLM providers
 """
 
 import asyncio
-import json
 import time
-from typing import Dict, Any, Optional, List, Type
+from contextlib import aclosing
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional, List, Tuple, Type, Callable, AsyncIterator
 from pydantic import BaseModel, ValidationError
 
 from utils.json_utils import safe_json_loads
-from llm.providers import (
-    BaseLLMProvider,
-    create_provider,
+from utils.text_utils import (
+    context_window,
+    estimate_tokens,
+    tokenizer_calibration,
+    truncate_to_tokens,
 )
+from llm.providers import BaseLLMProvider
+from llm.circuit_breaker import (
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    breaker_stats,
+    get_circuit_breaker,
+)
+from llm.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    concurrency_stats,
+    get_concurrency_limiter,
+)
+from llm.hedging import AttemptSignals, get_hedge_policy
+from llm.rate_limiter import get_rate_limiter
+from llm.response_cache import LLMResponseCache, get_response_cache
+from llm.single_flight import get_single_flight
+from llm.retry import RETRYABLE_ERRORS, RetryPolicy, classify_error, is_overload_error
+from llm.registry import get_client_registry
 from config import settings
+from constants import LLM_CALL_DEADLINE, PROMPT_TEMPLATE_TOKENS, PROMPT_VERSIONS
 from utils.logger import logger
 
 
+@dataclass
+class LLMResponse:
+    """Completion text together with the provider/model that actually produced it"""
+
+    text: str
+    provider: str
+    model: str
+    # Validated payload for structured (JSON) requests
+    data: Any = None
+    # Response cache key, and whether the text came from the cache
+    cache_key: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def served_by(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
 class CharacterExtraction(BaseModel):
     name: str
     aliases: List[str] = []
@@ -103,7 +144,9 @@ class LLMService:
 
     def __init__(self, provider: Optional[str] = None):
         self.provider = provider or settings.DEFAULT_LLM_PROVIDER
-        self._clients: Dict[str, BaseLLMProvider] = {}
+        # Clients are shared process-wide so connections and tokens stay warm across tasks
+        self._clients = get_client_registry()
+        self.retry_policy = RetryPolicy()
 
     def _get_provider_config(self, provider: str) -> Dict[str, Any]:
         """Get configuration for a specific provider from settings"""
@@ -156,71 +199,37 @@ class LLMService:
     def _create_client(
         self, provider: Optional[str] = None, config: Optional[Dict[str, Any]] = None
     ) -> BaseLLMProvider:
-        """Create LLM client for the specified provider"""
+        """Get the shared LLM client for the specified provider"""
         provider_name = provider or self.provider
 
-        # Generate cache key based on provider and config
-        config_key = json.dumps(config, sort_keys=True) if config else "default"
-        cache_key = f"{provider_name}:{config_key}"
-
-        # Return cached client if exists
-        if cache_key in self._clients:
-            return self._clients[cache_key]
+        if not config:
+            # Use settings config (environment variables)
+            config = self._get_provider_config(provider_name)
 
-        if config:
-            # Use provided config (from frontend settings)
-            api_key = config.get("apiKey") or config.get("api_key", "")
-            # Mask key for logging
-            masked_key = (
-                api_key[:4] + "***" + api_key[-4:] if api_key and len(api_key) > 8 else "***"
-            )
-            logger.info(
-                f"Initializing {provider_name} provider with model: {config.get('model')} (Key: {masked_key})"
-            )
-
-            client = create_provider(
-                provider_name,
-                {
-                    "api_key": api_key,
-                    "model": config.get("model", "gpt-4o"),
-                    "base_url": config.get("baseUrl") or config.get("base_url"),
-                    "secret_key": config.get("secretKey") or config.get("secret_key"),
-                },
-            )
-        else:
-            # Use settings config
-            logger.info(f"Initializing {provider_name} provider from default settings")
-            cfg = self._get_provider_config(provider_name)
-            client = create_provider(provider_name, cfg)
-
-        # Cache the new client
-        self._clients[cache_key] = client
-        return client
-
-    async def complete(
-        self,
-        prompt: str,
-        provider: Optional[str] = None,
-        model: Optional[str] = None,
-        **kwargs: Any,
-    ) -> str:
-        """Generate completion (using streaming for robustness)"""
-        provider_name = provider or self.provider
-        config = None
+        return self._clients.get(provider_name, config)
 
-        # Load full settings to get keys for new providers
+    async def _resolve_config(
+        self, provider_name: str, model: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Build the client config for a provider from the cached settings snapshot"""
         from services.settings_service import get_settings_service
 
-        settings_service = get_settings_service()
-        all_settings = await settings_service.load_settings()
+        snapshot = await get_settings_service().get_snapshot()
+        self._clients.sync_settings_version(snapshot.version)
 
-        if provider_name in all_settings:
-            p_settings = all_settings[provider_name]
+        config = None
+        p_settings = snapshot.provider(provider_name)
+        if p_settings is not None:
             config = {
                 "api_key": p_settings.get("apiKey", ""),
                 "model": p_settings.get("model", ""),
                 "base_url": p_settings.get("baseUrl", ""),
                 "secret_key": p_settings.get("secretKey", ""),
+                # Optional per-provider quotas (requests / tokens per minute)
+                "rpm": p_settings.get("rpm"),
+                "tpm": p_settings.get("tpm"),
+                # Optional override of the model's context window (custom endpoints)
+                "context_window": p_settings.get("contextWindow"),
             }
 
         # Override model if provided
@@ -233,52 +242,124 @@ class LLMService:
                 config = base_config
                 config["model"] = model
 
-        client = self._create_client(provider_name, config)
+        return config
 
-        # Log request
-        logger.info(
-            f"LLM Request [Complete] | Provider: {provider_name} | Model: {config.get('model') if config else 'default'}"
+    async def context_budget(
+        self, provider: Optional[str] = None, model: Optional[str] = None
+    ) -> Tuple[str, int]:
+        """Model that will serve a request and its token budget for input text.
+
+        The budget is LLM_CONTEXT_SHARE of the context window, taken as the smallest
+        among the provider and its fallbacks (converted to the serving model's
+        calibration) so that a failover never overflows.
+        """
+        provider_name = provider or self.provider
+        candidates = [provider_name] + await self._fallback_providers(provider_name)
+        model_name = ""
+        budget = 0
+        for index, name in enumerate(candidates):
+            config = await self._resolve_config(name, model if index == 0 else None)
+            candidate_model = self._create_client(name, config).model
+            window = int((config or {}).get("context_window") or 0)
+            share = int((window or context_window(candidate_model)) * settings.LLM_CONTEXT_SHARE)
+            if index == 0:
+                model_name, budget = candidate_model, share
+            else:
+                cjk_cost = tokenizer_calibration(model_name)[0]
+                ratio = cjk_cost / tokenizer_calibration(candidate_model)[0]
+                budget = min(budget, int(share * ratio))
+        return model_name, budget
+
+    async def model_key(self, provider: Optional[str] = None, model: Optional[str] = None) -> str:
+        """"provider/model" a request is addressed to (before any failover)"""
+        provider_name = provider or self.provider
+        config = await self._resolve_config(provider_name, model)
+        return f"{provider_name}/{self._create_client(provider_name, config).model}"
+
+    async def _fit_to_context(
+        self,
+        text: str,
+        provider: Optional[str],
+        model: Optional[str],
+        overhead: str = "",
+    ) -> str:
+        """Trim text so that it, the prompt template and `overhead` fit the input budget"""
+        model_name, budget = await self.context_budget(provider, model)
+        reserved = PROMPT_TEMPLATE_TOKENS + estimate_tokens(overhead, model_name)
+        return truncate_to_tokens(text, budget - reserved, model_name)
+
+    async def warm_default_client(self) -> None:
+        """Warm the client of the configured default provider (called at startup)"""
+        from services.settings_service import get_settings_service
+
+        snapshot = await get_settings_service().get_snapshot()
+        provider_name = snapshot.get("defaultProvider") or self.provider
+        config = await self._resolve_config(provider_name) or self._get_provider_config(
+            provider_name
         )
-        logger.debug(f"Prompt: {prompt[:100]}...")
 
-        start_time = time.time()
-        max_retries = 3
-        base_delay = 1
+        if config:
+            await self._clients.warm(provider_name, config)
 
-        for attempt in range(max_retries):
-            try:
-                # Use stream_complete to accumulate response
-                # This helps with debugging progress and prevents silent timeouts on large payloads
-                full_response = ""
-                chunk_count = 0
+    async def complete(
+        self,
+        prompt: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Generate completion (using streaming for robustness)"""
+        response = await self.complete_response(prompt, provider, model, **kwargs)
+        return response.text
 
-                async for chunk in client.stream_complete(prompt, **kwargs):
-                    full_response += chunk
-                    chunk_count += 1
-                    if chunk_count % 50 == 0:
-                        logger.debug(f"Streaming... {len(full_response)} chars received")
+    async def complete_response(
+        self,
+        prompt: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt_version: str = "",
+        use_cache: bool = True,
+        **kwargs: Any,
+    ) -> LLMResponse:
+        """Generate completion, reporting which provider/model served it.
 
-                duration = time.time() - start_time
-                logger.info(
-                    f"LLM Response | Duration: {duration:.2f}s | Length: {len(full_response)} chars"
-                )
-                return full_response
+        Responses are cached by provider, model, prompt, generation parameters and
+        `prompt_version`; `use_cache=False` skips the lookup (and refreshes the entry).
+        Concurrent identical requests share a single provider call.
+        """
+        provider_name = provider or self.provider
+        logger.debug(f"Prompt: {prompt[:100]}...")
 
-            except Exception as e:
-                duration = time.time() - start_time
-                is_last_attempt = attempt == max_retries - 1
-                error_msg = f"LLM Error [Complete] (Attempt {attempt + 1}/{max_retries}) | Provider: {provider_name} | Error: {str(e)}"
+        config = await self._resolve_config(provider_name, model)
+        effective_model = self._create_client(provider_name, config).model
+        key = LLMResponseCache.make_key(
+            provider_name, effective_model, prompt, prompt_version, kwargs
+        )
 
-                if is_last_attempt:
-                    logger.error(error_msg)
-                    logger.exception("Full traceback:")
-                    raise
-                else:
-                    logger.warning(f"{error_msg} - Retrying in {base_delay * (2**attempt)}s...")
-                    await asyncio.sleep(base_delay * (2**attempt))
+        cache = get_response_cache()
+        if cache is not None and use_cache:
+            hit = await cache.get(key)
+            if hit is not None:
+                logger.info(f"LLM cache hit | Provider: {hit['provider']} | Model: {hit['model']}")
+                return LLMResponse(**hit, cache_key=key, cached=True)
+
+        async def run() -> LLMResponse:
+            # Use stream_complete to accumulate response
+            # This helps with debugging progress and prevents silent timeouts on large payloads
+            response = await self._execute_with_failover(
+                "Complete",
+                provider_name,
+                model,
+                lambda client, extra: client.stream_complete(prompt, **kwargs, **extra),
+                prompt,
+            )
+            if cache is not None and response.text:
+                response.cache_key = key
+                await cache.put(key, response.text, response.provider, response.model)
+            return response
 
-        # Should not be reached due to raise above
-        raise Exception("Max retries exceeded")
+        # Every caller gets its own copy, since callers annotate it (e.g. validated data)
+        return replace(await get_single_flight().do(key, run))
 
     async def chat(
         self,
@@ -288,74 +369,311 @@ class LLMService:
         **kwargs: Any,
     ) -> str:
         """Generate chat completion"""
-        # Similar to complete but calls client.stream_chat directly
-        # For brevity, implementing similar retry logic as complete if needed,
-        # but complete() covers most extraction cases here.
-        # This implementation falls back to non-streaming client.chat() for simplicity unless changed.
-        # But to be consistent with robustness plan:
+        response = await self._execute_with_failover(
+            "Chat",
+            provider or self.provider,
+            model,
+            lambda client, extra: client.stream_chat(messages, **kwargs, **extra),
+            "\n".join(m.get("content", "") for m in messages),
+        )
+        return response.text
 
-        provider_name = provider or self.provider
-        # ... (config loading same as complete) ...
-        # Simplified config loading for brevity in this snippet
+    async def _fallback_providers(self, primary: str) -> List[str]:
+        """Configured providers to fail over to, in the user's order"""
+        from services.settings_service import get_settings_service
 
+        snapshot = await get_settings_service().get_snapshot()
+        order = snapshot.get("fallbackProviders")
+        if not order:
+            order = [p.strip() for p in settings.LLM_FALLBACK_PROVIDERS.split(",")]
+
+        fallbacks = []
+        for name in order:
+            if not name or name == primary or name in fallbacks:
+                continue
+            p_settings = snapshot.provider(name)
+            if p_settings is not None:
+                # Local providers (Ollama) need no key, only an entry in the settings
+                configured = bool(p_settings.get("apiKey")) or name == "ollama"
+            else:
+                configured = bool(self._get_provider_config(name).get("api_key"))
+            if configured:
+                fallbacks.append(name)
+        return fallbacks
+
+    async def _execute_with_failover(
+        self,
+        label: str,
+        provider_name: str,
+        model: Optional[str],
+        open_stream: Callable[[BaseLLMProvider, Dict[str, Any]], AsyncIterator[str]],
+        prompt_text: str,
+    ) -> LLMResponse:
+        """Run a request on the requested provider, moving down the fallback list while
+        its circuit is open or it keeps failing with transient errors.
+
+        The requested model only applies to the requested provider; fallbacks use their
+        own configured model.
+        """
+        candidates = [provider_name] + await self._fallback_providers(provider_name)
+        hedging = await self._hedging_enabled()
+        started = time.monotonic()
+
+        while True:
+            last_error: Optional[BaseException] = None
+            for index, name in enumerate(candidates):
+                breaker = get_circuit_breaker(name)
+                if breaker.state == OPEN and breaker.retry_in() > 0:
+                    last_error = last_error or CircuitOpenError(name, breaker.retry_in())
+                    continue
+
+                config = await self._resolve_config(name, model if index == 0 else None)
+                client = self._create_client(name, config)
+                if index > 0:
+                    logger.warning(f"LLM failover [{label}]: {provider_name} -> {name}")
+                try:
+                    if hedging:
+                        return await self._execute_hedged(
+                            label, name, config, open_stream, prompt_text, candidates[index + 1 :]
+                        )
+                    text = await self._execute(
+                        label, name, config, open_stream, prompt_text, breaker
+                    )
+                    return LLMResponse(text=text, provider=name, model=client.model)
+                except CircuitOpenError as e:
+                    last_error = last_error or e
+                except Exception as e:
+                    if classify_error(e) not in RETRYABLE_ERRORS:
+                        raise
+                    last_error = e
+
+            if not isinstance(last_error, CircuitOpenError):
+                raise last_error
+            # Every candidate is cooling down: wait for the first probe instead of failing
+            wait = min(get_circuit_breaker(name).retry_in() for name in candidates)
+            if time.monotonic() - started + wait >= LLM_CALL_DEADLINE:
+                raise last_error
+            logger.warning(f"All LLM providers unavailable [{label}], retrying in {wait:.1f}s")
+            await asyncio.sleep(max(wait, 0.1))
+
+    async def _hedging_enabled(self) -> bool:
+        """Hedging is opt-in: app setting "hedgeRequests", else LLM_HEDGING"""
         from services.settings_service import get_settings_service
 
-        settings_service = get_settings_service()
-        all_settings = await settings_service.load_settings()
+        snapshot = await get_settings_service().get_snapshot()
+        enabled = snapshot.get("hedgeRequests")
+        return settings.LLM_HEDGING if enabled is None else bool(enabled)
 
-        config = None
-        if provider_name in all_settings:
-            p_settings = all_settings[provider_name]
-            config = {
-                "api_key": p_settings.get("apiKey", ""),
-                "model": p_settings.get("model", ""),
-                "base_url": p_settings.get("baseUrl", ""),
-                "secret_key": p_settings.get("secretKey", ""),
-            }
+    async def _execute_hedged(
+        self,
+        label: str,
+        provider_name: str,
+        config: Optional[Dict[str, Any]],
+        open_stream: Callable[[BaseLLMProvider, Dict[str, Any]], AsyncIterator[str]],
+        prompt_text: str,
+        alternates: List[str],
+    ) -> LLMResponse:
+        """Run a request and, if it has no first token by the observed p90 TTFT, race a
+        duplicate on an alternate provider (or the same one). The loser is cancelled.
+        """
+        policy = get_hedge_policy()
+        client = self._create_client(provider_name, config)
+        policy.record_call()
+        delay = policy.hedge_delay(get_concurrency_limiter(provider_name, client.model))
 
-        if model and config:
-            config["model"] = model
-        elif model and not config:
-            base_config = self._get_provider_config(provider_name)
-            if base_config:
-                config = base_config
-                config["model"] = model
+        async def attempt(name: str, cfg: Optional[Dict[str, Any]], signals=None):
+            text = await self._execute(
+                label, name, cfg, open_stream, prompt_text, get_circuit_breaker(name), signals
+            )
+            return LLMResponse(text=text, provider=name, model=self._create_client(name, cfg).model)
+
+        signals = AttemptSignals()
+        primary = asyncio.create_task(attempt(provider_name, config, signals))
+        if delay is None:
+            return await primary
 
+        # Time to first token is measured from when the request is sent, not while it
+        # waits for a rate-limit or concurrency slot
+        sent = asyncio.create_task(signals.sent.wait())
+        first_token = asyncio.create_task(signals.first_token.wait())
+        try:
+            await asyncio.wait({primary, sent}, return_when=asyncio.FIRST_COMPLETED)
+            if not primary.done():
+                await asyncio.wait(
+                    {primary, first_token}, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        finally:
+            sent.cancel()
+            first_token.cancel()
+        if primary.done() or signals.first_token.is_set() or not policy.try_fire():
+            return await primary
+
+        # Prefer a healthy alternate so the duplicate doesn't queue behind the slow provider
+        hedge_name, hedge_config = provider_name, config
+        for name in alternates:
+            if get_circuit_breaker(name).state != OPEN:
+                hedge_name, hedge_config = name, await self._resolve_config(name)
+                break
+        logger.info(
+            f"LLM hedge [{label}]: no first token from {provider_name} after {delay:.2f}s, "
+            f"sending duplicate to {hedge_name}"
+        )
+        hedge = asyncio.create_task(attempt(hedge_name, hedge_config))
+
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # A cancelled attempt has no exception to inspect (exception() raises)
+                    if not task.cancelled() and task.exception() is None:
+                        if task is hedge:
+                            policy.record_win()
+                        return task.result()
+            # Both failed: surface the primary's error (else the hedge's) to the failover
+            # logic; result() re-raises CancelledError if both were cancelled
+            return (hedge if primary.cancelled() else primary).result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+    async def _execute(
+        self,
+        label: str,
+        provider_name: str,
+        config: Optional[Dict[str, Any]],
+        open_stream: Callable[[BaseLLMProvider, Dict[str, Any]], AsyncIterator[str]],
+        prompt_text: str,
+        breaker: CircuitBreaker,
+        signals: Optional[AttemptSignals] = None,
+    ) -> str:
+        """Run a streaming request with rate limiting, adaptive concurrency and retries"""
         client = self._create_client(provider_name, config)
+        limiter = get_rate_limiter(
+            provider_name,
+            rpm=int((config or {}).get("rpm") or 0),
+            tpm=int((config or {}).get("tpm") or 0),
+        )
+        prompt_tokens = estimate_tokens(prompt_text, client.model)
 
+        # Log request
         logger.info(
-            f"LLM Request [Chat] | Provider: {provider_name} | Model: {config.get('model') if config else 'default'}"
+            f"LLM Request [{label}] | Provider: {provider_name} | Model: {client.model} "
+            f"| ~{prompt_tokens} prompt tokens"
         )
 
-        start_time = time.time()
-        max_retries = 3
-        base_delay = 1
+        governor = get_concurrency_limiter(provider_name, client.model)
+        retry = self.retry_policy.start()
 
-        for attempt in range(max_retries):
+        while True:
+            # Stop hammering a provider as soon as its breaker opens
+            if not breaker.allow_request():
+                raise CircuitOpenError(provider_name, breaker.retry_in())
+            charged = await limiter.acquire(prompt_tokens) if limiter else 0
+            usage: Dict[str, int] = {}
             try:
-                full_response = ""
-                async for chunk in client.stream_chat(messages, **kwargs):
-                    full_response += chunk
+                # Each attempt is bounded by what is left of the call deadline
+                full_response = await self._stream_once(
+                    client, open_stream, governor, usage, max(0.0, retry.remaining), signals
+                )
+                breaker.record_success()
+
+                if limiter:
+                    # Prefer provider-reported usage, fall back to local estimates
+                    actual = (usage.get("prompt_tokens") or prompt_tokens) + (
+                        usage.get("completion_tokens")
+                        or estimate_tokens(full_response, client.model)
+                    )
+                    limiter.settle(charged, actual)
 
-                duration = time.time() - start_time
+                duration = time.monotonic() - retry.started
                 logger.info(
                     f"LLM Response | Duration: {duration:.2f}s | Length: {len(full_response)} chars"
                 )
                 return full_response
+
+            except asyncio.CancelledError:
+                breaker.record_ignored()
+                raise
             except Exception as e:
-                # Retry logic same as above
-                duration = time.time() - start_time
-                is_last_attempt = attempt == max_retries - 1
-                error_msg = f"LLM Error [Chat] (Attempt {attempt + 1}/{max_retries}) | Provider: {provider_name} | Error: {str(e)}"
-
-                if is_last_attempt:
-                    logger.error(error_msg)
-                    logger.exception("Full traceback:")
-                    raise
+                # Only transient failures say something about the provider's health
+                if classify_error(e) in RETRYABLE_ERRORS:
+                    breaker.record_failure()
                 else:
-                    logger.warning(f"{error_msg} - Retrying in {base_delay * (2**attempt)}s...")
-                    await asyncio.sleep(base_delay * (2**attempt))
-        raise Exception("Max retries exceeded")
+                    breaker.record_ignored()
+                delay = retry.next_delay(
+                    e, label=label, provider=provider_name, model=client.model
+                )
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _stream_once(
+        self,
+        client: BaseLLMProvider,
+        open_stream: Callable[[BaseLLMProvider, Dict[str, Any]], AsyncIterator[str]],
+        governor: AdaptiveConcurrencyLimiter,
+        usage: Dict[str, int],
+        timeout: float,
+        signals: Optional[AttemptSignals] = None,
+    ) -> str:
+        """Single streaming attempt inside a slot of the adaptive concurrency window.
+
+        Raises TimeoutError after `timeout` seconds (waiting for the slot included). The
+        timeout is enforced here, not by the caller: the window sees a timed-out attempt
+        as a TimeoutError, an overload signal, where an outer wait_for would only cancel it.
+        """
+        deadline = asyncio.get_running_loop().time() + timeout
+        async with asyncio.timeout_at(deadline):
+            await governor.acquire()
+        if signals is not None:
+            signals.sent.set()
+        start = time.monotonic()
+        ttft: Optional[float] = None
+        completed = False
+        overloaded = False
+        try:
+            full_response = ""
+            chunk_count = 0
+
+            # aclosing: a cancelled call closes the HTTP stream now, not at garbage collection
+            async with asyncio.timeout_at(deadline), aclosing(
+                open_stream(client, {"on_usage": usage.update})
+            ) as stream:
+                async for chunk in stream:
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                        if signals is not None:
+                            signals.first_token.set()
+                    full_response += chunk
+                    chunk_count += 1
+                    if chunk_count % 50 == 0:
+                        logger.debug(f"Streaming... {len(full_response)} chars received")
+
+            completed = True
+            return full_response
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            if completed and ttft is None:
+                ttft = time.monotonic() - start
+            await governor.release(ttft if completed else None, overloaded)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics of the LLM layer for observability"""
+        cache = get_response_cache()
+        return {
+            "concurrency": concurrency_stats(),
+            "breakers": breaker_stats(),
+            "hedging": get_hedge_policy().stats(),
+            "cache": cache.stats() if cache else None,
+            "single_flight": get_single_flight().stats(),
+            "clients": self._clients.stats(),
+        }
 
     async def test_connection(
         self, provider: Optional[str] = None, config: Optional[Dict[str, Any]] = None
@@ -416,16 +734,54 @@ class LLMService:
         provider: Optional[str] = None,
         model: Optional[str] = None,
         max_retries: int = 2,
-    ) -> Any:
+        prompt_version: str = "",
+        use_cache: bool = True,
+    ) -> LLMResponse:
         """
         Generate completion with Pydantic validation and auto-retry mechanism.
         If JSON parsing or validation fails, it feeds the error back to the LLM.
+        The validated items are returned in `LLMResponse.data` (empty list on failure).
+        Concurrent identical requests share one validation loop.
         """
+        key = "validated:" + LLMResponseCache.make_key(
+            provider or self.provider,
+            model or "",
+            prompt,
+            prompt_version,
+            {"schema": validation_model.__name__, "max_retries": max_retries},
+        )
+        response = await get_single_flight().do(
+            key,
+            lambda: self._complete_with_validation(
+                prompt, validation_model, provider, model, max_retries, prompt_version, use_cache
+            ),
+        )
+        return replace(response, data=list(response.data or []))
+
+    async def _complete_with_validation(
+        self,
+        prompt: str,
+        validation_model: Type[BaseModel],
+        provider: Optional[str],
+        model: Optional[str],
+        max_retries: int,
+        prompt_version: str,
+        use_cache: bool,
+    ) -> LLMResponse:
+        """Validation loop behind complete_with_validation"""
         current_prompt = prompt
+        response = LLMResponse(text="", provider=provider or self.provider, model=model or "")
 
         for attempt in range(max_retries + 1):
             try:
-                response_text = await self.complete(current_prompt, provider=provider, model=model)
+                response = await self.complete_response(
+                    current_prompt,
+                    provider=provider,
+                    model=model,
+                    prompt_version=prompt_version,
+                    use_cache=use_cache,
+                )
+                response_text = response.text
 
                 # 1. Try to parse JSON
                 parsed_data = self._extract_json_from_response(response_text)
@@ -448,14 +804,20 @@ class LLMService:
                 validated_data = adapter.validate_python(parsed_data)
 
                 # Convert back to dicts for compatibility with existing code
-                return [item.model_dump() for item in validated_data]
+                response.data = [item.model_dump() for item in validated_data]
+                return response
 
             except (ValidationError, ValueError) as e:
                 logger.warning(f"Validation failed (Attempt {attempt + 1}/{max_retries + 1}): {e}")
+                # Don't replay an unusable response on the next run
+                cache = get_response_cache()
+                if cache is not None and response.cache_key:
+                    await cache.discard(response.cache_key)
 
                 if attempt == max_retries:
                     logger.error("Max retries reached for validation.")
-                    return []  # Or raise error
+                    response.data = []
+                    return response
 
                 # Construct retry prompt with hint
                 current_prompt = f"""
@@ -466,15 +828,20 @@ Error: {str(e)}
 
 Please fix the format and return ONLY the valid JSON.
 """
-        return []
+        response.data = []
+        return response
 
     async def analyze_characters(
-        self, text: str, provider: Optional[str] = None, model: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Use LLM to extract characters from text"""
+        self,
+        text: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        """Use LLM to extract characters from text (items in `.data`)"""
         logger.info("Starting character extraction...")
-        # Limit text to avoid token limits
-        text_sample = text[:8000]
+        # Limit text to the model's context budget
+        text_sample = await self._fit_to_context(text, provider, model)
 
         prompt = f"""请分析以下小说文本，提取所有出现的人物角色。
 对于每个人物，请提供：
@@ -499,7 +866,12 @@ Please fix the format and return ONLY the valid JSON.
 }}]
 """
         return await self.complete_with_validation(
-            prompt, CharacterExtraction, provider=provider, model=model
+            prompt,
+            CharacterExtraction,
+            provider=provider,
+            model=model,
+            prompt_version=PROMPT_VERSIONS["characters"],
+            use_cache=use_cache,
         )
 
     async def analyze_relationships(
@@ -508,11 +880,14 @@ Please fix the format and return ONLY the valid JSON.
         text: str,
         provider: Optional[str] = None,
         model: Optional[str] = None,
-    ) -> List[Dict[str, Any]]:
-        """Use LLM to analyze relationships between characters"""
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        """Use LLM to analyze relationships between characters (items in `.data`)"""
         logger.info(f"Starting relationship analysis for {len(characters)} characters...")
         char_names = [c.get("name", "") for c in characters if c.get("name")]
-        text_sample = text[:8000]
+        text_sample = await self._fit_to_context(
+            text, provider, model, overhead=", ".join(char_names)
+        )
 
         prompt = f"""请分析以下小说文本中人物之间的关系。
 
@@ -540,15 +915,24 @@ Please fix the format and return ONLY the valid JSON.
 }}]
 """
         return await self.complete_with_validation(
-            prompt, RelationshipExtraction, provider=provider, model=model
+            prompt,
+            RelationshipExtraction,
+            provider=provider,
+            model=model,
+            prompt_version=PROMPT_VERSIONS["relationships"],
+            use_cache=use_cache,
         )
 
     async def generate_summary(
-        self, text: str, provider: Optional[str] = None, model: Optional[str] = None
-    ) -> str:
+        self,
+        text: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> LLMResponse:
         """Generate summary for text"""
         logger.info("Generating summary...")
-        text_sample = text[:6000]
+        text_sample = await self._fit_to_context(text, provider, model)
 
         prompt = f"""请为以下小说章节生成一个简洁的摘要（100-200字）：
 
@@ -556,14 +940,24 @@ Please fix the format and return ONLY the valid JSON.
 
 摘要："""
 
-        return await self.complete(prompt, provider, model)
+        return await self.complete_response(
+            prompt,
+            provider,
+            model,
+            prompt_version=PROMPT_VERSIONS["summary"],
+            use_cache=use_cache,
+        )
 
     async def analyze_plot_events(
-        self, text: str, provider: Optional[str] = None, model: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Extract key plot events from text"""
+        self,
+        text: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        """Extract key plot events from text (items in `.data`)"""
         logger.info("Starting plot analysis...")
-        text_sample = text[:8000]
+        text_sample = await self._fit_to_context(text, provider, model)
 
         prompt = f"""请分析以下小说文本，提取关键剧情事件。
 
@@ -587,7 +981,12 @@ Please fix the format and return ONLY the valid JSON.
 }}]
 """
         return await self.complete_with_validation(
-            prompt, PlotEventExtraction, provider=provider, model=model
+            prompt,
+            PlotEventExtraction,
+            provider=provider,
+            model=model,
+            prompt_version=PROMPT_VERSIONS["plot_events"],
+            use_cache=use_cache,
         )
 
 
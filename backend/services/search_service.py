@@ -0,0 +1,90 @@
+"""
+Search service - full-text search inside a novel's chapters
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from constants import SEARCH_SNIPPET_CHARS, SEARCH_TRIGRAM_LENGTH
+from database.chapter_store import load_contents
+from database.sqlite_db import get_read_db
+from utils.text_utils import make_snippet
+
+
+def _fts_phrase(term: str) -> str:
+    """A term as an FTS5 string, so its characters are never read as query syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+async def search_chapters(novel_id: str, query: str, skip: int, limit: int) -> Dict[str, Any]:
+    """Chapters of a novel containing every whitespace-separated term of the query.
+
+    Terms of 3+ characters are looked up in the trigram index and the hits ranked by
+    bm25; shorter terms (e.g. a two-character name) in the short-term index. A query of
+    short terms alone returns the chapters in chapter order. Snippets are made from
+    the text of the returned page's chapters only.
+    Returns {"total", "hits"}; each hit has a snippet with highlight offsets.
+    """
+    terms = list(dict.fromkeys(query.split()))
+    if not terms:
+        return {"total": 0, "hits": []}
+    indexed = [t for t in terms if len(t) >= SEARCH_TRIGRAM_LENGTH]
+    short = [t for t in terms if len(t) < SEARCH_TRIGRAM_LENGTH]
+
+    # CROSS JOIN: always drive from the index (else the planner may scan the novel's
+    # chapters and evaluate MATCH row by row)
+    if indexed:
+        source = "chapters_fts f CROSS JOIN chapters c ON c.seq = f.rowid"
+        conditions = ["chapters_fts MATCH ?", "c.novel_id = ?"]
+        params: List[Any] = [_fts_query(indexed), novel_id]
+        rank = "bm25(chapters_fts)"
+        if short:
+            conditions.append(
+                "c.seq IN (SELECT rowid FROM chapters_fts_short WHERE chapters_fts_short MATCH ?)"
+            )
+            params.append(_fts_query(short))
+    else:
+        source = "chapters_fts_short s CROSS JOIN chapters c ON c.seq = s.rowid"
+        conditions = ["chapters_fts_short MATCH ?", "c.novel_id = ?"]
+        params = [_fts_query(short), novel_id]
+        rank = "0"
+    condition = " AND ".join(conditions)
+
+    async with get_read_db() as db:
+        cursor = await db.execute(f"SELECT COUNT(*) FROM {source} WHERE {condition}", params)
+        total = (await cursor.fetchone())[0]
+        cursor = await db.execute(
+            f"""
+            SELECT c.id, c.chapter_num, c.title, {rank} AS sort_key
+            FROM {source}
+            WHERE {condition}
+            ORDER BY sort_key, c.chapter_num
+            LIMIT ? OFFSET ?
+            """,
+            (*params, limit, skip),
+        )
+        rows = await cursor.fetchall()
+        # Text for the snippets, of this page's chapters only
+        texts = await load_contents(db, [row[0] for row in rows])
+
+    return {"total": total, "hits": [_hit(row, texts.get(row[0]), terms) for row in rows]}
+
+
+def _fts_query(terms: List[str]) -> str:
+    """FTS5 query matching entries that contain every term"""
+    return " AND ".join(_fts_phrase(t) for t in terms)
+
+
+def _hit(row: Tuple, content: Optional[str], terms: List[str]) -> Dict[str, Any]:
+    chapter_id, chapter_num, title, sort_key = row
+    snippet, highlights = make_snippet(content or "", terms, SEARCH_SNIPPET_CHARS)
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    return {
+        "chapter_id": chapter_id,
+        "chapter_num": chapter_num,
+        "title": title,
+        "score": -sort_key,
+        "matches": len(pattern.findall(content or "")),
+        "snippet": snippet,
+        "highlights": highlights,
+    }
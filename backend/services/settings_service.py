@@ -4,12 +4,67 @@ Secure settings service for API key management
 
 import json
 import base64
-from typing import Dict, Any, Optional
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 from config import settings
+from constants import SETTINGS_MTIME_CHECK_INTERVAL
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverse of _freeze: build a mutable deep copy"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@lru_cache(maxsize=4)
+def _derive_key(secret: str) -> bytes:
+    """PBKDF2 key derivation (100k iterations) - computed once per process"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=b"novelmind_salt_v1",
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive((secret + "novelmind").encode()))
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """Immutable, versioned view of the decrypted settings"""
+
+    version: int
+    data: Mapping[str, Any]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def provider(self, name: str) -> Optional[Mapping[str, Any]]:
+        """Settings block of a provider, if configured"""
+        value = self.data.get(name)
+        return value if isinstance(value, Mapping) else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Mutable deep copy (e.g. for API responses)"""
+        return _thaw(self.data)
 
 
 class SecureSettingsService:
@@ -21,23 +76,19 @@ class SecureSettingsService:
         self._cipher: Optional[Fernet] = None
         self._init_cipher()
 
+        # In-memory snapshot, reloaded only after save_settings or a file mtime change
+        self._snapshot: Optional[SettingsSnapshot] = None
+        self._snapshot_mtimes: Tuple[Optional[int], Optional[int]] = (None, None)
+        self._last_mtime_check = 0.0
+        self._version = 0
+
     def _init_cipher(self):
         """Initialize the encryption cipher"""
         try:
             from cryptography.fernet import Fernet
 
             # Use machine-specific key derivation
-            key_material = (settings.APP_SECRET_KEY + "novelmind").encode()
-            salt = b"novelmind_salt_v1"
-
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=100000,
-            )
-            key = base64.urlsafe_b64encode(kdf.derive(key_material))
-            self._cipher = Fernet(key)
+            self._cipher = Fernet(_derive_key(settings.APP_SECRET_KEY))
         except ImportError:
             # Fallback to base64 encoding if cryptography not available
             self._cipher = None
@@ -114,8 +165,53 @@ class SecureSettingsService:
             with open(self.secure_file, "w", encoding="utf-8") as f:
                 json.dump(secure_data, f, indent=2)
 
+        # Invalidate the cached snapshot; the new version makes the LLM client
+        # registry rebuild its clients on next use
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the cached settings snapshot"""
+        self._snapshot = None
+
+    def _file_mtimes(self) -> Tuple[Optional[int], Optional[int]]:
+        """Modification times of the settings files (None if missing)"""
+        mtimes = []
+        for path in (self.settings_file, self.secure_file):
+            try:
+                mtimes.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return mtimes[0], mtimes[1]
+
+    async def get_snapshot(self) -> SettingsSnapshot:
+        """Get the decrypted settings snapshot, reloading only when files changed.
+
+        File mtimes are checked at most once per SETTINGS_MTIME_CHECK_INTERVAL so the
+        LLM hot path does no file I/O or decryption in the common case.
+        """
+        now = time.monotonic()
+        if self._snapshot is not None:
+            if now - self._last_mtime_check < SETTINGS_MTIME_CHECK_INTERVAL:
+                return self._snapshot
+            self._last_mtime_check = now
+            if self._file_mtimes() == self._snapshot_mtimes:
+                return self._snapshot
+
+        self._last_mtime_check = now
+        mtimes = self._file_mtimes()
+        data = self._read_settings()
+        self._version += 1
+        self._snapshot = SettingsSnapshot(version=self._version, data=_freeze(data))
+        self._snapshot_mtimes = mtimes
+        return self._snapshot
+
     async def load_settings(self) -> Dict[str, Any]:
         """Load settings, decrypting sensitive data"""
+        snapshot = await self.get_snapshot()
+        return snapshot.to_dict()
+
+    def _read_settings(self) -> Dict[str, Any]:
+        """Read settings files from disk, decrypting sensitive data"""
         result = {}
 
         # Load public settings
@@ -146,16 +242,16 @@ class SecureSettingsService:
 
     async def get_api_key(self, provider: str, key_name: str = "apiKey") -> Optional[str]:
         """Get a specific API key"""
-        settings_data = await self.load_settings()
-        provider_config = settings_data.get(provider, {})
+        snapshot = await self.get_snapshot()
+        provider_config = snapshot.provider(provider) or {}
         return provider_config.get(key_name) or provider_config.get("api_key")
 
     async def test_provider(self, provider: str, config: Dict[str, Any]) -> bool:
         """Test a provider connection"""
-        from llm.providers import create_provider
+        from llm.registry import get_client_registry
 
         try:
-            llm_provider = create_provider(provider, config)
+            llm_provider = get_client_registry().get(provider, config)
             return await llm_provider.test_connection()
         except Exception as e:
             print(f"Provider test failed: {e}")
@@ -0,0 +1,338 @@
+"""
+Stage scheduler - runs analysis stages as a dependency graph
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from constants import ANALYSIS_ETA_WINDOW
+from utils.logger import logger
+
+
+@dataclass
+class Stage:
+    """One node of the analysis graph"""
+
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]  # receives the results of finished stages
+    label: str  # progress message while the stage runs
+    depends_on: tuple = ()
+    weight: float = 1.0
+    # Expected units of work (chapter id -> tokens), until the stage declares its own
+    units: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class StageContext:
+    """Per-stage state visible to the code a stage runs (through `current_stage`)"""
+
+    name: str
+    # Lower is served first; stages on the critical path get 0
+    priority: int = 1
+    # Units of work (e.g. chapter ids) -> their size in tokens
+    sizes: Dict[str, int] = field(default_factory=dict)
+    done: Set[str] = field(default_factory=set)
+    finished: bool = False
+    # Completed calls, and the tokens of the units they finished
+    calls: int = 0
+    tokens_done: int = 0
+    # Calls the stage will make, when known up front
+    expected_calls: Optional[int] = None
+    # Called with the tokens a finished call covered (None for other changes)
+    on_advance: Optional[Callable[[Optional[int]], None]] = None
+
+    def start(
+        self, sizes: Dict[str, int], done: Iterable[str] = (), calls: Optional[int] = None
+    ) -> None:
+        """Declare the stage's units (unit id -> tokens), those already finished and,
+        if known, the number of calls the rest takes"""
+        self.sizes = dict(sizes)
+        self.done = set(done)
+        self.expected_calls = calls
+        self._notify(None)
+
+    def advance(self, units: Iterable[str]) -> None:
+        """Record a finished call covering `units`"""
+        new = set(units) - self.done
+        tokens = sum(self.sizes.get(unit, 0) for unit in new)
+        self.done.update(new)
+        self.calls += 1
+        self.tokens_done += tokens
+        self._notify(tokens)
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify(None)
+
+    @property
+    def total(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def fraction(self) -> float:
+        """Share of the stage's tokens done (of its units if their sizes are unknown)"""
+        if self.finished:
+            return 1.0
+        total_tokens = sum(self.sizes.values())
+        if total_tokens:
+            done_tokens = sum(self.sizes.get(unit, 0) for unit in self.done)
+            return min(1.0, done_tokens / total_tokens)
+        return min(1.0, len(self.done) / self.total) if self.total else 0.0
+
+    @property
+    def remaining_tokens(self) -> int:
+        if self.finished:
+            return 0
+        return sum(size for unit, size in self.sizes.items() if unit not in self.done)
+
+    def remaining_calls(self, default_tokens_per_call: Optional[float] = None) -> float:
+        """Calls still to make, from the tokens per call observed in this stage (or the
+        default, e.g. observed in other stages; else one call per unit)"""
+        if self.finished:
+            return 0.0
+        if self.expected_calls is not None:
+            return float(max(0, self.expected_calls - self.calls))
+        tokens_per_call = (self.tokens_done / self.calls if self.calls else None) or (
+            default_tokens_per_call
+        )
+        if tokens_per_call:
+            return self.remaining_tokens / tokens_per_call
+        return float(len(self.sizes.keys() - self.done))
+
+    def _notify(self, tokens: Optional[int]) -> None:
+        if self.on_advance is not None:
+            self.on_advance(tokens)
+
+
+@dataclass
+class ProgressReport:
+    """Overall progress of a graph run"""
+
+    progress: float  # percent
+    message: str
+    units_done: int
+    units_total: int
+    # Seconds left at the observed throughput (None until a call has finished)
+    eta_seconds: Optional[float]
+
+
+class ThroughputMeter:
+    """Tokens and calls finished per second, over a sliding window"""
+
+    def __init__(self, window: float = ANALYSIS_ETA_WINDOW):
+        self.window = window
+        self.started = time.monotonic()
+        self._events: deque = deque()
+
+    def record(self, tokens: int) -> None:
+        self._events.append((time.monotonic(), tokens))
+
+    def rates(self) -> Optional[Tuple[float, float]]:
+        """(tokens/s, calls/s), or None before the first call has finished"""
+        now = time.monotonic()
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+        if not self._events:
+            return None
+        span = max(1e-3, now - max(self.started, now - self.window))
+        tokens = sum(tokens for _, tokens in self._events)
+        return tokens / span, len(self._events) / span
+
+
+current_stage: ContextVar[Optional[StageContext]] = ContextVar("current_stage", default=None)
+
+
+class PrioritySemaphore:
+    """Semaphore that hands free slots to the lowest priority first (FIFO within one).
+
+    Priorities are tuples, compared element by element.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[tuple] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: tuple = (0,)) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled: pass it on
+                self.release()
+            else:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @asynccontextmanager
+    async def slot(self, job_priority: int = 0):
+        """Hold a slot, served by job priority, then by the priority of the calling stage"""
+        stage = current_stage.get()
+        await self.acquire((job_priority, stage.priority if stage else 0))
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class StageScheduler:
+    """Starts every stage as soon as its dependencies have finished.
+
+    Independent stages overlap, so a run takes about as long as its critical path.
+    Stages on that path (those others depend on, and their ancestors) get priority on
+    the shared concurrency budget. Progress is the weighted mean of the stages' fractions;
+    the ETA divides the work left (tokens and calls) by the throughput observed so far.
+    If a stage fails, the stages still running are cancelled and the error is raised.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_progress: Optional[Callable[[ProgressReport], Awaitable[None]]] = None,
+    ):
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in names]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        self.stages = {stage.name: stage for stage in stages}
+        self.on_progress = on_progress
+        self.results: Dict[str, Any] = {}
+        self.meter = ThroughputMeter()
+        self._contexts = {
+            stage.name: StageContext(stage.name, sizes=dict(stage.units), on_advance=self._advanced)
+            for stage in stages
+        }
+        self._running: List[str] = []
+        self._reported: Optional[tuple] = None
+        self._dirty = asyncio.Event()
+
+    def _critical(self) -> Set[str]:
+        """Stages some other stage waits for, directly or transitively"""
+        critical: Set[str] = set()
+        pending = [dep for stage in self.stages.values() for dep in stage.depends_on]
+        while pending:
+            name = pending.pop()
+            if name not in critical:
+                critical.add(name)
+                pending.extend(self.stages[name].depends_on)
+        return critical
+
+    @property
+    def progress(self) -> float:
+        total = sum(stage.weight for stage in self.stages.values()) or 1.0
+        done = sum(
+            stage.weight * self._contexts[name].fraction for name, stage in self.stages.items()
+        )
+        return done / total * 100
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Time left at the current throughput: bounded by tokens/s and by calls/s"""
+        rates = self.meter.rates()
+        if rates is None:
+            return None
+        tokens_per_second, calls_per_second = rates
+        contexts = self._contexts.values()
+        calls = sum(ctx.calls for ctx in contexts)
+        tokens_per_call = sum(ctx.tokens_done for ctx in contexts) / calls if calls else None
+        remaining_tokens = sum(ctx.remaining_tokens for ctx in contexts)
+        remaining_calls = sum(ctx.remaining_calls(tokens_per_call) for ctx in contexts)
+        by_tokens = remaining_tokens / tokens_per_second if tokens_per_second else 0.0
+        return max(by_tokens, remaining_calls / calls_per_second)
+
+    def report(self) -> ProgressReport:
+        labels = [self.stages[name].label for name in self._running]
+        contexts = self._contexts.values()
+        eta = self.eta_seconds
+        return ProgressReport(
+            progress=self.progress,
+            message="、".join(label.rstrip(".") for label in labels) + "..." if labels else "",
+            units_done=sum(ctx.total if ctx.finished else len(ctx.done) for ctx in contexts),
+            units_total=sum(ctx.total for ctx in contexts),
+            eta_seconds=round(eta, 1) if eta is not None else None,
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all stages, returning their results by name"""
+        critical = self._critical()
+        finished = {name: asyncio.Event() for name in self.stages}
+
+        async def run_stage(stage: Stage) -> None:
+            for dep in stage.depends_on:
+                await finished[dep].wait()
+
+            ctx = self._contexts[stage.name]
+            ctx.priority = 0 if stage.name in critical else 1
+            current_stage.set(ctx)
+            self._running.append(stage.name)
+            self._mark()
+            logger.info(f"Stage {stage.name} started")
+
+            self.results[stage.name] = await stage.run(self.results)
+
+            self._running.remove(stage.name)
+            ctx.finish()
+            logger.info(f"Stage {stage.name} finished")
+            finished[stage.name].set()
+
+        reporter = asyncio.create_task(self._report_loop())
+        tasks = [asyncio.create_task(run_stage(stage)) for stage in self.stages.values()]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+        await self._report()
+        return self.results
+
+    def _advanced(self, tokens: Optional[int]) -> None:
+        if tokens is not None:
+            self.meter.record(tokens)
+        self._mark()
+
+    def _mark(self) -> None:
+        self._dirty.set()
+
+    async def _report_loop(self) -> None:
+        """Write progress when it changes, one write at a time"""
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            await self._report()
+
+    async def _report(self) -> None:
+        if self.on_progress is None:
+            return
+        report = self.report()
+        state = (int(report.progress), report.message, report.units_done)
+        if state != self._reported:
+            self._reported = state
+            await self.on_progress(report)
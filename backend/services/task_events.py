@@ -0,0 +1,71 @@
+"""
+Task events - in-process pub/sub of analysis progress
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from constants import TASK_EVENT_QUEUE_SIZE
+
+# Statuses after which a task publishes nothing more
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "interrupted")
+
+
+class TaskEventBus:
+    """Fan-out of task events to subscribers (e.g. SSE streams).
+
+    Events are dicts with a "type": "status" (task status changed), "progress",
+    "stage" (a stage started or finished) or "unit" (a chunk/chapter finished).
+    Publishing never blocks: a subscriber that falls behind loses its oldest events.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def publish(self, task_id: str, event: Dict[str, Any]) -> None:
+        event = {"task_id": task_id, "time": time.time(), **event}
+        if event["type"] == "progress":
+            self._latest[task_id] = event
+        elif event["type"] == "status" and event.get("status") in TERMINAL_STATUSES:
+            self._latest.pop(task_id, None)
+
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def latest_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """The last progress event of a running task (newer than the stored progress)"""
+        return self._latest.get(task_id)
+
+    def forget(self, task_id: str) -> None:
+        """Drop the task's last progress event (once its run has stopped)"""
+        self._latest.pop(task_id, None)
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """A queue receiving the task's events from now on, while the context is open"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TASK_EVENT_QUEUE_SIZE)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[task_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[task_id]
+
+
+# Singleton instance
+_task_events: Optional[TaskEventBus] = None
+
+
+def get_task_events() -> TaskEventBus:
+    """Get the task event bus of this process"""
+    global _task_events
+    if _task_events is None:
+        _task_events = TaskEventBus()
+    return _task_events
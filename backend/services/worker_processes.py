@@ -0,0 +1,84 @@
+"""
+Worker processes - run queued analyses outside the API process
+"""
+
+import asyncio
+import multiprocessing
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event
+from typing import List, Tuple
+
+from config import settings
+from constants import WORKER_PROCESS_CHECK_INTERVAL, WORKER_PROCESS_STOP_TIMEOUT
+from database.sqlite_db import close_db
+from database.write_queue import close_write_queue
+from llm.http_client import close_http_clients
+from llm.rate_limiter import set_process_share
+from llm.response_cache import close_response_cache
+from utils.logger import LOG_DIR, logger, setup_logger
+
+
+def start_worker_processes(count: int) -> Tuple[List[BaseProcess], Event]:
+    """Start `count` worker processes; returns them with the event that stops them.
+
+    The processes share the job queue in SQLite with each other (and with any other
+    instance), so the API process only queues jobs and reads their progress.
+    """
+    # spawn: a fork of the running event loop is not safe, and it is the only option
+    # on Windows, where the desktop app runs
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    processes = []
+    for index in range(count):
+        process = context.Process(
+            target=_worker_main,
+            args=(index, count, stop),
+            name=f"novelmind-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    logger.info(f"Started {count} analysis worker processes")
+    return processes, stop
+
+
+def stop_worker_processes(processes: List[BaseProcess], stop: Event) -> None:
+    """Ask the workers to stop (their running jobs are released for recovery), then wait"""
+    stop.set()
+    for process in processes:
+        process.join(WORKER_PROCESS_STOP_TIMEOUT)
+        if process.is_alive():
+            logger.warning(f"Worker process {process.name} did not stop, terminating it")
+            process.terminate()
+            process.join()
+
+
+def _worker_main(index: int, count: int, stop: Event) -> None:
+    """Entry point of a worker process"""
+    asyncio.run(_serve(index, count, stop))
+
+
+async def _serve(index: int, count: int, stop: Event) -> None:
+    # Imported here: the API module starts these processes
+    from api import analysis
+
+    setup_logger(LOG_DIR / f"worker-{index}.log")
+    # The per-provider budgets are per process: split them so the total stays the same
+    settings.ANALYSIS_PROVIDER_CONCURRENCY = max(
+        1, settings.ANALYSIS_PROVIDER_CONCURRENCY // count
+    )
+    set_process_share(count)
+    parent = multiprocessing.parent_process()
+    analysis.start_worker_pool()
+    logger.info(f"Analysis worker process {index} ready")
+    try:
+        # Also exit when the API process is gone without stopping us (e.g. killed)
+        while not stop.is_set() and (parent is None or parent.is_alive()):
+            await asyncio.sleep(WORKER_PROCESS_CHECK_INTERVAL)
+    finally:
+        await analysis.stop_workers()
+        await close_http_clients()
+        await close_response_cache()
+        await close_write_queue()
+        await close_db()
+        logger.info(f"Analysis worker process {index} stopped")
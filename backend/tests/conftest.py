@@ -0,0 +1,37 @@
+"""
+Shared fixtures - every test runs against a database of its own
+"""
+
+import io
+from typing import Awaitable, Callable, List
+
+import pytest
+from fastapi import UploadFile
+
+from api.novels import import_novel
+from config import settings
+from database.sqlite_db import close_db, init_db
+from database.write_queue import close_write_queue
+
+
+@pytest.fixture(autouse=True)
+async def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_PATH", tmp_path / "novelmind.db")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "ANALYSIS_WORKER_PROCESSES", 0)
+    await init_db()
+    yield settings.DATABASE_PATH
+    await close_write_queue()
+    await close_db()
+
+
+@pytest.fixture
+def make_novel() -> Callable[[List[str]], Awaitable[str]]:
+    """Import a TXT novel with the given chapter texts; returns its id"""
+
+    async def make(chapters: List[str]) -> str:
+        text = "\n".join(f"第{num}章 测试\n{body}" for num, body in enumerate(chapters, 1))
+        upload = UploadFile(file=io.BytesIO(text.encode("utf-8")), filename="novel.txt")
+        return (await import_novel(upload)).id
+
+    return make
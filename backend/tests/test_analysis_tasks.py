@@ -0,0 +1,192 @@
+"""
+Tests for running analysis tasks: cancellation and resuming from checkpoints
+"""
+
+import asyncio
+import json
+from typing import List, Optional
+
+import pytest
+
+from api import analysis
+from constants import TASK_FINAL_MESSAGES
+from database.sqlite_db import get_db, get_read_db
+from database.write_queue import get_write_queue
+from services.analysis_artifacts import covered_chapters, load_artifacts
+from services.analysis_engine import AnalysisEngine
+from services.cancellation import CancellationToken
+from services.job_queue import claim, enqueue
+from services.llm_service import LLMResponse
+from services.stage_scheduler import ProgressReport
+from services.task_events import get_task_events
+
+# Big chapters are split in two for this context budget, small ones are not
+CONTEXT_BUDGET = 5000
+BIG_CHAPTER = "张三李四" + "字。" * 6000
+SMALL_CHAPTER = "张三李四" + "字。" * 100
+CONFIG = {"depth": "deep", "map_reduce": True, "features": ["characters"]}
+
+
+class FakeLLM:
+    """Answers character extraction; `gate` (while unset) holds calls matching `hold`"""
+
+    def __init__(self, hold: Optional[str] = None):
+        self.calls: List[str] = []
+        self.gate = asyncio.Event()
+        self.hold = hold
+
+    async def model_key(self, provider, model):
+        return "fake/m1"
+
+    async def context_budget(self, provider, model):
+        return "m1", CONTEXT_BUDGET
+
+    async def analyze_characters(self, text, **kwargs):
+        self.calls.append(text)
+        if self.hold is not None and self.hold not in text:
+            await self.gate.wait()
+        return LLMResponse(
+            text="", provider="fake", model="m1", data=[{"name": "张三", "aliases": []}]
+        )
+
+
+def _engine(llm: FakeLLM, token: Optional[CancellationToken] = None) -> AnalysisEngine:
+    engine = AnalysisEngine(cancel_token=token)
+    engine.llm = llm
+    return engine
+
+
+async def _new_task(novel_id: str, **config) -> str:
+    config = {"novel_id": novel_id, **CONFIG, **config}
+    task_id, _ = await enqueue(novel_id, config, json.dumps(config))
+    return task_id
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not await condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def _pieces(artifacts: List[dict]) -> dict:
+    """chapter_start -> sorted piece indexes of split chapters"""
+    pieces: dict = {}
+    for artifact in artifacts:
+        if artifact["part"] is not None:
+            pieces.setdefault(artifact["chapter_start"], []).append(artifact["part"][0])
+    return {num: sorted(indexes) for num, indexes in pieces.items()}
+
+
+def test_split_chapter_is_covered_only_by_all_its_pieces():
+    def artifact(part):
+        return {"inputs": {"c1": "h"}, "part": part}
+
+    assert covered_chapters([artifact(None)]) == {"c1"}
+    assert covered_chapters([artifact([0, 2])]) == set()
+    assert covered_chapters([artifact([0, 2]), artifact([1, 2])]) == {"c1"}
+    # Pieces of two different splits of the chapter do not add up
+    assert covered_chapters([artifact([0, 2]), artifact([1, 3])]) == set()
+
+
+async def test_resume_redoes_partly_finished_split_chapters(make_novel):
+    novel_id = await make_novel([SMALL_CHAPTER, BIG_CHAPTER, BIG_CHAPTER])
+    task_id = await _new_task(novel_id)
+
+    # Interrupted once the small chapter and the first piece of each big one are done
+    llm = FakeLLM(hold="张三李四")
+    run = asyncio.create_task(_engine(llm).analyze(novel_id, task_id, CONFIG))
+
+    async def first_pieces_done():
+        return len(await load_artifacts(novel_id, "characters")) == 3
+
+    await _wait_for(first_pieces_done)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    assert _pieces(await load_artifacts(novel_id, "characters")) == {2: [0], 3: [0]}
+
+    llm = FakeLLM()
+    await _engine(llm).analyze(novel_id, task_id, CONFIG, resume=True)
+
+    # The small chapter is kept, both big chapters are redone in full
+    assert len(llm.calls) == 4
+    artifacts = await load_artifacts(novel_id, "characters")
+    assert _pieces(artifacts) == {2: [0, 1], 3: [0, 1]}
+    assert len(artifacts) == 5
+
+
+async def test_incremental_run_redoes_chapter_missing_a_piece(make_novel):
+    novel_id = await make_novel([SMALL_CHAPTER, BIG_CHAPTER, BIG_CHAPTER])
+    await _engine(FakeLLM()).analyze(novel_id, await _new_task(novel_id), CONFIG)
+    artifacts = await load_artifacts(novel_id, "characters")
+    lost = next(a for a in artifacts if a["chapter_start"] == 3 and a["part"] == [1, 2])
+    async with get_db() as db:
+        await db.execute("DELETE FROM analysis_artifacts WHERE id = ?", (lost["id"],))
+        await db.commit()
+
+    llm = FakeLLM()
+    config = {**CONFIG, "scope": "incremental"}
+    await _engine(llm).analyze(novel_id, await _new_task(novel_id, scope="incremental"), config)
+
+    assert len(llm.calls) == 2
+    assert all("【第3章 测试】" in text for text in llm.calls)
+    assert _pieces(await load_artifacts(novel_id, "characters")) == {2: [0, 1], 3: [0, 1]}
+
+
+async def _status(task_id: str) -> tuple:
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            """
+            SELECT t.status, t.progress_message, n.analysis_status
+            FROM analysis_tasks t JOIN novels n ON n.id = t.novel_id
+            WHERE t.id = ?
+            """,
+            (task_id,),
+        )
+        return await cursor.fetchone()
+
+
+async def test_cancel_sets_final_status_and_message(make_novel, monkeypatch):
+    llm = FakeLLM(hold="第1章")
+    monkeypatch.setattr(analysis, "AnalysisEngine", lambda cancel_token: _engine(llm, cancel_token))
+    novel_id = await make_novel([SMALL_CHAPTER, BIG_CHAPTER])
+    task_id = await _new_task(novel_id)
+    job = await claim("w1")
+    token = CancellationToken()
+    config = analysis.AnalysisConfig.model_validate_json(job.config)
+    run = asyncio.create_task(analysis.run_analysis(task_id, config, token=token))
+    analysis.running_tasks[task_id] = analysis.RunningAnalysis(run, token)
+
+    async def unit_done():
+        return bool(await load_artifacts(novel_id, "characters"))
+
+    await _wait_for(unit_done)
+    await analysis.cancel_analysis(task_id)
+
+    assert run.done()
+    assert task_id not in analysis.running_tasks
+    assert get_task_events().latest_progress(task_id) is None
+    assert await _status(task_id) == ("cancelled", TASK_FINAL_MESSAGES["cancelled"], "cancelled")
+
+    # Progress still queued when the run stopped does not replace the final message
+    await _engine(llm)._update_progress(task_id, ProgressReport(50.0, "识别人物...", 1, 2, None))
+    await get_write_queue().flush()
+    assert await _status(task_id) == ("cancelled", TASK_FINAL_MESSAGES["cancelled"], "cancelled")
+
+
+async def test_cancelled_task_does_not_start(make_novel, monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(analysis, "AnalysisEngine", lambda cancel_token: _engine(llm, cancel_token))
+    novel_id = await make_novel([SMALL_CHAPTER])
+    task_id = await _new_task(novel_id)
+
+    await analysis.cancel_analysis(task_id)
+    job = await claim("w1")
+    assert job is None
+    config = analysis.AnalysisConfig(novel_id=novel_id, **CONFIG)
+    await analysis.run_analysis(task_id, config)
+
+    assert llm.calls == []
+    assert await _status(task_id) == ("cancelled", TASK_FINAL_MESSAGES["cancelled"], "cancelled")
@@ -0,0 +1,165 @@
+"""
+Tests for the analysis job queue: deduplication, claiming, leases and recovery
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from config import settings
+from database.sqlite_db import get_db, get_read_db
+from services import job_queue
+from services.job_queue import (
+    WorkerPool,
+    claim,
+    enqueue,
+    recover_expired_jobs,
+    renew_lease,
+    requeue,
+)
+
+
+async def _queue(novel_id: str, **config):
+    config = {"novel_id": novel_id, "depth": "standard", **config}
+    return await enqueue(novel_id, config, json.dumps(config))
+
+
+async def _task(task_id: str) -> tuple:
+    async with get_read_db() as db:
+        cursor = await db.execute(
+            "SELECT status, lease_owner, attempts FROM analysis_tasks WHERE id = ?", (task_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def _expire_lease(task_id: str) -> None:
+    past = (datetime.now() - timedelta(seconds=1)).isoformat()
+    async with get_db() as db:
+        await db.execute(
+            "UPDATE analysis_tasks SET lease_expires_at = ? WHERE id = ?", (past, task_id)
+        )
+        await db.commit()
+
+
+async def test_enqueue_deduplicates_same_config(make_novel):
+    novel_id = await make_novel(["正文"])
+
+    first, created = await _queue(novel_id)
+    again, created_again = await _queue(novel_id, cancel_policy="rollback")
+    other, created_other = await _queue(novel_id, depth="deep")
+
+    assert created and not created_again and created_other
+    assert again == first
+    assert other != first
+
+
+async def test_enqueue_after_task_finished_creates_new_task(make_novel):
+    novel_id = await make_novel(["正文"])
+    first, _ = await _queue(novel_id)
+    async with get_db() as db:
+        await db.execute("UPDATE analysis_tasks SET status = 'completed' WHERE id = ?", (first,))
+        await db.commit()
+
+    second, created = await _queue(novel_id)
+
+    assert created and second != first
+
+
+async def test_claim_takes_lowest_priority_value_first(make_novel):
+    deep_novel = await make_novel(["正文"])
+    quick_novel = await make_novel(["正文"])
+    deep, _ = await _queue(deep_novel, depth="deep")
+    quick, _ = await _queue(quick_novel, depth="quick")
+
+    assert (await claim("w1")).task_id == quick
+    assert (await claim("w2")).task_id == deep
+    assert await claim("w3") is None
+
+
+async def test_claim_runs_one_job_per_novel(make_novel):
+    novel_id = await make_novel(["正文"])
+    other_novel = await make_novel(["正文"])
+    await _queue(novel_id, depth="quick")
+    await _queue(novel_id, depth="deep")
+    other, _ = await _queue(other_novel, depth="deep")
+
+    first = await claim("w1")
+    second = await claim("w2")
+
+    assert first.novel_id == novel_id
+    assert second.task_id == other
+    assert await claim("w3") is None
+
+
+async def test_claim_leases_job_and_requeued_job_resumes(make_novel):
+    novel_id = await make_novel(["正文"])
+    task_id, _ = await _queue(novel_id)
+
+    job = await claim("w1")
+    assert job.task_id == task_id and not job.resume
+    assert await _task(task_id) == ("analyzing", "w1", 1)
+    assert await renew_lease(task_id, "w1")
+    assert not await renew_lease(task_id, "w2")
+
+    await requeue(task_id)
+    assert await _task(task_id) == ("pending", None, 1)
+    job = await claim("w2")
+    assert job.task_id == task_id and job.resume
+
+
+async def test_reaper_requeues_expired_jobs(make_novel, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_AUTO_RESUME", True)
+    expired_novel = await make_novel(["正文"])
+    live_novel = await make_novel(["正文"])
+    expired, _ = await _queue(expired_novel)
+    await claim("w1")
+    live, _ = await _queue(live_novel)
+    await claim("w2")
+    await _expire_lease(expired)
+
+    assert await recover_expired_jobs() == [expired]
+    assert await _task(expired) == ("pending", None, 1)
+    assert await _task(live) == ("analyzing", "w2", 1)
+    assert not await renew_lease(expired, "w1")
+    job = await claim("w3")
+    assert job.task_id == expired and job.resume
+
+
+async def test_reaper_marks_expired_jobs_interrupted(make_novel, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_AUTO_RESUME", False)
+    novel_id = await make_novel(["正文"])
+    task_id, _ = await _queue(novel_id)
+    await claim("w1")
+    await _expire_lease(task_id)
+
+    assert await recover_expired_jobs() == [task_id]
+    assert await _task(task_id) == ("interrupted", None, 1)
+    async with get_read_db() as db:
+        cursor = await db.execute("SELECT analysis_status FROM novels WHERE id = ?", (novel_id,))
+        assert (await cursor.fetchone())[0] == "interrupted"
+    assert await claim("w2") is None
+
+
+async def test_worker_stops_job_whose_lease_was_lost(make_novel, monkeypatch):
+    monkeypatch.setattr(job_queue, "ANALYSIS_HEARTBEAT_INTERVAL", 0.01)
+    novel_id = await make_novel(["正文"])
+    task_id, _ = await _queue(novel_id)
+    job = await claim("w1")
+    stopped = asyncio.Event()
+
+    async def handler(_job):
+        try:
+            await asyncio.sleep(60)
+        finally:
+            stopped.set()
+
+    # Another worker took the job over (e.g. after the lease expired and it was reaped)
+    async with get_db() as db:
+        await db.execute("UPDATE analysis_tasks SET lease_owner = 'w2' WHERE id = ?", (task_id,))
+        await db.commit()
+
+    await asyncio.wait_for(WorkerPool(handler, 1)._run(job, "w1"), timeout=5)
+
+    assert stopped.is_set()
+    # Releasing the lease leaves the new owner's lease alone
+    assert (await _task(task_id))[1] == "w2"
@@ -0,0 +1,86 @@
+"""
+Tests for the write queue: batching into shared transactions and per-intent retry
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from database.sqlite_db import get_read_db
+from database.write_queue import Statement, WriteQueue
+
+INSERT = "INSERT INTO novels (id, title) VALUES (?, ?)"
+
+
+async def _titles() -> dict:
+    async with get_read_db() as db:
+        cursor = await db.execute("SELECT id, title FROM novels")
+        return dict(await cursor.fetchall())
+
+
+@pytest.fixture
+async def queue():
+    queue = WriteQueue(max_batch=64, max_delay=0.05)
+    yield queue
+    await queue.close()
+
+
+async def test_submitted_writes_share_a_transaction(queue):
+    for i in range(20):
+        queue.submit(Statement.one(INSERT, (f"n{i}", "t")))
+    await queue.flush()
+
+    assert len(await _titles()) == 20
+    assert queue.batches == 1
+    assert queue.intents == 21  # The flush is an intent too
+
+
+async def test_concurrent_writes_are_batched(queue):
+    await asyncio.gather(*[queue.write(Statement.one(INSERT, (f"n{i}", "t"))) for i in range(20)])
+
+    assert len(await _titles()) == 20
+    assert queue.batches < 20
+
+
+async def test_writes_apply_in_order(queue):
+    queue.submit(Statement.one(INSERT, ("n1", "first")))
+    queue.submit(Statement.one("UPDATE novels SET title = ? WHERE id = ?", ("second", "n1")))
+    await queue.write(Statement.one("UPDATE novels SET title = title || '!' WHERE id = 'n1'"))
+
+    assert await _titles() == {"n1": "second!"}
+
+
+async def test_failed_intent_does_not_fail_its_batch(queue):
+    await queue.write(Statement.one(INSERT, ("taken", "t")))
+
+    results = await asyncio.gather(
+        queue.write(Statement.one(INSERT, ("a", "t"))),
+        queue.write(Statement.one(INSERT, ("taken", "again"))),
+        queue.write(Statement.one(INSERT, ("b", "t"))),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert await _titles() == {"taken": "t", "a": "t", "b": "t"}
+
+
+async def test_intent_is_atomic(queue):
+    await queue.write(Statement.one(INSERT, ("taken", "t")))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        await queue.write(
+            Statement.one(INSERT, ("new", "t")), Statement.one(INSERT, ("taken", "again"))
+        )
+
+    assert await _titles() == {"taken": "t"}
+
+
+async def test_failed_background_write_is_only_logged(queue):
+    queue.submit(Statement.one(INSERT, ("n1", "t")))
+    queue.submit(Statement.one(INSERT, ("n1", "again")))
+    queue.submit(Statement.one(INSERT, ("n2", "t")))
+    await queue.flush()
+
+    assert await _titles() == {"n1": "t", "n2": "t"}
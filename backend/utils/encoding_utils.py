@@ -5,7 +5,7 @@ Encoding detection and conversion utilities
 from typing import Optional, Tuple
 
 import chardet
-from constants import COMMON_ENCODINGS
+from constants import COMMON_ENCODINGS, ENCODING_DETECT_SAMPLE_SIZE
 
 
 def detect_encoding(content: bytes) -> Tuple[str, float]:
@@ -47,8 +47,8 @@ def decode_content(content: bytes, encoding: Optional[str] = None) -> str:
     if encoding:
         encodings_to_try.append(encoding)
 
-    # Detect encoding
-    detected, confidence = detect_encoding(content)
+    # Detect encoding from the start of the content; a wrong guess fails to decode below
+    detected, confidence = detect_encoding(content[:ENCODING_DETECT_SAMPLE_SIZE])
     if detected and detected not in encodings_to_try:
         encodings_to_try.append(detected)
 
@@ -32,8 +32,8 @@ class InterceptHandler(logging.Handler):
         logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
 
 
-def setup_logger():
-    """Configure the loguru logger"""
+def setup_logger(log_file: Path = LOG_FILE):
+    """Configure the loguru logger (worker processes log to a file of their own)"""
     # Ensure log directory exists
     if not LOG_DIR.exists():
         LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -59,7 +59,7 @@ def setup_logger():
 
     # File Handler (Rotate at 5MB, keep 5 backups)
     logger.add(
-        LOG_FILE,
+        log_file,
         format=log_format,
         level="INFO",
         rotation="5 MB",
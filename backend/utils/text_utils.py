@@ -2,8 +2,24 @@
 Text processing utilities
 """
 
+import hashlib
+import math
 import re
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
+
+from constants import (
+    CHINESE_CHAR_PATTERN,
+    DEFAULT_CONTEXT_WINDOW,
+    DEFAULT_TOKENIZER_CALIBRATION,
+    MODEL_CONTEXT_WINDOWS,
+    TOKENIZER_CALIBRATION,
+)
+
+_CJK_RE = re.compile(CHINESE_CHAR_PATTERN)
+# Preferred cut points when trimming text, best first
+_BREAK_CHARS = ("\n", "。", "！", "？", ".", "，")
+# A run of text up to and including the next cut point (or the end of the text)
+_SEGMENT_RE = re.compile("[^{0}]*[{0}]?".format(re.escape("".join(_BREAK_CHARS))))
 
 
 def count_words(text: str) -> int:
@@ -23,6 +39,148 @@ def count_words(text: str) -> int:
         return len(text.split())
 
 
+def content_hash(title: Optional[str], content: Optional[str]) -> str:
+    """Fingerprint of a chapter's analysis input (title and text)"""
+    material = f"{title or ''}\n{content or ''}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def tokenizer_calibration(model: Optional[str] = None) -> Tuple[float, float]:
+    """(tokens per CJK character, other characters per token) for a model's family"""
+    name = (model or "").lower()
+    for family, cjk_cost, chars_per_token in TOKENIZER_CALIBRATION:
+        if family in name:
+            return cjk_cost, chars_per_token
+    return DEFAULT_TOKENIZER_CALIBRATION
+
+
+def context_window(model: Optional[str] = None) -> int:
+    """Context window (tokens) of a model, by family"""
+    name = (model or "").lower()
+    # Names such as "ernie-speed-128k" carry their window
+    match = re.search(r"(\d+)k\b", name)
+    if match:
+        return int(match.group(1)) * 1024
+    for family, window in MODEL_CONTEXT_WINDOWS:
+        if family in name:
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Fast offline token estimate, calibrated per model family (CJK-aware)"""
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_RE.findall(text))
+    return _tokens(cjk_chars, len(text) - cjk_chars, tokenizer_calibration(model))
+
+
+def _tokens(cjk_chars: int, other_chars: int, calibration: Tuple[float, float]) -> int:
+    cjk_cost, chars_per_token = calibration
+    return math.ceil(cjk_chars * cjk_cost + other_chars / chars_per_token)
+
+
+def scale_token_count(token_count: int, model: Optional[str] = None) -> int:
+    """Convert a stored (default-calibration) token count of CJK text to a model's family"""
+    return math.ceil(
+        token_count * tokenizer_calibration(model)[0] / DEFAULT_TOKENIZER_CALIBRATION[0]
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Longest prefix of text within max_tokens, cut at a paragraph/sentence end if one is near"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+
+    # Binary search on the prefix length (the estimate grows monotonically)
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid], model) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+
+    cut = text[:low]
+    for char in _BREAK_CHARS:
+        index = cut.rfind(char)
+        if index > low * 0.9:
+            return cut[: index + 1]
+    return cut
+
+
+def split_by_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """Split text into consecutive pieces of at most max_tokens each.
+
+    One pass: each run of text up to a paragraph/sentence end is counted once, and a
+    piece ends before the run that would overflow it. A piece less than 90% full takes
+    the head of that run instead, cut where the budget runs out (as does a run too long
+    for any piece).
+    """
+    calibration = tokenizer_calibration(model)
+    pieces: List[str] = []
+    start = 0  # The current piece is text[start:], up to the run being added
+    cjk = other = 0  # Characters in the current piece
+    for match in _SEGMENT_RE.finditer(text):
+        segment = match.group()
+        if not segment:
+            continue
+        segment_cjk = len(_CJK_RE.findall(segment))
+        segment_other = len(segment) - segment_cjk
+        if _tokens(cjk + segment_cjk, other + segment_other, calibration) <= max_tokens:
+            cjk, other = cjk + segment_cjk, other + segment_other
+            continue
+        if start < match.start() and _tokens(cjk, other, calibration) >= max_tokens * 0.9:
+            pieces.append(text[start : match.start()])
+            start, cjk, other = match.start(), 0, 0
+            if _tokens(segment_cjk, segment_other, calibration) <= max_tokens:
+                cjk, other = segment_cjk, segment_other
+                continue
+        # Character by character, starting a piece whenever the next one would not fit
+        for index in range(match.start(), match.end()):
+            is_cjk = int(_CJK_RE.match(text, index) is not None)
+            grown = _tokens(cjk + is_cjk, other + 1 - is_cjk, calibration)
+            if index > start and grown > max_tokens:
+                pieces.append(text[start:index])
+                start, cjk, other = index, 0, 0
+            cjk, other = cjk + is_cjk, other + 1 - is_cjk
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def pack_texts(
+    texts: Sequence[str],
+    budget: int,
+    model: Optional[str] = None,
+    token_counts: Optional[Sequence[Optional[int]]] = None,
+) -> List[str]:
+    """Fit several texts into a shared token budget.
+
+    Texts smaller than an equal share are kept whole and their unused share is
+    redistributed; the rest are truncated to the remaining share each. Known token
+    counts (already in the model's calibration) skip re-estimating.
+    """
+    sizes = [
+        count if count else estimate_tokens(text, model)
+        for text, count in zip(texts, token_counts or [None] * len(texts))
+    ]
+    order = sorted(range(len(texts)), key=lambda i: sizes[i])
+    packed = list(texts)
+    remaining = max(0, budget)
+
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        if sizes[index] <= share:
+            remaining -= sizes[index]
+        else:
+            packed[index] = truncate_to_tokens(texts[index], share, model)
+            remaining -= share
+    return packed
+
+
 def split_sentences(text: str) -> List[str]:
     """Split text into sentences"""
     # Chinese and English sentence endings
@@ -118,6 +276,31 @@ def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     return truncated + suffix
 
 
+def make_snippet(
+    text: str, terms: Sequence[str], width: int = 120
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """A window of text around the first match of any term (case-insensitive).
+
+    Returns the snippet and the (start, end) offsets of the matches it contains.
+    """
+    pattern = re.compile(
+        "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE
+    )
+    first = pattern.search(text)
+    start = max(0, first.start() - width // 3) if first else 0
+    end = min(len(text), start + width)
+    start = max(0, end - width)
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    snippet = prefix + text[start:end].replace("\n", " ") + suffix
+    highlights = [
+        (m.start() - start + len(prefix), m.end() - start + len(prefix))
+        for m in pattern.finditer(text, start, end)
+    ]
+    return snippet, highlights
+
+
 def extract_names(text: str) -> List[str]:
     """Extract potential character names from text"""
     names = set()
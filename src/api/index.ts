@@ -1,5 +1,11 @@
 import axios from 'axios'
-import type { AnalysisConfig, ProviderConfig, Settings } from '@/types'
+import type {
+  AnalysisConfig,
+  ChapterDetail,
+  ChapterSearchResult,
+  ProviderConfig,
+  Settings
+} from '@/types'
 
 // Initial base URL - will be updated by setApiBaseUrl
 const api = axios.create({
@@ -182,6 +188,20 @@ export const novelsApi = {
   async getChapters(novelId: string) {
     const response = await api.get(`/api/novels/${novelId}/chapters`)
     return response.data
+  },
+
+  // Get a chapter with its text
+  async getChapter(novelId: string, chapterId: string): Promise<ChapterDetail> {
+    const response = await api.get(`/api/novels/${novelId}/chapters/${chapterId}`)
+    return response.data
+  },
+
+  // Full-text search in a novel's chapters (space-separated terms must all match)
+  async search(novelId: string, q: string, skip = 0, limit = 20): Promise<ChapterSearchResult> {
+    const response = await api.get(`/api/novels/${novelId}/search`, {
+      params: { q, skip, limit }
+    })
+    return response.data
   }
 }
 
@@ -202,6 +222,11 @@ export const analysisApi = {
     return response.data
   },
 
+  // URL of a task's Server-Sent Events stream (status, progress, stages)
+  eventsUrl(taskId: string) {
+    return `${api.defaults.baseURL}/api/analysis/${taskId}/events`
+  },
+
   // Get analysis result by task ID
   async getResult(taskId: string) {
     const response = await api.get(`/api/analysis/${taskId}/result`)
@@ -224,6 +249,20 @@ export const analysisApi = {
   async cancelAnalysis(taskId: string) {
     const response = await api.post(`/api/analysis/${taskId}/cancel`)
     return response.data
+  },
+
+  // List tasks interrupted by a backend restart
+  async getInterruptedTasks(novelId?: string) {
+    const response = await api.get('/api/analysis/interrupted', {
+      params: novelId ? { novel_id: novelId } : undefined
+    })
+    return response.data
+  },
+
+  // Resume an interrupted task from its last checkpoint
+  async resumeAnalysis(taskId: string) {
+    const response = await api.post(`/api/analysis/${taskId}/resume`)
+    return response.data
   }
 }
 
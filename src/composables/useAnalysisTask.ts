@@ -2,8 +2,27 @@ import { ref, onUnmounted } from 'vue'
 import { ElMessage } from 'element-plus'
 import { useNovelStore } from '@/stores/novel'
 import { useAnalysisStore } from '@/stores/analysis'
-import type { Novel, AnalysisConfig } from '@/types'
+import { analysisApi } from '@/api'
+import type { Novel, AnalysisConfig, AnalysisTask, AnalysisTaskEvent } from '@/types'
 import { storeToRefs } from 'pinia'
+import { formatDuration } from '@/utils/format'
+
+const STAGE_LABELS: Record<string, string> = {
+  characters: '人物识别',
+  relationships: '关系分析',
+  plot: '情节追踪',
+  summary: '章节摘要'
+}
+
+// 进度文本附上章节进度与预计剩余时间
+const describeProgress = (message: string, data: Partial<AnalysisTask>): string => {
+  const parts: string[] = []
+  if (data.units_total) parts.push(`${data.units_done ?? 0}/${data.units_total} 章`)
+  if (data.eta_seconds != null && data.eta_seconds > 0) {
+    parts.push(`预计剩余 ${formatDuration(data.eta_seconds)}`)
+  }
+  return parts.length ? `${message}（${parts.join('，')}）` : message
+}
 
 export function useAnalysisTask() {
 
@@ -20,17 +39,58 @@ export function useAnalysisTask() {
   } = storeToRefs(analysisStore)
 
   const pollingInterval = ref<number | null>(null)
+  const eventSource = ref<EventSource | null>(null)
 
   const stopPolling = () => {
     if (pollingInterval.value) {
       clearInterval(pollingInterval.value)
       pollingInterval.value = null
     }
+    if (eventSource.value) {
+      eventSource.value.close()
+      eventSource.value = null
+    }
   }
 
-  const startPolling = () => {
-    stopPolling() // Ensure no duplicate intervals
+  // 处理任务状态，任务结束时返回 true
+  const handleStatus = async (status: AnalysisTask): Promise<boolean> => {
+    if (status.status === 'completed') {
+      // 1. 刷新小说状态
+      if (novelStore.currentNovel?.id) {
+         await novelStore.fetchNovel(novelStore.currentNovel.id)
+      }
+
+      // 2. 加载分析结果（关键修复）
+      try {
+        await analysisStore.getAnalysisResult(status.novel_id)
+      } catch (error) {
+        console.error('Failed to load analysis result:', error)
+      }
 
+      ElMessage.success('分析完成')
+      analysisStore.addAnalysisLog('success', '分析完成!')
+      return true
+
+    } else if (status.status === 'failed') {
+      ElMessage.error('分析失败: ' + (status.error_message || '未知错误'))
+      analysisStore.addAnalysisLog('error', '分析失败: ' + (status.error_message || '未知错误'))
+      return true
+
+    } else if (status.status === 'interrupted') {
+      ElMessage.warning('分析已中断，可稍后继续')
+      analysisStore.addAnalysisLog('info', '分析已中断')
+      return true
+
+    } else if (status.status === 'cancelled') {
+      // 新增：处理取消状态
+      ElMessage.info('分析已取消')
+      analysisStore.addAnalysisLog('info', '分析已取消')
+      return true
+    }
+    return false
+  }
+
+  const startIntervalPolling = () => {
     pollingInterval.value = window.setInterval(async () => {
       try {
         if (!currentTask.value?.id) return
@@ -39,41 +99,64 @@ export function useAnalysisTask() {
 
         // 修复：使用正确的字段
         const progressMsg = status.progress_message || status.error_message || '分析中...'
-        analysisStore.setAnalysisProgress(status.progress || 0, progressMsg)
+        analysisStore.setAnalysisProgress(status.progress || 0, describeProgress(progressMsg, status))
 
-        if (status.status === 'completed') {
+        if (await handleStatus(status)) {
           stopPolling()
+        }
+      } catch (error) {
+        console.error('Polling error:', error)
+      }
+    }, 2000)
+  }
+
+  // 跟踪任务进度：优先使用服务端推送（SSE），连接失败时退回轮询
+  const startPolling = () => {
+    stopPolling() // Ensure no duplicate intervals
 
-          // 1. 刷新小说状态
-          if (novelStore.currentNovel?.id) {
-             await novelStore.fetchNovel(novelStore.currentNovel.id)
-          }
+    const taskId = currentTask.value?.id
+    if (!taskId || typeof EventSource === 'undefined') {
+      startIntervalPolling()
+      return
+    }
 
-          // 2. 加载分析结果（关键修复）
-          try {
-            await analysisStore.getAnalysisResult(status.novel_id)
-          } catch (error) {
-            console.error('Failed to load analysis result:', error)
-          }
+    const source = new EventSource(analysisApi.eventsUrl(taskId))
+    eventSource.value = source
 
-          ElMessage.success('分析完成')
-          analysisStore.addAnalysisLog('success', '分析完成!')
+    source.addEventListener('progress', (event) => {
+      const data: AnalysisTaskEvent = JSON.parse((event as MessageEvent).data)
+      analysisStore.setAnalysisProgress(data.progress || 0, describeProgress(data.message || '', data))
+    })
 
-        } else if (status.status === 'failed') {
-          stopPolling()
-          ElMessage.error('分析失败: ' + (status.error_message || '未知错误'))
-          analysisStore.addAnalysisLog('error', '分析失败: ' + (status.error_message || '未知错误'))
+    source.addEventListener('stage', (event) => {
+      const data: AnalysisTaskEvent = JSON.parse((event as MessageEvent).data)
+      if (data.state === 'finished') {
+        analysisStore.addAnalysisLog('success', `${STAGE_LABELS[data.stage || ''] || data.stage}完成 (${data.count ?? 0})`)
+      }
+    })
 
-        } else if (status.status === 'cancelled') {
-          // 新增：处理取消状态
-          stopPolling()
-          ElMessage.info('分析已取消')
-          analysisStore.addAnalysisLog('info', '分析已取消')
-        }
-      } catch (error) {
-        console.error('Polling error:', error)
+    source.addEventListener('status', async (event) => {
+      const data: AnalysisTaskEvent = JSON.parse((event as MessageEvent).data)
+      const status = analysisStore.applyTaskStatus(data)
+      if (!status) return
+      if (data.progress_message) {
+        analysisStore.setAnalysisProgress(status.progress || 0, data.progress_message)
       }
-    }, 2000)
+      if (['completed', 'failed', 'interrupted', 'cancelled'].includes(status.status)) {
+        // 任务结束后服务端关闭连接，先关闭以免自动重连
+        stopPolling()
+        await handleStatus(status)
+      }
+    })
+
+    source.onerror = () => {
+      if (eventSource.value !== source) return
+      console.warn('Event stream unavailable, falling back to polling')
+      stopPolling()
+      if (analyzing.value) {
+        startIntervalPolling()
+      }
+    }
   }
 
   const simulateAnalysis = async (currentNovel: Novel | null) => {
@@ -131,9 +214,13 @@ export function useAnalysisTask() {
       analysisStore.addAnalysisLog('loading', '正在初始化分析任务...')
 
       const result = await analysisStore.startAnalysis(novelId, {
+        scope: config.scope,
+        chapter_start: config.chapter_start,
+        chapter_end: config.chapter_end,
         depth: config.depth,
         provider: config.provider,
-        model: config.model
+        model: config.model,
+        use_cache: config.use_cache
       })
 
       if (result.id) {
@@ -153,6 +240,28 @@ export function useAnalysisTask() {
     }
   }
 
+  const resumeAnalysis = async (novelId: string) => {
+    if (!novelId) return
+
+    analysisStore.clearProgressState()
+
+    try {
+      const task = await analysisStore.resumeAnalysis(novelId)
+      if (!task) {
+        ElMessage.info('没有可继续的分析任务')
+        return
+      }
+
+      analysisStore.addAnalysisLog('success', '从检查点继续分析')
+      analysisStore.setAnalysisProgress(task.progress || 0, '继续分析...')
+      startPolling()
+    } catch (error: unknown) {
+      const message = error instanceof Error ? error.message : '未知错误'
+      ElMessage.error('继续分析失败: ' + message)
+      analysisStore.addAnalysisLog('error', '继续分析失败: ' + message)
+    }
+  }
+
   const cancelAnalysis = () => {
     stopPolling()
     if (currentTask.value?.id) {
@@ -172,6 +281,7 @@ export function useAnalysisTask() {
     analysisLogs,
     analysisResult,
     startAnalysis,
+    resumeAnalysis,
     cancelAnalysis,
     stopPolling,
     startPolling
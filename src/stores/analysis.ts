@@ -33,6 +33,26 @@ export const useAnalysisStore = defineStore('analysis', () => {
     }
   }
 
+  // 继续被中断的分析（从检查点恢复）
+  const resumeAnalysis = async (novelId: string): Promise<AnalysisTask | null> => {
+    loading.value = true
+    try {
+      const tasks: AnalysisTask[] = await analysisApi.getInterruptedTasks(novelId)
+      if (tasks.length === 0) return null
+
+      analyzing.value = true
+      const data = await analysisApi.resumeAnalysis(tasks[0].id)
+      currentTask.value = data
+      return data
+    } catch (error: unknown) {
+      console.error('Failed to resume analysis:', error)
+      analyzing.value = false
+      throw error
+    } finally {
+      loading.value = false
+    }
+  }
+
   // 获取分析状态
   const getAnalysisStatus = async (taskId: string): Promise<AnalysisTask> => {
     try {
@@ -44,7 +64,7 @@ export const useAnalysisStore = defineStore('analysis', () => {
         analysisProgress.value = data.progress
       }
       
-      if (data.status === 'completed' || data.status === 'failed' || data.status === 'cancelled') {
+      if (['completed', 'failed', 'cancelled', 'interrupted'].includes(data.status)) {
         analyzing.value = false
       }
 
@@ -55,6 +75,20 @@ export const useAnalysisStore = defineStore('analysis', () => {
     }
   }
 
+  // 应用推送的任务状态，返回更新后的任务
+  const applyTaskStatus = (data: Partial<AnalysisTask>): AnalysisTask | null => {
+    if (!currentTask.value) return null
+    currentTask.value = { ...currentTask.value, ...data }
+
+    if (data.progress !== undefined) {
+      analysisProgress.value = data.progress
+    }
+    if (data.status && ['completed', 'failed', 'cancelled', 'interrupted'].includes(data.status)) {
+      analyzing.value = false
+    }
+    return currentTask.value
+  }
+
   // 获取分析结果 (按小说 ID)
   const getAnalysisResult = async (novelId: string): Promise<AnalysisResult> => {
     try {
@@ -139,7 +173,9 @@ export const useAnalysisStore = defineStore('analysis', () => {
     analyzing,
     loading,
     startAnalysis,
+    resumeAnalysis,
     getAnalysisStatus,
+    applyTaskStatus,
     getAnalysisResult,
     cancelAnalysis,
     resetAnalysis,
@@ -10,7 +10,7 @@ export interface Novel {
   file_path: string | null
   created_at: string
   updated_at: string
-  analysis_status: 'pending' | 'analyzing' | 'completed' | 'failed'
+  analysis_status: 'importing' | 'pending' | 'analyzing' | 'completed' | 'failed' | 'interrupted' | 'cancelled'
   total_chapters: number
   total_words: number
 }
@@ -24,6 +24,8 @@ export interface Chapter {
   content?: string
   word_count: number
   summary: string | null
+  summary_model?: string | null // 生成摘要的 "服务商/模型"
+  token_count?: number // 导入时估算的 Token 数
 }
 
 // 章节详情（带必填内容）
@@ -31,6 +33,23 @@ export interface ChapterDetail extends Chapter {
   content: string
 }
 
+// 章节全文搜索结果
+export interface ChapterSearchHit {
+  chapter_id: string
+  chapter_num: number
+  title: string | null
+  score: number // 越大越相关
+  matches: number // 检索词在章节中出现的次数
+  snippet: string
+  highlights: Array<[number, number]> // 命中位置（snippet 内的起止偏移）
+}
+
+export interface ChapterSearchResult {
+  query: string
+  total: number
+  hits: ChapterSearchHit[]
+}
+
 // 人物类型
 export interface Character {
   id: string
@@ -41,6 +60,7 @@ export interface Character {
   personality: string | null
   first_appearance: number
   importance_score: number
+  evidence?: Array<{ chapters: [number, number]; name: string; description: string }> | null
 }
 
 // 关系类型
@@ -69,24 +89,44 @@ export interface AnalysisLog {
 export interface AnalysisTask {
   id: string
   novel_id: string
-  status: 'pending' | 'analyzing' | 'completed' | 'failed' | 'cancelled'
+  status: 'pending' | 'analyzing' | 'completed' | 'failed' | 'cancelled' | 'interrupted'
   progress: number
   progress_message?: string
+  units_done?: number | null // 当前阶段已完成的章节数
+  units_total?: number | null
+  eta_seconds?: number | null // 按吞吐量估算的剩余时间
   started_at: string | null
   completed_at: string | null
   error_message: string | null
 }
 
+// 分析任务推送事件（SSE）
+export interface AnalysisTaskEvent extends Partial<Omit<AnalysisTask, 'id'>> {
+  type: 'status' | 'progress' | 'stage' | 'unit'
+  task_id?: string
+  message?: string | null
+  stage?: string
+  state?: 'started' | 'finished'
+  count?: number
+  chapters?: [number, number]
+  done?: number
+  total?: number
+}
+
 // 分析配置类型
 export interface AnalysisConfig {
   novel_id?: string
-  scope?: 'full' | 'partial'
+  scope?: 'full' | 'partial' | 'incremental'
   chapter_start?: number
   chapter_end?: number
   depth?: 'quick' | 'standard' | 'deep'
   features?: Array<'characters' | 'relationships' | 'plot' | 'summary'>
   provider?: string
   model?: string
+  use_cache?: boolean // false 时跳过 LLM 响应缓存
+  map_reduce?: boolean // 全书分块提取人物，默认仅深度分析启用
+  cancel_policy?: 'commit' | 'rollback' // 取消时保留（可继续）或丢弃已完成的部分结果
+  priority?: number // 队列优先级，越小越先运行（默认按深度：快速优先）
 }
 
 // 分析结果汇总
@@ -97,6 +137,7 @@ export interface AnalysisResult {
   relationship_count: number
   plot_count: number
   chapter_count: number
+  served_by?: Record<string, number> // "服务商/模型" -> 调用次数
   characters?: Character[]
   relationships?: Relationship[]
 }
@@ -129,11 +170,16 @@ export interface ProviderConfig {
   baseUrl?: string
   model?: string
   secretKey?: string // 针对百度
+  rpm?: number // 每分钟请求数上限（可选）
+  tpm?: number // 每分钟 Token 数上限（可选）
+  contextWindow?: number // 上下文窗口 Token 数（可选，默认按模型识别）
 }
 
 // 应用设置类型
 export interface Settings {
   defaultProvider: string
+  fallbackProviders?: string[] // 默认服务商不可用时依次切换
+  hedgeRequests?: boolean // 慢请求发送备份请求，先返回者胜出
   openai: ProviderConfig
   claude: ProviderConfig
   gemini: ProviderConfig
@@ -152,7 +198,7 @@ export interface Settings {
   autoSave: boolean
   dataPath: string
   // 允许动态访问提供商配置
-  [key: string]: string | boolean | ProviderConfig | undefined
+  [key: string]: string | string[] | boolean | ProviderConfig | undefined
 }
 
 // API 响应封装
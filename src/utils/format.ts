@@ -33,3 +33,13 @@ export const formatFileSize = (bytes: number | undefined): string => {
   const i = Math.floor(Math.log(bytes) / Math.log(k))
   return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i]
 }
+
+/**
+ * Format a duration in seconds as a short remaining-time string
+ */
+export const formatDuration = (seconds: number): string => {
+  if (seconds < 60) return `${Math.max(1, Math.round(seconds))} 秒`
+  const minutes = Math.round(seconds / 60)
+  if (minutes < 60) return `${minutes} 分钟`
+  return `${Math.floor(minutes / 60)} 小时 ${minutes % 60} 分钟`
+}
@@ -12,9 +12,14 @@ export const getStatusType = (status: string | undefined): StatusTagType => {
     case 'completed':
       return 'success'
     case 'analyzing':
+    case 'importing':
       return 'primary'
     case 'failed':
       return 'danger'
+    case 'interrupted':
+      return 'warning'
+    case 'cancelled':
+      return 'info'
     case 'pending':
       return 'warning'
     default:
@@ -31,8 +36,14 @@ export const getStatusText = (status: string | undefined): string => {
       return '已完成'
     case 'analyzing':
       return '分析中'
+    case 'importing':
+      return '导入中'
     case 'failed':
       return '失败'
+    case 'interrupted':
+      return '已中断'
+    case 'cancelled':
+      return '已取消'
     case 'pending':
       return '待处理'
     default: